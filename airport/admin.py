@@ -1,3 +1,5 @@
+from datetime import date, timedelta
+
 from django.contrib import admin
 
 from airport.models import (
@@ -7,11 +9,15 @@ from airport.models import (
     Route,
     Crew,
     Flight,
+    FlightSchedule,
     Order,
     Ticket,
     TicketClass,
     Airline,
 )
+from airport.schedules import materialize_schedules
+
+MATERIALIZE_DAYS = 90
 
 admin.site.register(Airport)
 admin.site.register(Airline)
@@ -23,3 +29,23 @@ admin.site.register(Flight)
 admin.site.register(Order)
 admin.site.register(Ticket)
 admin.site.register(TicketClass)
+
+
+@admin.register(FlightSchedule)
+class FlightScheduleAdmin(admin.ModelAdmin):
+    list_display = (
+        "route", "airplane", "weekdays", "departure_time", "duration",
+        "valid_from", "valid_until",
+    )
+    list_select_related = ("route__source", "route__destination", "airplane")
+    filter_horizontal = ("crew",)
+    actions = ("materialize",)
+
+    @admin.action(description=f"Create flights for the next "
+                              f"{MATERIALIZE_DAYS} days")
+    def materialize(self, request, queryset):
+        start = date.today()
+        created = materialize_schedules(
+            start, start + timedelta(days=MATERIALIZE_DAYS), queryset
+        )
+        self.message_user(request, f"Created {created} flights.")
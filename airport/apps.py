@@ -1,6 +1,30 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class AirportConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "airport"
+
+    def ready(self):
+        import airport.signals  # noqa: F401
+        from airport.metrics import install_query_counter
+        from airport.profiling import install_query_timer
+
+        # No-ops outside of a request the middlewares measure, and
+        # installed whether they are enabled or not, so settings
+        # overridden in tests take effect on open connections.
+        connection_created.connect(
+            install_query_counter, dispatch_uid="metrics_query_counter"
+        )
+        connection_created.connect(
+            install_query_timer, dispatch_uid="profiling_query_timer"
+        )
+
+        if settings.SLOW_QUERY_ENABLED:
+            from airport.slow_queries import install_slow_query_log
+
+            connection_created.connect(
+                install_slow_query_log, dispatch_uid="slow_query_log"
+            )
@@ -0,0 +1,111 @@
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import Http404, HttpResponseNotAllowed
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from airport.seat_map import SEAT_MAP_ENCODINGS, get_seat_map
+from airport.views import FlightViewSet
+
+# Async versions of the read-heavy flight endpoints, for ASGI servers.
+#
+# Authentication, permissions, throttling, filtering, pagination and
+# serializers are those of FlightViewSet, so the responses are the same
+# as on the sync endpoints. The database work is awaited, which leaves
+# the event loop free to accept other requests meanwhile.
+
+
+def database_sync_to_async(function):
+    """Run blocking ORM code on the executor's thread pool.
+
+    ``sync_to_async`` defaults to one thread shared by every request of
+    the process, and so does Django's async ORM (``aget``, ``aiterator``,
+    which the pinned Django 4.0 does not have yet), so queries of
+    concurrent requests would still run one at a time. Pool threads keep
+    their own connection, checked and recycled like at the start and end
+    of a sync request.
+    """
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def _get_view(request, action, **kwargs):
+    view = FlightViewSet(action_map={"get": action}, args=(), kwargs=kwargs)
+    view.format_kwarg = None
+    view.headers = view.default_response_headers
+    view.request = view.initialize_request(request, **kwargs)
+    return view
+
+
+async def _respond(request, action, handler, **kwargs):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    view = _get_view(request, action, **kwargs)
+    try:
+        await database_sync_to_async(view.initial)(view.request, **kwargs)
+        response = await handler(view)
+    except Exception as exc:
+        response = view.handle_exception(exc)
+    return view.finalize_response(view.request, response).render()
+
+
+async def _list(view):
+    queryset = view.filter_queryset(view.get_queryset())
+
+    def serialize():
+        # Pricing the page may load the ticket classes.
+        if view.paginator is not None:
+            page = view.paginate_queryset(queryset)
+            data = view.get_serializer(page, many=True).data
+            return view.get_paginated_response(data)
+        return Response(view.get_serializer(queryset, many=True).data)
+
+    return await database_sync_to_async(serialize)()
+
+
+async def _retrieve(view):
+    queryset = view.filter_queryset(view.get_queryset())
+
+    def serialize():
+        # Taken places are loaded lazily by the serializer.
+        flight = queryset.filter(pk=view.kwargs["pk"]).first()
+        if flight is None:
+            raise Http404
+        return view.get_serializer(flight).data
+
+    return Response(await database_sync_to_async(serialize)())
+
+
+async def _seat_map(view):
+    encoding = view.request.query_params.get("encoding", "base64")
+    if encoding not in SEAT_MAP_ENCODINGS:
+        raise ValidationError(
+            {"encoding": f"Must be one of: {SEAT_MAP_ENCODINGS}"}
+        )
+    seat_map = await database_sync_to_async(get_seat_map)(
+        view.kwargs["pk"], encoding
+    )
+    if seat_map is None:
+        raise Http404
+    return Response(seat_map)
+
+
+async def flight_list(request):
+    """Flight list, with the filters and pagination of /flights/"""
+    return await _respond(request, "list", _list)
+
+
+async def flight_detail(request, pk):
+    """Flight detail, as /flights/<pk>/"""
+    return await _respond(request, "retrieve", _retrieve, pk=pk)
+
+
+async def flight_seat_map(request, pk):
+    """Seat occupancy bitmap, as /flights/<pk>/seat-map/"""
+    return await _respond(request, "seat_map", _seat_map, pk=pk)
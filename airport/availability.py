@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.db.models.functions import TruncDate
+
+from airport.models import Flight, RouteDayAvailability
+
+REBUILD_BATCH_SIZE = 5000
+# Above this many route days a refresh rebuilds their whole date range.
+MAX_REFRESH_PAIRS = 50
+
+
+def route_day(flight):
+    return flight.route_id, flight.departure_time.date()
+
+
+def _midnight(day):
+    return datetime.combine(day, datetime.min.time())
+
+
+def _daily_totals(flights):
+    """Flights and min/max free seats per route and departure day."""
+    available = (
+        F("airplane__rows") * F("airplane__seats_in_row") - F("tickets_sold")
+    )
+    return (
+        flights.annotate(date=TruncDate("departure_time"))
+        .order_by()
+        .values("route_id", "date")
+        .annotate(
+            flights=Count("id"),
+            min_seats_available=Min(available),
+            max_seats_available=Max(available),
+        )
+    )
+
+
+TOTAL_FIELDS = ("flights", "min_seats_available", "max_seats_available")
+
+
+def _pairs_filter(pairs):
+    rows_filter = Q()
+    flights_filter = Q()
+    for route_id, date in pairs:
+        rows_filter |= Q(route_id=route_id, date=date)
+        flights_filter |= Q(
+            route_id=route_id,
+            departure_time__gte=_midnight(date),
+            departure_time__lt=_midnight(date + timedelta(days=1)),
+        )
+    return rows_filter, flights_filter
+
+
+def _totals(flights_filter):
+    return {
+        (total.pop("route_id"), total.pop("date")): total
+        for total in _daily_totals(Flight.objects.filter(flights_filter))
+    }
+
+
+def refresh_route_days(pairs):
+    """Recompute the availability of ``(route_id, date)`` pairs.
+
+    Days whose totals did not change are left alone, so most bookings
+    take no lock on the rollup. Missing rows of the others are inserted
+    first, skipping those a concurrent refresh inserts meanwhile; then
+    the rows are locked and their totals computed again, so of two
+    transactions touching the same day the second waits and sees the
+    first's flights. Days left without flights lose their row.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+    if len(pairs) > MAX_REFRESH_PAIRS:
+        dates = [date for _, date in pairs]
+        rebuild_route_days(
+            routes={route_id for route_id, _ in pairs},
+            start=min(dates),
+            end=max(dates) + timedelta(days=1),
+        )
+        return
+
+    rows_filter, flights_filter = _pairs_filter(pairs)
+    with transaction.atomic(savepoint=False):
+        totals = _totals(flights_filter)
+        current = {
+            (route_id, date): dict(zip(TOTAL_FIELDS, values))
+            for route_id, date, *values in RouteDayAvailability.objects
+            .filter(rows_filter)
+            .values_list("route_id", "date", *TOTAL_FIELDS)
+        }
+        changed = {
+            pair for pair in pairs if totals.get(pair) != current.get(pair)
+        }
+        if not changed:
+            return
+
+        missing = [
+            RouteDayAvailability(route_id=pair[0], date=pair[1], **total)
+            for pair, total in totals.items()
+            if pair in changed and pair not in current
+        ]
+        if missing:
+            RouteDayAvailability.objects.bulk_create(
+                missing, ignore_conflicts=True
+            )
+
+        rows_filter, flights_filter = _pairs_filter(changed)
+        rows = {
+            (row.route_id, row.date): row
+            for row in RouteDayAvailability.objects.select_for_update()
+            .filter(rows_filter)
+            .order_by("id")
+        }
+        totals = _totals(flights_filter)
+        updated, created = [], []
+        for pair, total in totals.items():
+            row = rows.pop(pair, None)
+            if row is None:
+                # Deleted meanwhile by a refresh that saw none of our
+                # flights on the day.
+                created.append(RouteDayAvailability(
+                    route_id=pair[0], date=pair[1], **total
+                ))
+                continue
+            if any(getattr(row, name) != value
+                   for name, value in total.items()):
+                for name, value in total.items():
+                    setattr(row, name, value)
+                updated.append(row)
+        if updated:
+            RouteDayAvailability.objects.bulk_update(updated, TOTAL_FIELDS)
+        if created:
+            RouteDayAvailability.objects.bulk_create(
+                created, ignore_conflicts=True
+            )
+        if rows:
+            RouteDayAvailability.objects.filter(
+                pk__in=[row.pk for row in rows.values()]
+            ).delete()
+
+
+def refresh_flight_route_days(flight_ids):
+    """Recompute the days of flights known only by id."""
+    refresh_route_days(
+        (route_id, departure_time.date())
+        for route_id, departure_time in Flight.objects.filter(
+            pk__in=flight_ids
+        ).values_list("route_id", "departure_time")
+    )
+
+
+def rebuild_route_days(routes=None, start=None, end=None):
+    """Rebuild the availability from scratch, optionally for some routes
+    and departure days from ``start`` until ``end`` (end excluded).
+
+    Returns the number of route days written.
+    """
+    rows = RouteDayAvailability.objects.all()
+    flights = Flight.objects.all()
+    if routes is not None:
+        rows = rows.filter(route_id__in=routes)
+        flights = flights.filter(route_id__in=routes)
+    if start is not None:
+        rows = rows.filter(date__gte=start)
+        flights = flights.filter(departure_time__gte=_midnight(start))
+    if end is not None:
+        rows = rows.filter(date__lt=end)
+        flights = flights.filter(departure_time__lt=_midnight(end))
+
+    written = 0
+    with transaction.atomic(savepoint=False):
+        rows.delete()
+        totals = _daily_totals(flights).iterator(REBUILD_BATCH_SIZE)
+        while batch := list(islice(totals, REBUILD_BATCH_SIZE)):
+            RouteDayAvailability.objects.bulk_create(
+                RouteDayAvailability(**total) for total in batch
+            )
+            written += len(batch)
+    return written
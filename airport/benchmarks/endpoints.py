@@ -0,0 +1,420 @@
+import json
+import logging
+import math
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from statistics import mean
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from airport.models import Flight, Order, Route, Ticket, TicketClass
+
+logger = logging.getLogger("airport.benchmarks")
+
+BENCHMARK_USER_EMAIL = "benchmark@example.com"
+DETAIL_SAMPLE_SIZE = 100
+
+# ``url`` and ``data`` are callables receiving the request number, so a
+# scenario can rotate through objects or hand out a unique seat each time.
+Scenario = namedtuple("Scenario", ["name", "method", "url", "data"])
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of already sorted ``values``."""
+    if not values:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
+
+
+@contextmanager
+def throttling_disabled():
+    """Turn DRF throttles off for requests served in this process."""
+    get_throttles = APIView.get_throttles
+    APIView.get_throttles = lambda view: []
+    try:
+        yield
+    finally:
+        APIView.get_throttles = get_throttles
+
+
+def get_benchmark_user(email=BENCHMARK_USER_EMAIL):
+    user, created = get_user_model().objects.get_or_create(email=email)
+    if created:
+        user.set_unusable_password()
+        user.save()
+    return user
+
+
+class ClientTransport:
+    """Sends requests through the Django test client, counting queries.
+
+    Every worker thread gets its own client, and Django gives every thread
+    its own database connection, so query counts are per request.
+    """
+
+    def __init__(self, token):
+        self.token = token
+        self.local = threading.local()
+
+    def _client(self):
+        if not hasattr(self.local, "client"):
+            self.local.client = Client(
+                HTTP_HOST="127.0.0.1",
+                HTTP_AUTHORIZATION=f"Bearer {self.token}",
+            )
+        return self.local.client
+
+    def request(self, method, url, data=None):
+        send = getattr(self._client(), method.lower())
+        kwargs = {} if data is None else {
+            "data": data, "content_type": "application/json"
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = send(url, **kwargs)
+        return response.status_code, len(queries)
+
+    def close(self):
+        connection.close()
+
+
+class HttpTransport:
+    """Sends requests to a running server; query counts are unknown."""
+
+    def __init__(self, token, base_url):
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, url, data=None):
+        request = urllib.request.Request(
+            self.base_url + url,
+            method=method,
+            data=None if data is None else json.dumps(data).encode(),
+            headers={
+                "Authorization": f"Bearer {self.token}",
+                "Content-Type": "application/json",
+            },
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as error:
+            return error.code, None
+
+    def close(self):
+        pass
+
+
+class SeatPool:
+    """Free seats of one flight, handed out once each across threads."""
+
+    def __init__(self, flight):
+        self.flight = flight
+        taken = set(
+            Ticket.objects.filter(flight=flight).values_list("row", "seat")
+        )
+        self.seats = [
+            (row, seat)
+            for row in range(flight.airplane.rows, 0, -1)
+            for seat in range(flight.airplane.seats_in_row, 0, -1)
+            if (row, seat) not in taken
+        ]
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.seats)
+
+    def order_data(self, ticket_class):
+        with self.lock:
+            row, seat = self.seats.pop()
+        return {"tickets": [{
+            "row": row,
+            "seat": seat,
+            "flight": self.flight.id,
+            "ticket_class": ticket_class,
+        }]}
+
+
+def build_scenarios(requests):
+    """Scenarios for the main endpoints, using objects already in the DB.
+
+    Returns the scenarios and ``{name: reason}`` of those that cannot run
+    against this database.
+    """
+    flight_ids = list(
+        Flight.objects.order_by("id").values_list("id", flat=True)[
+            :DETAIL_SAMPLE_SIZE
+        ]
+    )
+    if not flight_ids:
+        raise ValueError("No flights found, seed the database first.")
+    flight = (
+        Flight.objects.select_related("airplane")
+        .with_tickets_available()
+        .order_by("-tickets_available", "id")
+        .first()
+    )
+    route = Route.objects.get(pk=flight.route_id)
+    date = flight.departure_time.date().isoformat()
+    ticket_class = TicketClass.objects.values_list("name", flat=True).first()
+
+    flight_url = reverse("airport:flight-list")
+    order_url = reverse("airport:order-list")
+
+    def fixed(url):
+        return lambda number: url
+
+    def no_data(number):
+        return None
+
+    scenarios = [
+        Scenario(
+            "flight-list", "GET", fixed(f"{flight_url}?pagination=page"),
+            no_data,
+        ),
+        Scenario(
+            "flight-list-cursor", "GET",
+            fixed(f"{flight_url}?pagination=cursor"), no_data,
+        ),
+        Scenario(
+            "flight-filter", "GET",
+            fixed(f"{flight_url}?pagination=page"
+                  f"&route={route.id}&departure_date={date}"),
+            no_data,
+        ),
+        Scenario(
+            "flight-detail", "GET",
+            lambda number: reverse(
+                "airport:flight-detail",
+                args=[flight_ids[number % len(flight_ids)]],
+            ),
+            no_data,
+        ),
+        Scenario(
+            "flight-seat-map", "GET",
+            lambda number: reverse(
+                "airport:flight-seat-map",
+                args=[flight_ids[number % len(flight_ids)]],
+            ),
+            no_data,
+        ),
+        Scenario(
+            "flight-search", "GET",
+            fixed(f"{reverse('airport:flight-search')}"
+                  f"?from={route.source_id}&to={route.destination_id}"
+                  f"&date={date}&max_stops=1"),
+            no_data,
+        ),
+        Scenario(
+            "flight-list-async", "GET",
+            fixed(f"{reverse('airport:flight-list-async')}?pagination=page"),
+            no_data,
+        ),
+        Scenario(
+            "flight-detail-async", "GET",
+            lambda number: reverse(
+                "airport:flight-detail-async",
+                args=[flight_ids[number % len(flight_ids)]],
+            ),
+            no_data,
+        ),
+        Scenario(
+            "flight-seat-map-async", "GET",
+            lambda number: reverse(
+                "airport:flight-seat-map-async",
+                args=[flight_ids[number % len(flight_ids)]],
+            ),
+            no_data,
+        ),
+        Scenario(
+            "order-list", "GET", fixed(f"{order_url}?pagination=page"),
+            no_data,
+        ),
+    ]
+    skipped = {}
+    seats = SeatPool(flight)
+    if ticket_class is None:
+        skipped["order-create"] = "no ticket classes"
+    elif len(seats) < requests:
+        skipped["order-create"] = (
+            f"{len(seats)} free seats on the emptiest flight, "
+            f"{requests} requests need one each"
+        )
+    else:
+        scenarios.append(Scenario(
+            "order-create", "POST", fixed(order_url),
+            lambda number: seats.order_data(ticket_class),
+        ))
+    scenarios.extend(
+        Scenario(
+            f"{basename}-list", "GET",
+            fixed(reverse(f"airport:{basename}-list")), no_data,
+        )
+        for basename in (
+            "airport", "route", "ticketclass", "airplanetype", "crew"
+        )
+    )
+    return scenarios, skipped
+
+
+def run_scenario(transport, scenario, requests, concurrency, warmup):
+    """Run one scenario and summarize its latencies, statuses and queries.
+
+    Latencies are those of 2xx responses only: a throttled or failed
+    request returns early and would flatter the percentiles. The others
+    are counted as ``non_2xx``.
+    """
+    for number in range(warmup):
+        transport.request(
+            scenario.method,
+            scenario.url(number),
+            scenario.data(number),
+        )
+
+    numbers = iter(range(warmup, warmup + requests))
+    numbers_lock = threading.Lock()
+    results = []
+
+    def worker():
+        while True:
+            with numbers_lock:
+                number = next(numbers, None)
+            if number is None:
+                return
+            url = scenario.url(number)
+            data = scenario.data(number)
+            start = time.perf_counter()
+            status, queries = transport.request(scenario.method, url, data)
+            results.append((time.perf_counter() - start, status, queries))
+
+    def thread_worker():
+        try:
+            worker()
+        finally:
+            transport.close()
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        worker()
+    else:
+        with ThreadPoolExecutor(concurrency) as executor:
+            for future in [
+                executor.submit(thread_worker) for _ in range(concurrency)
+            ]:
+                future.result()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(
+        latency * 1000
+        for latency, status, _ in results
+        if 200 <= status < 300
+    )
+    statuses = Counter(status for _, status, _ in results)
+    queries = [count for _, _, count in results if count is not None]
+    non_2xx = requests - len(latencies)
+    if non_2xx:
+        logger.warning(
+            "%s: %d of %d responses were not 2xx (%s)",
+            scenario.name,
+            non_2xx,
+            requests,
+            ", ".join(
+                f"{status}: {count}"
+                for status, count in sorted(statuses.items())
+                if not 200 <= status < 300
+            ),
+        )
+    return {
+        "method": scenario.method,
+        "url": scenario.url(warmup),
+        "requests": requests,
+        "non_2xx": non_2xx,
+        "statuses": {
+            str(status): count for status, count in sorted(statuses.items())
+        },
+        "throughput_rps": round(requests / elapsed, 2),
+        "latency_ms": {
+            "min": round(latencies[0], 3),
+            "mean": round(mean(latencies), 3),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3),
+        } if latencies else None,
+        "queries": {
+            "mean": round(mean(queries), 2),
+            "max": max(queries),
+        } if queries else None,
+    }
+
+
+def run_benchmark(
+    requests=100,
+    concurrency=1,
+    warmup=5,
+    endpoints=None,
+    base_url=None,
+    email=BENCHMARK_USER_EMAIL,
+):
+    """Benchmark every scenario and return a JSON-serializable report.
+
+    Orders created by the ``order-create`` scenario are deleted afterwards,
+    so repeated runs see the same database. Scenarios that cannot run are
+    logged and listed under ``skipped``.
+    """
+    user = get_benchmark_user(email)
+    token = str(RefreshToken.for_user(user).access_token)
+    transport = (
+        HttpTransport(token, base_url) if base_url
+        else ClientTransport(token)
+    )
+    last_order_id = (
+        Order.objects.order_by("-id").values_list("id", flat=True).first()
+        or 0
+    )
+
+    scenarios, skipped = build_scenarios(warmup + requests)
+    if endpoints:
+        scenarios = [
+            scenario for scenario in scenarios if scenario.name in endpoints
+        ]
+        skipped = {
+            name: reason
+            for name, reason in skipped.items()
+            if name in endpoints
+        }
+    for name, reason in skipped.items():
+        logger.warning("Skipping %s: %s", name, reason)
+
+    results = {}
+    try:
+        with throttling_disabled():
+            for scenario in scenarios:
+                results[scenario.name] = run_scenario(
+                    transport, scenario, requests, concurrency, warmup
+                )
+    finally:
+        Order.objects.filter(user=user, id__gt=last_order_id).delete()
+
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "target": base_url or "django-test-client",
+        "requests": requests,
+        "concurrency": concurrency,
+        "warmup": warmup,
+        "flights": Flight.objects.count(),
+        "endpoints": results,
+        "skipped": skipped,
+    }
@@ -0,0 +1,318 @@
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from airport.fares import attach_fares
+from airport.models import (
+    Airline,
+    Airplane,
+    AirplaneType,
+    Airport,
+    Crew,
+    Flight,
+    Order,
+    Route,
+    Ticket,
+    TicketClass,
+)
+from airport.serializers import (
+    FlightDetailSerializer,
+    FlightListSerializer,
+    OrderListSerializer,
+    RouteSerializer,
+)
+
+FIRST_DEPARTURE = datetime(2030, 1, 1, 6)
+CREW_PER_FLIGHT = 4
+TAKEN_PLACES_PER_FLIGHT = 20
+TICKETS_PER_ORDER = 3
+
+
+# Fixtures: unsaved model instances with primary keys and prefetch caches
+# filled in, shaped like what the viewsets hand to the serializers.
+
+def make_airports(count):
+    return [
+        Airport(id=number, name=f"Airport {number}",
+                closest_big_city=f"City {number}")
+        for number in range(1, count + 1)
+    ]
+
+
+def make_routes(count):
+    airports = make_airports(count + 1)
+    return [
+        Route(
+            id=number,
+            source=airports[number - 1],
+            destination=airports[number],
+            distance=100 + number % 3000,
+        )
+        for number in range(1, count + 1)
+    ]
+
+
+def make_flights(count):
+    airplane = Airplane(
+        id=1,
+        name="Airbus A320",
+        rows=30,
+        seats_in_row=6,
+        airplane_type=AirplaneType(id=1, name="Narrow-body"),
+        airline=Airline(id=1, name="SkyUp"),
+    )
+    ticket_class = TicketClass(id=1, name=TicketClass.ECONOMY)
+    crew = [
+        Crew(id=number, first_name=f"Crew{number}", last_name="Member",
+             position="Flight Attendant")
+        for number in range(1, CREW_PER_FLIGHT + 1)
+    ]
+    flights = []
+    for number, route in enumerate(make_routes(count), start=1):
+        departure_time = FIRST_DEPARTURE + timedelta(hours=number)
+        flight = Flight(
+            id=number,
+            route=route,
+            airplane=airplane,
+            departure_time=departure_time,
+            arrival_time=departure_time + timedelta(minutes=95),
+            tickets_sold=TAKEN_PLACES_PER_FLIGHT,
+        )
+        flight.tickets_available = (
+            airplane.total_seats - TAKEN_PLACES_PER_FLIGHT
+        )
+        flight._prefetched_objects_cache = {
+            "crew": crew,
+            "tickets": [
+                Ticket(
+                    id=number * TAKEN_PLACES_PER_FLIGHT + seat,
+                    row=seat // airplane.seats_in_row + 1,
+                    seat=seat % airplane.seats_in_row + 1,
+                    flight=flight,
+                    ticket_class=ticket_class,
+                )
+                for seat in range(TAKEN_PLACES_PER_FLIGHT)
+            ],
+        }
+        flights.append(flight)
+    return flights
+
+
+def make_orders(count):
+    flights = make_flights(count)
+    orders = []
+    for number, flight in enumerate(flights, start=1):
+        order = Order(
+            id=number,
+            user_id=1,
+            created_at=FIRST_DEPARTURE - timedelta(days=1, minutes=number),
+        )
+        order._prefetched_objects_cache = {
+            "tickets": flight.tickets.all()[:TICKETS_PER_ORDER],
+        }
+        orders.append(order)
+    return orders
+
+
+# Hand-written equivalents of the serializers above, kept as the baseline
+# any faster implementation is compared with.
+
+def datetime_data(value):
+    value = value.isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def airport_data(airport):
+    return {
+        "id": airport.id,
+        "name": airport.name,
+        "closest_big_city": airport.closest_big_city,
+    }
+
+
+def route_data(route):
+    return {
+        "id": route.id,
+        "source": airport_data(route.source),
+        "destination": airport_data(route.destination),
+        "distance": route.distance,
+    }
+
+
+def crew_data(crew):
+    return {
+        "id": crew.id,
+        "full_name": crew.full_name,
+        "position": crew.position,
+    }
+
+
+def airplane_data(airplane):
+    return {
+        "id": airplane.id,
+        "name": airplane.name,
+        "rows": airplane.rows,
+        "seats_in_row": airplane.seats_in_row,
+        "total_seats": airplane.total_seats,
+        "airplane_type": airplane.airplane_type_id,
+        "airline": airplane.airline_id,
+    }
+
+
+def fares_data(flight):
+    attach_fares([flight])
+    return flight.fares
+
+
+def flight_list_data(flight):
+    return {
+        "id": flight.id,
+        "route": flight.route_id,
+        "airplane": flight.airplane_id,
+        "departure_time": datetime_data(flight.departure_time),
+        "arrival_time": datetime_data(flight.arrival_time),
+        "crew": [crew_data(crew) for crew in flight.crew.all()],
+        "duration": flight.duration,
+        "tickets_available": flight.tickets_available,
+        "fares": fares_data(flight),
+    }
+
+
+def flight_detail_data(flight):
+    return {
+        "id": flight.id,
+        "route": route_data(flight.route),
+        "airplane": airplane_data(flight.airplane),
+        "crew": [crew_data(crew) for crew in flight.crew.all()],
+        "departure_time": datetime_data(flight.departure_time),
+        "arrival_time": datetime_data(flight.arrival_time),
+        "taken_places": [
+            {"row": ticket.row, "seat": ticket.seat}
+            for ticket in flight.tickets.all()
+        ],
+    }
+
+
+def order_list_data(order):
+    return {
+        "id": order.id,
+        "tickets": [
+            {
+                "id": ticket.id,
+                "row": ticket.row,
+                "seat": ticket.seat,
+                "flight": flight_list_data(ticket.flight),
+                "ticket_class": ticket.ticket_class.name,
+                "price": (
+                    None if ticket.price is None else str(ticket.price)
+                ),
+            }
+            for ticket in order.tickets.all()
+        ],
+        "created_at": datetime_data(order.created_at),
+    }
+
+
+Case = namedtuple(
+    "Case", ["name", "serializer_class", "fixture", "alternatives"]
+)
+
+CASES = {
+    case.name: case
+    for case in (
+        Case("route", RouteSerializer, make_routes, {"dict": route_data}),
+        Case(
+            "flight-list", FlightListSerializer, make_flights,
+            {"dict": flight_list_data},
+        ),
+        Case(
+            "flight-detail", FlightDetailSerializer, make_flights,
+            {"dict": flight_detail_data},
+        ),
+        Case(
+            "order-list", OrderListSerializer, make_orders,
+            {"dict": order_list_data},
+        ),
+    )
+}
+
+
+def serializer_runner(serializer_class):
+    def run(objects):
+        return serializer_class(many=True).to_representation(objects)
+    return run
+
+
+def alternative_runner(function):
+    def run(objects):
+        return [function(instance) for instance in objects]
+    return run
+
+
+def measure(run, fixture, size, repeat):
+    """Best time of ``repeat`` runs, and the peak memory of one more.
+
+    Every run gets fixtures built anew, outside of the timing: serializing
+    leaves the fares attached to the flights, and later runs would skip
+    pricing them.
+    """
+    timings = []
+    for _ in range(repeat):
+        objects = fixture(size)
+        start = time.perf_counter()
+        run(objects)
+        timings.append(time.perf_counter() - start)
+
+    objects = fixture(size)
+    tracemalloc.start()
+    try:
+        run(objects)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        "total_ms": round(best * 1000, 3),
+        "per_object_us": round(best / size * 1_000_000, 3),
+        "peak_kib": round(peak / 1024, 1),
+        "peak_bytes_per_object": round(peak / size),
+    }
+
+
+def compare(case, sizes=(1, 10, 100, 1000), repeat=5, alternatives=None):
+    """Time the DRF serializer and every alternative on each fixture size.
+
+    ``alternatives`` maps a name to a per-object function and defaults to
+    the case's own; each alternative's output is checked against the
+    serializer's so a faster implementation cannot silently drift.
+    """
+    if alternatives is None:
+        alternatives = case.alternatives
+    runners = {"drf": serializer_runner(case.serializer_class)}
+    runners.update(
+        (name, alternative_runner(function))
+        for name, function in alternatives.items()
+    )
+
+    results = []
+    for size in sizes:
+        expected = runners["drf"](case.fixture(size))
+        baseline = None
+        for name, run in runners.items():
+            result = {
+                "serializer": case.name,
+                "implementation": name,
+                "size": size,
+                **measure(run, case.fixture, size, repeat),
+                "matches": run(case.fixture(size)) == expected,
+            }
+            baseline = baseline or result["total_ms"]
+            result["speedup"] = round(
+                baseline / result["total_ms"], 2
+            ) if result["total_ms"] else None
+            results.append(result)
+    return results
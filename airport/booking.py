@@ -0,0 +1,190 @@
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import ValidationError
+
+from airport.availability import (
+    refresh_flight_route_days,
+    refresh_route_days,
+    route_day,
+)
+from airport.fares import get_fare
+from airport.models import Flight, Order, Ticket, TicketClass
+
+
+def _load_flights(flight_ids):
+    flights = Flight.objects.select_related("airplane", "route").in_bulk(
+        flight_ids
+    )
+    missing = sorted(set(flight_ids) - set(flights))
+    if missing:
+        raise ValidationError(
+            {"tickets": f"Flights do not exist: {missing}"}
+        )
+    return flights
+
+
+def _load_ticket_classes(names):
+    ticket_classes = TicketClass.objects.in_bulk(names, field_name="name")
+    missing = sorted(set(names) - set(ticket_classes))
+    if missing:
+        raise ValidationError(
+            {"tickets": f"Ticket classes do not exist: {missing}"}
+        )
+    return ticket_classes
+
+
+def _validate_seats(tickets_data, flights):
+    requested = set()
+    for ticket_data in tickets_data:
+        Ticket.validate_ticket(
+            ticket_data["row"],
+            ticket_data["seat"],
+            flights[ticket_data["flight_id"]].airplane,
+            ValidationError,
+        )
+        key = (
+            ticket_data["flight_id"], ticket_data["row"], ticket_data["seat"]
+        )
+        if key in requested:
+            raise ValidationError(
+                {"tickets": f"Seat {key[1]}-{key[2]} on flight {key[0]} "
+                            f"is requested more than once."}
+            )
+        requested.add(key)
+
+    taken = list(
+        Ticket.objects.filter(
+            reduce(or_, (
+                Q(flight_id=flight_id, row=row, seat=seat)
+                for flight_id, row, seat in requested
+            ))
+        ).values_list("flight_id", "row", "seat")
+    )
+    if taken:
+        raise ValidationError(
+            {"tickets": [
+                f"Seat {row}-{seat} on flight {flight_id} is already taken."
+                for flight_id, row, seat in sorted(taken)
+            ]}
+        )
+
+
+def change_tickets_sold(counts):
+    """Atomically add ``{flight_id: delta}`` to the flights' counters."""
+    counts = {flight_id: delta for flight_id, delta in counts.items() if delta}
+    if not counts:
+        return
+    Flight.objects.filter(pk__in=counts).update(
+        tickets_sold=F("tickets_sold") + Case(
+            *(
+                When(pk=flight_id, then=Value(delta))
+                for flight_id, delta in counts.items()
+            ),
+            default=Value(0),
+        )
+    )
+
+
+def count_tickets_per_flight(tickets):
+    return dict(
+        tickets.order_by()
+        .values_list("flight_id")
+        .annotate(count=Count("pk"))
+    )
+
+
+def release_seats(counts):
+    """Give ``{flight_id: tickets}`` seats of deleted tickets back.
+
+    Counters and route days change once per flight, however many of its
+    tickets go.
+    """
+    change_tickets_sold(
+        {flight_id: -count for flight_id, count in counts.items()}
+    )
+    refresh_flight_route_days(counts)
+
+
+def recount_tickets_sold(flights=None):
+    """Recompute ``Flight.tickets_sold`` from tickets in one statement.
+
+    Returns the number of flights whose counter was out of date.
+    """
+    flights = Flight.objects.all() if flights is None else flights
+    sold = Coalesce(
+        Subquery(
+            Ticket.objects.filter(flight=OuterRef("pk"))
+            .order_by()
+            .values("flight")
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+    return flights.exclude(tickets_sold=sold).update(tickets_sold=sold)
+
+
+def create_order(tickets_data, **order_data):
+    """Create an order with all its tickets in a fixed number of queries.
+
+    Every referenced flight (with its airplane) and ticket class is loaded
+    once, seat ranges are checked in memory, collisions with already sold
+    seats are found with a single query, the tickets are inserted with
+    one ``bulk_create`` and the flights' ``tickets_sold`` counters are
+    bumped with one update, so the cost does not grow with the ticket count.
+    The availability of the flights' route days is refreshed with them.
+    Every ticket is priced at the fare of its flight when ordered.
+    """
+    flights = _load_flights({data["flight_id"] for data in tickets_data})
+    ticket_classes = _load_ticket_classes(
+        {data["ticket_class"] for data in tickets_data}
+    )
+    _validate_seats(tickets_data, flights)
+
+    with transaction.atomic():
+        order = Order.objects.create(**order_data)
+        tickets = [
+            Ticket(
+                order=order,
+                flight=flights[data["flight_id"]],
+                row=data["row"],
+                seat=data["seat"],
+                ticket_class=ticket_classes[data["ticket_class"]],
+                price=get_fare(
+                    flights[data["flight_id"]],
+                    ticket_classes[data["ticket_class"]],
+                ),
+            )
+            for data in tickets_data
+        ]
+        try:
+            with transaction.atomic():
+                Ticket.objects.bulk_create(tickets)
+        except IntegrityError:
+            raise ValidationError(
+                {"tickets": "Some of the seats were just taken, "
+                            "please choose other seats."}
+            )
+        change_tickets_sold(
+            Counter(data["flight_id"] for data in tickets_data)
+        )
+        refresh_route_days(route_day(flight) for flight in flights.values())
+
+    # Tickets are already in memory, so serializing the order
+    # response must not query them again.
+    order._prefetched_objects_cache = {"tickets": tickets}
+    return order
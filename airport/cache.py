@@ -0,0 +1,57 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+TABLE_VERSION_KEY = "airport:table-version:{}"
+
+_last_version = 0.0
+
+
+def _new_version():
+    """Current timestamp, strictly increasing within the process."""
+    global _last_version
+    _last_version = max(time.time(), _last_version + 1e-6)
+    return _last_version
+
+
+def _version_key(model):
+    return TABLE_VERSION_KEY.format(model._meta.label_lower)
+
+
+def get_table_versions(*models):
+    """Return the current version of every model's table.
+
+    A version is the timestamp of the last write to the table, shared
+    between workers through the default cache. Tables without a stored
+    version get one now, which is always safe: it only invalidates.
+    """
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def format_table_version(versions):
+    return "-".join(f"{version:.6f}" for version in versions)
+
+
+def get_table_version(*models):
+    """Combined version string of one or more tables."""
+    return format_table_version(get_table_versions(*models))
+
+
+def bump_table_version(model):
+    """Mark the model's table as changed, now and again after commit.
+
+    The second bump makes sure readers that loaded the table between the
+    write and the commit do not keep the stale data.
+    """
+    key = _version_key(model)
+    cache.set(key, _new_version(), timeout=None)
+    transaction.on_commit(
+        lambda: cache.set(key, _new_version(), timeout=None)
+    )
@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+
+REPLICA_PIN_KEY = "airport:replica-pin:{}"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_current_routing = ContextVar("airport_routing", default=None)
+
+
+class RequestRouting:
+    __slots__ = ("use_replica", "wrote")
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+class ReplicaRouter:
+    """Send reads of safe requests to a replica, everything else to default.
+
+    Outside of ``ReplicaRoutingMiddleware`` (management commands, unsafe
+    requests, requests of recently pinned clients) every query goes to
+    the primary, so only reads that can tolerate replication lag move.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _current_routing.get()
+        replicas = getattr(settings, "DATABASE_REPLICAS", ())
+        if routing is not None and routing.use_replica and replicas:
+            return random.choice(replicas)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        routing = _current_routing.get()
+        if routing is not None:
+            routing.wrote = True
+            # Reads after a write in the same request see it.
+            routing.use_replica = False
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+@contextmanager
+def primary_reads():
+    """Send the reads inside the block to the primary.
+
+    Data cached under a table version (the route graph, cached lists) is
+    built this way: a replica that has not replayed the write behind the
+    new version yet would otherwise have its stale rows cached under it,
+    and served by every worker until the next write.
+    """
+    routing = _current_routing.get()
+    if routing is None or not routing.use_replica:
+        yield
+        return
+    routing.use_replica = False
+    try:
+        yield
+    finally:
+        routing.use_replica = not routing.wrote
+
+
+def get_client_key(request):
+    """Identify the client by its credentials, or its address without."""
+    credentials = request.headers.get("Authorization") or request.META.get(
+        "REMOTE_ADDR", ""
+    )
+    return hashlib.sha256(credentials.encode()).hexdigest()[:32]
+
+
+class ReplicaRoutingMiddleware:
+    """Route the reads of safe requests to ``DATABASE_REPLICAS``.
+
+    A client whose request wrote to the database is pinned to the primary
+    for ``REPLICA_PIN_SECONDS``, so it reads its own writes (a new order
+    and its tickets) even while the replicas lag behind. Pins live in the
+    shared cache, so they hold whichever worker serves the next request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "DATABASE_REPLICAS", ()):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, "REPLICA_PIN_SECONDS", 5)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        pin_key = REPLICA_PIN_KEY.format(get_client_key(request))
+        routing = RequestRouting(
+            use_replica=request.method in SAFE_METHODS
+            and not cache.get(pin_key)
+        )
+        token = _current_routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_routing.reset(token)
+        if routing.wrote:
+            cache.set(pin_key, True, self.pin_seconds)
+        return response
+
+    async def __acall__(self, request):
+        pin_key = REPLICA_PIN_KEY.format(get_client_key(request))
+        routing = RequestRouting(
+            use_replica=request.method in SAFE_METHODS
+            and not await cache.aget(pin_key)
+        )
+        token = _current_routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_routing.reset(token)
+        if routing.wrote:
+            await cache.aset(pin_key, True, self.pin_seconds)
+        return response
@@ -0,0 +1,143 @@
+import csv
+from datetime import date, datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+
+from airport.models import Ticket
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+FLIGHT_EXPORT_FIELDS = (
+    "id",
+    "route_id",
+    "source_id",
+    "destination_id",
+    "airplane_id",
+    "departure_time",
+    "arrival_time",
+    "tickets_sold",
+    "tickets_available",
+)
+TICKET_EXPORT_FIELDS = (
+    "order_id",
+    "order_created_at",
+    "user_id",
+    "ticket_id",
+    "flight_id",
+    "row",
+    "seat",
+    "ticket_class_name",
+)
+
+
+class Echo:
+    """File-like object for csv.writer that hands back every line."""
+
+    def write(self, value):
+        return value
+
+
+def _ndjson_lines(rows, fields):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(row) + "\n"
+
+
+def _csv_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(rows, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_csv_value(row[field]) for field in fields])
+
+
+def _chunks(lines, size=EXPORT_CHUNK_SIZE):
+    """Join lines into larger pieces so the server writes less often."""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def get_export_format(request):
+    # ``format`` is taken by DRF's format suffix negotiation.
+    export_format = request.query_params.get("export_format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        raise ValidationError(
+            {"export_format": f"Must be one of: {EXPORT_FORMATS}"}
+        )
+    return export_format
+
+
+def stream_export(rows, fields, export_format, filename):
+    """Stream ``rows`` (dicts with ``fields``) as NDJSON or CSV."""
+    lines = _csv_lines if export_format == "csv" else _ndjson_lines
+    response = StreamingHttpResponse(
+        _chunks(lines(rows, fields)),
+        content_type=CONTENT_TYPES[export_format],
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{export_format}"'
+    )
+    return response
+
+
+def flight_export_rows(flights):
+    """Flights with availability, read through a server-side cursor.
+
+    ``flights`` must be annotated with ``tickets_available``; related
+    objects are read as plain ids so no model instances are built.
+    """
+    return (
+        flights.prefetch_related(None)
+        .values(
+            "id",
+            "route_id",
+            "airplane_id",
+            "departure_time",
+            "arrival_time",
+            "tickets_sold",
+            "tickets_available",
+            source_id=F("route__source_id"),
+            destination_id=F("route__destination_id"),
+        )
+        .order_by("id")
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def ticket_export_rows(tickets=None):
+    """Every ticket with its order, one row per ticket, grouped by order."""
+    if tickets is None:
+        tickets = Ticket.objects.all()
+    return (
+        tickets.values(
+            "order_id",
+            "flight_id",
+            "row",
+            "seat",
+            order_created_at=F("order__created_at"),
+            user_id=F("order__user_id"),
+            ticket_id=F("id"),
+            ticket_class_name=F("ticket_class__name"),
+        )
+        .order_by("order_id", "id")
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
@@ -0,0 +1,153 @@
+import hashlib
+from bisect import bisect_right
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from airport.cache import get_table_version
+from airport.db_router import primary_reads
+from airport.models import Route, TicketClass
+
+FARES_KEY = "airport:fares:{}:{}:{}:{}:{}:{}"
+TICKET_CLASSES_KEY = "airport:fare-classes:{}"
+CENT = Decimal("0.01")
+
+
+def _load_curve():
+    points = sorted(settings.FARE_LOAD_CURVE)
+    return [load for load, _ in points], [factor for _, factor in points]
+
+
+def load_factor_multiplier(sold, capacity, curve=None):
+    """Price multiplier for a flight with ``sold`` of ``capacity`` seats.
+
+    ``FARE_LOAD_CURVE`` lists ``(load, multiplier)`` points, interpolated
+    linearly in between and held flat outside of them.
+    """
+    loads, factors = curve or _load_curve()
+    load = min(max(sold / capacity, 0.0), 1.0) if capacity > 0 else 1.0
+    index = bisect_right(loads, load)
+    if index == 0:
+        return factors[0]
+    if index == len(loads):
+        return factors[-1]
+    start, end = loads[index - 1], loads[index]
+    share = (load - start) / (end - start)
+    return factors[index - 1] + share * (factors[index] - factors[index - 1])
+
+
+def base_fare(distance):
+    return settings.FARE_BASE + settings.FARE_PER_KM * distance
+
+
+def compute_fare(distance, price_multiplier, sold, capacity, curve=None):
+    """Fare of one seat, rounded to cents."""
+    multiplier = Decimal(str(
+        price_multiplier * load_factor_multiplier(sold, capacity, curve)
+    ))
+    return (base_fare(distance) * multiplier).quantize(
+        CENT, rounding=ROUND_HALF_UP
+    )
+
+
+def _pricing_inputs(flight):
+    """Distance, sold seats and capacity of a flight.
+
+    Flights annotated ``with_tickets_available`` get their capacity from
+    the annotation, so the airplane does not have to be loaded.
+    """
+    sold = flight.tickets_sold
+    if hasattr(flight, "tickets_available"):
+        capacity = flight.tickets_available + sold
+    else:
+        capacity = flight.airplane.rows * flight.airplane.seats_in_row
+    return flight.route.distance, sold, capacity
+
+
+def get_fare(flight, ticket_class):
+    """Current fare of a seat of ``ticket_class`` on ``flight``."""
+    distance, sold, capacity = _pricing_inputs(flight)
+    return compute_fare(
+        distance, ticket_class.price_multiplier, sold, capacity
+    )
+
+
+def _pricing_settings_hash():
+    """Short hash of the fare settings, so a deploy changing them reprices."""
+    pricing = repr((
+        settings.FARE_BASE,
+        settings.FARE_PER_KM,
+        sorted(settings.FARE_LOAD_CURVE),
+    ))
+    return hashlib.md5(pricing.encode()).hexdigest()[:8]
+
+
+def _get_ticket_classes(version):
+    """``(name, price_multiplier)`` of every class, cached per version."""
+    key = TICKET_CLASSES_KEY.format(version)
+    ticket_classes = cache.get(key)
+    if ticket_classes is None:
+        # A lagging replica would cache old multipliers under the new
+        # version.
+        with primary_reads():
+            ticket_classes = list(
+                TicketClass.objects.order_by("id").values_list(
+                    "name", "price_multiplier"
+                )
+            )
+        cache.set(key, ticket_classes, settings.FARE_CACHE_TIMEOUT)
+    return ticket_classes
+
+
+def attach_fares(flights):
+    """Set ``flight.fares`` to ``{ticket class: fare}`` for every flight.
+
+    The page is priced in one pass: cached fares are fetched with a single
+    ``get_many``, the ticket classes are loaded once and only the missing
+    flights are computed. Keys hold every input of the price (the sold
+    seats and capacity of the flight, the Route and TicketClass table
+    versions, a hash of the fare settings), so a sale or a repricing moves
+    the flight to a new key instead of having to invalidate the old one.
+    Flights that already carry fares are left alone, which lets nested
+    serializers call this again for free.
+    """
+    flights = [flight for flight in flights if not hasattr(flight, "fares")]
+    if not flights:
+        return
+
+    version = get_table_version(TicketClass, Route)
+    pricing = _pricing_settings_hash()
+    keys = {}
+    for flight in flights:
+        distance, sold, capacity = _pricing_inputs(flight)
+        keys[flight.pk] = (
+            FARES_KEY.format(
+                pricing, version, flight.pk, distance, sold, capacity
+            ),
+            distance,
+            sold,
+            capacity,
+        )
+    fares = cache.get_many([key for key, *_ in keys.values()])
+
+    missing = {
+        key: inputs for key, *inputs in keys.values() if key not in fares
+    }
+    if missing:
+        ticket_classes = _get_ticket_classes(version)
+        curve = _load_curve()
+        computed = {
+            key: {
+                name: str(compute_fare(
+                    distance, price_multiplier, sold, capacity, curve
+                ))
+                for name, price_multiplier in ticket_classes
+            }
+            for key, (distance, sold, capacity) in missing.items()
+        }
+        cache.set_many(computed, settings.FARE_CACHE_TIMEOUT)
+        fares.update(computed)
+
+    for flight in flights:
+        flight.fares = fares[keys[flight.pk][0]]
@@ -0,0 +1,240 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from airport.availability import refresh_route_days
+from airport.models import Airplane, Crew, Flight, Route
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 50
+CREW_SEPARATOR = ";"
+STAGING_TABLE = "airport_flight_import"
+
+
+def read_csv_rows(lines):
+    """Rows of ``route,airplane,departure_time,arrival_time,crew``.
+
+    ``crew`` holds crew ids separated by semicolons (ex. ``3;7;12``).
+    """
+    for row in csv.DictReader(lines):
+        crew = row.get("crew") or ""
+        row["crew"] = [
+            crew_id for crew_id in crew.split(CREW_SEPARATOR) if crew_id
+        ]
+        yield row
+
+
+def read_ndjson_rows(lines):
+    for line in lines:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield {"error": "Invalid JSON."}
+
+
+def read_flight_rows(lines, import_format):
+    if import_format == "csv":
+        return list(read_csv_rows(lines))
+    return list(read_ndjson_rows(lines))
+
+
+def _parse_row(row):
+    if not isinstance(row, dict):
+        raise ValueError("Must be an object.")
+    if "error" in row:
+        raise ValueError(row["error"])
+    try:
+        route_id = int(row["route"])
+        airplane_id = int(row["airplane"])
+        crew_ids = sorted(
+            {int(crew_id) for crew_id in row.get("crew") or []}
+        )
+    except KeyError as error:
+        raise ValueError(f"Missing {error.args[0]}.")
+    except (TypeError, ValueError):
+        raise ValueError("Route, airplane and crew must be integer ids.")
+    try:
+        departure_time = datetime.fromisoformat(row["departure_time"])
+        arrival_time = datetime.fromisoformat(row["arrival_time"])
+    except KeyError as error:
+        raise ValueError(f"Missing {error.args[0]}.")
+    except (TypeError, ValueError):
+        raise ValueError("Times must be in ISO 8601 format.")
+    if arrival_time <= departure_time:
+        raise ValueError("Arrival time must be later than departure time.")
+    return route_id, airplane_id, departure_time, arrival_time, crew_ids
+
+
+def _missing_ids(model, ids):
+    existing = set(
+        model.objects.filter(id__in=ids).values_list("id", flat=True)
+    )
+    return ids - existing
+
+
+def validate_flight_rows(rows):
+    """Parse every row and check all references with one query per table.
+
+    Returns ``(route_id, airplane_id, departure, arrival, crew_ids)``
+    tuples, or raises ``ValidationError`` listing the failing rows by
+    their 1-based position.
+    """
+    if not isinstance(rows, list):
+        raise ValidationError(
+            {"non_field_errors": ["Expected a list of flights."]}
+        )
+    flights = []
+    errors = {}
+    for number, row in enumerate(rows, start=1):
+        try:
+            flights.append(_parse_row(row))
+        except ValueError as error:
+            errors[number] = [str(error)]
+    if not errors:
+        missing = {
+            "route": _missing_ids(Route, {flight[0] for flight in flights}),
+            "airplane": _missing_ids(
+                Airplane, {flight[1] for flight in flights}
+            ),
+            "crew": _missing_ids(
+                Crew,
+                {crew_id for flight in flights for crew_id in flight[4]},
+            ),
+        }
+        for number, flight in enumerate(flights, start=1):
+            row_errors = [
+                f"{name.capitalize()} {object_id} does not exist."
+                for name, object_ids in (
+                    ("route", [flight[0]]),
+                    ("airplane", [flight[1]]),
+                    ("crew", flight[4]),
+                )
+                for object_id in object_ids
+                if object_id in missing[name]
+            ]
+            if row_errors:
+                errors[number] = row_errors
+    if not flights and not errors:
+        raise ValidationError({"rows": "At least one flight is required."})
+    if errors:
+        raise ValidationError({"rows": {
+            str(number): messages
+            for number, messages in list(errors.items())[:MAX_REPORTED_ERRORS]
+        }})
+    return flights
+
+
+def _copy(cursor, sql, data):
+    if hasattr(cursor, "copy_expert"):
+        cursor.copy_expert(sql, data)
+    else:
+        with cursor.copy(sql) as copy:
+            copy.write(data.read())
+
+
+def _copy_flights(flights):
+    """Load flights through a staging table filled with ``COPY``.
+
+    Ids are drawn from the flight sequence inside the staging table so the
+    flights and all their crew rows are inserted with one statement each.
+    """
+    quote = connection.ops.quote_name
+    flight_table = quote(Flight._meta.db_table)
+    through = Flight.crew.through
+    through_table = quote(through._meta.db_table)
+    flight_column = quote(through._meta.get_field("flight").column)
+    crew_column = quote(through._meta.get_field("crew").column)
+
+    data = io.StringIO()
+    writer = csv.writer(data)
+    for route_id, airplane_id, departure, arrival, crew_ids in flights:
+        writer.writerow([
+            route_id,
+            airplane_id,
+            departure.isoformat(),
+            arrival.isoformat(),
+            "{" + ",".join(map(str, crew_ids)) + "}",
+        ])
+    data.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {STAGING_TABLE} ("
+            f"route_id bigint, airplane_id bigint, "
+            f"departure_time timestamp, arrival_time timestamp, "
+            f"crew_ids bigint[]"
+            f") ON COMMIT DROP"
+        )
+        _copy(
+            cursor,
+            f"COPY {STAGING_TABLE} (route_id, airplane_id, departure_time, "
+            f"arrival_time, crew_ids) FROM STDIN WITH (FORMAT csv)",
+            data,
+        )
+        cursor.execute(
+            f"ALTER TABLE {STAGING_TABLE} ADD COLUMN flight_id bigint"
+        )
+        cursor.execute(
+            f"UPDATE {STAGING_TABLE} "
+            f"SET flight_id = nextval(pg_get_serial_sequence(%s, 'id'))",
+            [Flight._meta.db_table],
+        )
+        cursor.execute(
+            f"INSERT INTO {flight_table} (id, route_id, airplane_id, "
+            f"departure_time, arrival_time, tickets_sold) "
+            f"SELECT flight_id, route_id, airplane_id, departure_time, "
+            f"arrival_time, 0 FROM {STAGING_TABLE}"
+        )
+        cursor.execute(
+            f"INSERT INTO {through_table} ({flight_column}, {crew_column}) "
+            f"SELECT flight_id, unnest(crew_ids) FROM {STAGING_TABLE}"
+        )
+        cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+
+
+def _bulk_create_flights(flights):
+    created = Flight.objects.bulk_create(
+        (
+            Flight(
+                route_id=route_id,
+                airplane_id=airplane_id,
+                departure_time=departure,
+                arrival_time=arrival,
+            )
+            for route_id, airplane_id, departure, arrival, _ in flights
+        ),
+        batch_size=IMPORT_BATCH_SIZE,
+    )
+    Flight.crew.through.objects.bulk_create(
+        (
+            Flight.crew.through(flight_id=flight.id, crew_id=crew_id)
+            for flight, (*_, crew_ids) in zip(created, flights)
+            for crew_id in crew_ids
+        ),
+        batch_size=IMPORT_BATCH_SIZE,
+    )
+
+
+def import_flights(rows):
+    """Validate and insert flights with their crew, all or nothing.
+
+    PostgreSQL loads the rows with ``COPY``; other backends fall back to
+    batched ``bulk_create``. Returns the number of flights created.
+    """
+    flights = validate_flight_rows(rows)
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            _copy_flights(flights)
+        else:
+            _bulk_create_flights(flights)
+        refresh_route_days(
+            (route_id, departure.date())
+            for route_id, _, departure, _, _ in flights
+        )
+    return len(flights)
@@ -0,0 +1,143 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+from heapq import heappop, heappush
+from itertools import count
+
+from airport.models import Flight
+from airport.route_graph import get_route_graph
+
+MAX_STOPS = 2
+MIN_CONNECTION_TIME = timedelta(minutes=45)
+MAX_CONNECTION_TIME = timedelta(hours=24)
+MAX_ROUTE_PATHS = 10
+MAX_ITINERARIES = 20
+
+
+def _connections(flights, departures, arrival_time):
+    """Flights leaving within the allowed connection window after arrival."""
+    start = bisect_left(departures, arrival_time + MIN_CONNECTION_TIME)
+    latest = arrival_time + MAX_CONNECTION_TIME
+    for flight in flights[start:]:
+        if flight.departure_time > latest:
+            break
+        yield flight
+
+
+def _by_arrival(flights):
+    return sorted(flights, key=lambda flight: flight.arrival_time)
+
+
+def _itineraries(
+    paths, first_day_end, flights_by_route, departures_by_route, limit
+):
+    """Up to ``limit`` itineraries along ``paths``, earliest arrival first.
+
+    Partial itineraries are expanded best-first on the arrival of their
+    last leg, which further legs can only push later, so complete ones
+    come off the heap already ordered by ``(arrival_time, stops)``. Each
+    entry holds its alternatives for the last leg sorted by arrival and
+    pushes only the next one when popped, so the heap grows with the
+    itineraries looked at rather than every combination through a hub.
+    """
+    heap = []
+    order = count()
+
+    def push(route_ids, distance, legs, alternatives, index):
+        flight = alternatives[index]
+        heappush(heap, (
+            flight.arrival_time,
+            len(route_ids) - 1,
+            next(order),
+            route_ids,
+            distance,
+            legs + [flight],
+            alternatives,
+            index,
+        ))
+
+    for distance, route_ids in paths:
+        if not route_ids:
+            continue
+        first_legs = _by_arrival(
+            flight for flight in flights_by_route[route_ids[0]]
+            if flight.departure_time < first_day_end
+        )
+        if first_legs:
+            push(route_ids, distance, [], first_legs, 0)
+
+    found = []
+    while heap and len(found) < limit:
+        (
+            arrival_time, stops, _, route_ids, distance,
+            legs, alternatives, index,
+        ) = heappop(heap)
+        if index + 1 < len(alternatives):
+            push(route_ids, distance, legs[:-1], alternatives, index + 1)
+        if len(legs) == len(route_ids):
+            found.append({
+                "stops": stops,
+                "distance": distance,
+                "departure_time": legs[0].departure_time,
+                "arrival_time": arrival_time,
+                "flights": legs,
+            })
+            continue
+        route_id = route_ids[len(legs)]
+        connections = _by_arrival(_connections(
+            flights_by_route[route_id],
+            departures_by_route.get(route_id, []),
+            arrival_time,
+        ))
+        if connections:
+            push(route_ids, distance, legs, connections, 0)
+    return found
+
+
+def search_itineraries(source_id, destination_id, date, max_stops=1):
+    """Find flight connections between two airports departing on ``date``.
+
+    The route graph is walked first with a bounded shortest-path search on
+    ``Route.distance``, then only flights on the candidate routes inside
+    the travel window are fetched with a single query and chained in
+    memory honoring the minimum and maximum connection times.
+    """
+    max_legs = max_stops + 1
+    paths = get_route_graph().shortest_paths(
+        source_id, destination_id, max_legs, MAX_ROUTE_PATHS
+    )
+    if not paths:
+        return []
+
+    first_day_end = date + timedelta(days=1)
+    window_end = first_day_end + max_stops * MAX_CONNECTION_TIME
+    flights = (
+        Flight.objects.filter(
+            route_id__in={
+                route_id for _, route_ids in paths for route_id in route_ids
+            },
+            departure_time__gte=date,
+            departure_time__lt=window_end,
+        )
+        .select_related("airplane", "route")
+        .prefetch_related("crew")
+        .with_tickets_available()
+        .filter(tickets_available__gt=0)
+        .order_by("departure_time", "id")
+    )
+
+    flights_by_route = defaultdict(list)
+    for flight in flights:
+        flights_by_route[flight.route_id].append(flight)
+    departures_by_route = {
+        route_id: [flight.departure_time for flight in route_flights]
+        for route_id, route_flights in flights_by_route.items()
+    }
+
+    return _itineraries(
+        paths,
+        first_day_end,
+        flights_by_route,
+        departures_by_route,
+        MAX_ITINERARIES,
+    )
@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from airport.benchmarks.endpoints import BENCHMARK_USER_EMAIL, run_benchmark
+
+
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--endpoint", dest="endpoints", action="append",
+            help="Only run this scenario (repeatable, ex. flight-list)",
+        )
+        parser.add_argument(
+            "--base-url",
+            help="Benchmark a running server (ex. http://127.0.0.1:8000) "
+                 "instead of the in-process test client",
+        )
+        parser.add_argument("--email", default=BENCHMARK_USER_EMAIL)
+        parser.add_argument("--output", default="benchmark.json")
+
+    def handle(self, *args, **options):
+        """Measure latency percentiles, throughput and queries per endpoint"""
+        try:
+            report = run_benchmark(
+                requests=options["requests"],
+                concurrency=options["concurrency"],
+                warmup=options["warmup"],
+                endpoints=options["endpoints"],
+                base_url=options["base_url"],
+                email=options["email"],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+
+        with open(options["output"], "w") as output:
+            json.dump(report, output, indent=2)
+
+        self.stdout.write(
+            f"{'endpoint':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+            f"{'req/s':>10}{'queries':>9}{'non-2xx':>9}"
+        )
+        for name, result in report["endpoints"].items():
+            latency = result["latency_ms"] or {}
+            p50, p95, p99 = (
+                f"{latency[key]:.2f}" if latency else "-"
+                for key in ("p50", "p95", "p99")
+            )
+            queries = result["queries"]["max"] if result["queries"] else "-"
+            self.stdout.write(
+                f"{name:<22}{p50:>10}{p95:>10}{p99:>10}"
+                f"{result['throughput_rps']:>10.1f}"
+                f"{queries:>9}{result['non_2xx']:>9}"
+            )
+        for name, reason in report["skipped"].items():
+            self.stdout.write(self.style.WARNING(
+                f"{name:<22}skipped: {reason}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Report written to {options['output']}"))
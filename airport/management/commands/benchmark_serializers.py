@@ -0,0 +1,74 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from airport.benchmarks.serializers import CASES, compare
+
+
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--serializer", dest="serializers", action="append",
+            choices=sorted(CASES),
+            help="Only benchmark this serializer (repeatable)",
+        )
+        parser.add_argument(
+            "--sizes", default="1,10,100,1000",
+            type=lambda value: [int(size) for size in value.split(",")],
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--alternative", dest="alternatives", action="append",
+            default=[],
+            help="Compare with a per-object function, given as "
+                 "serializer:name=dotted.path (repeatable)",
+        )
+        parser.add_argument("--output")
+
+    def parse_alternatives(self, values):
+        alternatives = {}
+        for value in values:
+            try:
+                case, rest = value.split(":", 1)
+                name, path = rest.split("=", 1)
+                function = import_string(path)
+            except (ValueError, ImportError) as error:
+                raise CommandError(f"Invalid --alternative {value}: {error}")
+            if case not in CASES:
+                raise CommandError(f"Unknown serializer {case}")
+            alternatives.setdefault(
+                case, dict(CASES[case].alternatives)
+            )[name] = function
+        return alternatives
+
+    def handle(self, *args, **options):
+        """Compare DRF serializers with faster alternatives"""
+        alternatives = self.parse_alternatives(options["alternatives"])
+        results = []
+        for name in options["serializers"] or CASES:
+            results.extend(compare(
+                CASES[name],
+                sizes=options["sizes"],
+                repeat=options["repeat"],
+                alternatives=alternatives.get(name),
+            ))
+
+        self.stdout.write(
+            f"{'serializer':<15}{'implementation':<16}{'size':>6}"
+            f"{'total ms':>11}{'us/object':>11}{'peak KiB':>10}"
+            f"{'speedup':>9}  matches"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['serializer']:<15}{result['implementation']:<16}"
+                f"{result['size']:>6}{result['total_ms']:>11.3f}"
+                f"{result['per_object_us']:>11.2f}{result['peak_kib']:>10.1f}"
+                f"{result['speedup'] or 0:>9.2f}  {result['matches']}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f"Report written to {options['output']}"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from airport.flight_import import (
+    IMPORT_FORMATS,
+    import_flights,
+    read_flight_rows,
+)
+
+
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format", dest="import_format", choices=IMPORT_FORMATS,
+            help="Defaults to the file extension",
+        )
+
+    def handle(self, *args, **options):
+        """Bulk create flights with their crew from a CSV or NDJSON file"""
+        path = options["path"]
+        import_format = options["import_format"] or path.rsplit(".", 1)[-1]
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError(
+                f"Unknown format {import_format}, use --format"
+            )
+
+        with open(path, newline="") as schedule:
+            rows = read_flight_rows(schedule, import_format)
+        try:
+            created = import_flights(rows)
+        except ValidationError as error:
+            raise CommandError(f"Invalid rows: {error.detail}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} flights"))
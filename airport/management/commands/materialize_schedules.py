@@ -0,0 +1,29 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from airport.models import FlightSchedule
+from airport.schedules import materialize_schedules
+
+
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument(
+            "--start", type=date.fromisoformat, default=date.today(),
+        )
+        parser.add_argument(
+            "--schedule", dest="schedules", type=int, action="append",
+            help="Only materialize this schedule id (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        """Create the flights of every schedule for the coming days"""
+        start = options["start"]
+        end = start + timedelta(days=options["days"])
+        schedules = FlightSchedule.objects.all()
+        if options["schedules"]:
+            schedules = schedules.filter(id__in=options["schedules"])
+        created = materialize_schedules(start, end, schedules)
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} flights from {start} to {end}"))
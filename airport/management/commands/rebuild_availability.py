@@ -0,0 +1,29 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from airport.availability import rebuild_route_days
+
+
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--route", dest="routes", type=int, action="append",
+            help="Only rebuild this route id (repeatable)",
+        )
+        parser.add_argument(
+            "--start", type=date.fromisoformat,
+            help="First departure day to rebuild",
+        )
+        parser.add_argument(
+            "--end", type=date.fromisoformat,
+            help="Day after the last one to rebuild",
+        )
+
+    def handle(self, *args, **options):
+        """Recompute the route day availability rollup from the flights"""
+        written = rebuild_route_days(
+            options["routes"], options["start"], options["end"]
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt availability of {written} route days"))
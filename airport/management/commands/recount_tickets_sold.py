@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from airport.booking import recount_tickets_sold
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        """Recompute the tickets_sold counter of every flight"""
+        updated = recount_tickets_sold()
+        self.stdout.write(self.style.SUCCESS(
+            f"Fixed tickets_sold on {updated} flight(s)"))
@@ -0,0 +1,283 @@
+import random
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from airport.availability import rebuild_route_days
+from airport.booking import recount_tickets_sold
+from airport.cache import bump_table_version
+from airport.models import (
+    Airline,
+    Airplane,
+    AirplaneType,
+    Airport,
+    Crew,
+    Flight,
+    Order,
+    Route,
+    Ticket,
+    TicketClass,
+)
+
+CITIES = [
+    "Kyiv", "Lviv", "Odesa", "Kharkiv", "Dnipro", "Warsaw", "Krakow",
+    "Berlin", "Munich", "Vienna", "Prague", "Budapest", "Rome", "Milan",
+    "Paris", "Lyon", "Madrid", "Barcelona", "Lisbon", "London", "Dublin",
+    "Amsterdam", "Brussels", "Copenhagen", "Oslo", "Stockholm", "Helsinki",
+    "Riga", "Vilnius", "Tallinn", "Athens", "Istanbul", "Bucharest", "Sofia",
+]
+AIRPLANE_MODELS = [
+    ("Airbus A320", 30, 6),
+    ("Airbus A321", 37, 6),
+    ("Boeing 737-800", 32, 6),
+    ("Embraer E195", 31, 4),
+    ("Boeing 787-9", 42, 9),
+    ("Airbus A350-900", 44, 9),
+]
+AIRLINES = ["SkyUp", "Wizz Air", "LOT", "Lufthansa", "Ryanair", "KLM"]
+POSITIONS = ["Captain", "First Officer", "Purser", "Flight Attendant"]
+ROUTES_PER_AIRPORT = 6
+# Fixed, so the same --seed gives the same data on any day.
+DEFAULT_START_DATE = date(2030, 1, 1)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument("--airports", type=int, default=50)
+        parser.add_argument("--flights", type=int, default=10_000)
+        parser.add_argument("--orders", type=int, default=100_000)
+        parser.add_argument("--users", type=int, default=1_000)
+        parser.add_argument("--crews", type=int, default=500)
+        parser.add_argument(
+            "--max-tickets-per-order", type=int, default=4,
+            help="Each order books 1..N adjacent seats on one flight",
+        )
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument(
+            "--start-date", type=date.fromisoformat,
+            default=DEFAULT_START_DATE,
+        )
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        """Generate a large deterministic dataset"""
+        if options["flights"] > 0 and options["airports"] < 2:
+            raise CommandError("Flights need at least 2 airports.")
+        if options["orders"] > 0 and options["users"] < 1:
+            raise CommandError("Orders need at least 1 user.")
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        airplanes = self.create_airplanes(options["flights"])
+        crews = self.create_crews(options["crews"])
+        routes = self.create_routes(options["airports"])
+        flights = self.create_flights(
+            options["flights"],
+            routes,
+            airplanes,
+            crews,
+            datetime.combine(options["start_date"], time()),
+            options["days"],
+        )
+        users = self.create_users(options["users"])
+        orders, tickets = self.create_orders(
+            options["orders"],
+            users,
+            flights,
+            options["max_tickets_per_order"],
+        )
+
+        recount_tickets_sold()
+        rebuild_route_days()
+        for model in (Airport, Route, AirplaneType, Crew, TicketClass):
+            bump_table_version(model)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(routes)} routes, {len(flights)} flights, "
+            f"{orders} orders and {tickets} tickets"))
+
+    def bulk_create(self, model, objects):
+        created = []
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic():
+                created.extend(model.objects.bulk_create(batch))
+        return created
+
+    def create_airplanes(self, flights_count):
+        airplane_types = {
+            name: AirplaneType.objects.get_or_create(name=name)[0]
+            for name in ("Narrow-body", "Wide-body", "Regional")
+        }
+        airlines = [
+            Airline.objects.get_or_create(name=name)[0] for name in AIRLINES
+        ]
+        airplanes_count = max(10, flights_count // 50)
+        return self.bulk_create(Airplane, (
+            Airplane(
+                name=f"{name} #{number}",
+                rows=rows,
+                seats_in_row=seats_in_row,
+                airplane_type=airplane_types[
+                    "Wide-body" if seats_in_row > 6
+                    else "Regional" if seats_in_row < 6
+                    else "Narrow-body"
+                ],
+                airline=airlines[number % len(airlines)],
+            )
+            for number, (name, rows, seats_in_row) in (
+                (number, self.random.choice(AIRPLANE_MODELS))
+                for number in range(airplanes_count)
+            )
+        ))
+
+    def create_crews(self, count):
+        return self.bulk_create(Crew, (
+            Crew(
+                first_name=f"Crew{number}",
+                last_name=self.random.choice(CITIES),
+                position=POSITIONS[number % len(POSITIONS)],
+            )
+            for number in range(count)
+        ))
+
+    def create_routes(self, count):
+        airports = self.bulk_create(Airport, (
+            Airport(
+                name=f"{CITIES[number % len(CITIES)]} "
+                     f"International {number // len(CITIES) + 1}",
+                closest_big_city=CITIES[number % len(CITIES)],
+            )
+            for number in range(count)
+        ))
+        routes = []
+        for source in airports:
+            destinations = self.random.sample(
+                [airport for airport in airports if airport != source],
+                min(ROUTES_PER_AIRPORT, len(airports) - 1),
+            )
+            routes.extend(
+                Route(
+                    source=source,
+                    destination=destination,
+                    distance=self.random.randint(200, 4_000),
+                )
+                for destination in destinations
+            )
+        return self.bulk_create(Route, routes)
+
+    def create_flights(self, count, routes, airplanes, crews, start, days):
+        def generate():
+            for _ in range(count):
+                route = self.random.choice(routes)
+                departure_time = start + timedelta(
+                    minutes=5 * self.random.randrange(days * 24 * 12)
+                )
+                yield Flight(
+                    route=route,
+                    airplane=self.random.choice(airplanes),
+                    departure_time=departure_time,
+                    arrival_time=departure_time + timedelta(
+                        minutes=30 + route.distance // 12
+                    ),
+                )
+
+        flights = []
+        for batch in batched(generate(), self.batch_size):
+            with transaction.atomic():
+                batch = Flight.objects.bulk_create(batch)
+                Flight.crew.through.objects.bulk_create(
+                    Flight.crew.through(flight_id=flight.id, crew_id=crew.id)
+                    for flight in batch
+                    for crew in self.random.sample(crews, min(4, len(crews)))
+                )
+            flights.extend(batch)
+        return flights
+
+    def create_users(self, count):
+        user_model = get_user_model()
+        emails = [f"seed-user-{number}@example.com" for number in range(count)]
+        existing = set(
+            user_model.objects.filter(email__in=emails)
+            .values_list("email", flat=True)
+        )
+        password = make_password("password")
+        self.bulk_create(user_model, (
+            user_model(email=email, password=password)
+            for email in emails if email not in existing
+        ))
+        # Ordered, so the seed hands out orders to the same users each run.
+        return list(
+            user_model.objects.filter(email__in=emails).order_by("email")
+        )
+
+    def create_orders(self, count, users, flights, max_tickets):
+        """Book adjacent seats from the front of each airplane.
+
+        Every flight remembers its next free seat, so tickets never collide
+        on ``(flight, row, seat)`` and never leave the airplane's seat range.
+        Full flights are dropped from the pool.
+        """
+        ticket_classes = [
+            TicketClass.objects.get_or_create(
+                name=name, defaults={"cancellation_policy": "Refundable"}
+            )[0]
+            for name, _ in TicketClass.TICKET_CLASS_CHOICES
+        ]
+        flights = list(flights)
+        next_seat = dict.fromkeys((flight.id for flight in flights), 0)
+        orders_count = tickets_count = 0
+        while orders_count < count and flights:
+            bookings = []
+            while (
+                flights
+                and len(bookings) < min(self.batch_size, count - orders_count)
+            ):
+                index = self.random.randrange(len(flights))
+                flight = flights[index]
+                capacity = flight.airplane.rows * flight.airplane.seats_in_row
+                first = next_seat[flight.id]
+                last = min(
+                    first + self.random.randint(1, max_tickets), capacity
+                )
+                bookings.append((
+                    self.random.choice(users),
+                    self.random.choice(ticket_classes),
+                    flight,
+                    range(first, last),
+                ))
+                next_seat[flight.id] = last
+                if last == capacity:
+                    flights[index] = flights[-1]
+                    flights.pop()
+
+            with transaction.atomic():
+                orders = Order.objects.bulk_create(
+                    Order(user=user) for user, *_ in bookings
+                )
+                tickets = [
+                    Ticket(
+                        order=order,
+                        flight_id=flight.id,
+                        row=seat // flight.airplane.seats_in_row + 1,
+                        seat=seat % flight.airplane.seats_in_row + 1,
+                        ticket_class=ticket_class,
+                    )
+                    for order, (_, ticket_class, flight, seats) in zip(
+                        orders, bookings
+                    )
+                    for seat in seats
+                ]
+                Ticket.objects.bulk_create(tickets, batch_size=self.batch_size)
+            orders_count += len(orders)
+            tickets_count += len(tickets)
+        return orders_count, tickets_count
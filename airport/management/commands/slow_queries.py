@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from airport.slow_queries import get_slow_query_log
+
+
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument(
+            "--plans", action="store_true", help="Print the captured plans",
+        )
+        parser.add_argument(
+            "--reset", action="store_true", help="Forget all slow queries",
+        )
+
+    def handle(self, *args, **options):
+        """Show the slowest query fingerprints captured by the workers"""
+        log = get_slow_query_log()
+        if options["reset"]:
+            log.reset()
+            self.stdout.write(self.style.SUCCESS("Slow query log cleared"))
+            return
+
+        entries = log.top(options["limit"])
+        if not entries:
+            self.stdout.write(
+                "No slow queries recorded. Set SLOW_QUERY_ENABLED=True and "
+                "a shared SLOW_QUERY_DIR for the workers."
+            )
+        for entry in entries:
+            self.stdout.write(self.style.WARNING(
+                f"{entry['fingerprint']}  {entry['count']} x  "
+                f"total {entry['total_ms']:.1f} ms  "
+                f"max {entry['max_ms']:.1f} ms"))
+            self.stdout.write(f"  {entry['sql']}")
+            if options["plans"] and entry["plan"]:
+                for line in entry["plan"].splitlines():
+                    self.stdout.write(f"    {line}")
@@ -0,0 +1,266 @@
+import asyncio
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from airport.worker_files import read_worker_files, write_worker_file
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+FLUSH_INTERVAL = 1.0
+FILE_PREFIX = "metrics-"
+
+_current_queries = ContextVar("airport_metrics_queries", default=None)
+
+
+def _new_series():
+    return {
+        "requests": {},
+        "errors": 0,
+        "duration_buckets": [0] * (len(DURATION_BUCKETS) + 1),
+        "duration_sum": 0.0,
+        "queries_buckets": [0] * (len(QUERY_BUCKETS) + 1),
+        "queries_sum": 0,
+    }
+
+
+def _merge(target, source):
+    for action, series in source.items():
+        merged = target.setdefault(action, _new_series())
+        for status, count in series["requests"].items():
+            merged["requests"][status] = (
+                merged["requests"].get(status, 0) + count
+            )
+        merged["errors"] += series["errors"]
+        merged["duration_sum"] += series["duration_sum"]
+        merged["queries_sum"] += series["queries_sum"]
+        for name in ("duration_buckets", "queries_buckets"):
+            merged[name] = [
+                total + count
+                for total, count in zip(merged[name], series[name])
+            ]
+    return target
+
+
+class MetricsRegistry:
+    """Request metrics of this process, by view action.
+
+    With a ``directory`` every process dumps its own series into
+    ``metrics-<pid>.json`` there at most once per ``FLUSH_INTERVAL``, and
+    ``collect`` adds up the files of all workers.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.series = {}
+        self.flushed_at = 0.0
+
+    def observe(self, action, status_code, duration, queries):
+        with self.lock:
+            if os.getpid() != self.pid:
+                # Forked worker: the parent's numbers are not ours.
+                self._reset()
+            series = self.series.setdefault(action, _new_series())
+            status = f"{status_code // 100}xx"
+            series["requests"][status] = series["requests"].get(status, 0) + 1
+            if status_code >= 500:
+                series["errors"] += 1
+            series["duration_buckets"][
+                bisect_left(DURATION_BUCKETS, duration)
+            ] += 1
+            series["duration_sum"] += duration
+            series["queries_buckets"][bisect_left(QUERY_BUCKETS, queries)] += 1
+            series["queries_sum"] += queries
+            if (
+                self.directory
+                and time.monotonic() - self.flushed_at >= FLUSH_INTERVAL
+            ):
+                self._flush()
+
+    def _flush(self):
+        write_worker_file(self.directory, FILE_PREFIX, self.series)
+        self.flushed_at = time.monotonic()
+
+    def collect(self):
+        """Series of every worker writing to the directory, or just ours."""
+        with self.lock:
+            if not self.directory:
+                return _merge({}, self.series)
+            self._flush()
+        collected = {}
+        for series in read_worker_files(self.directory, FILE_PREFIX):
+            _merge(collected, series)
+        return collected
+
+
+def _labels(action, **extra):
+    labels = {"action": action, **extra}
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def _histogram(lines, name, action, buckets, counts, total):
+    cumulative = 0
+    for bound, count in zip((*buckets, "+Inf"), counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{{{_labels(action, le=bound)}}} "
+                     f"{cumulative}")
+    lines.append(f"{name}_sum{{{_labels(action)}}} {total}")
+    lines.append(f"{name}_count{{{_labels(action)}}} {cumulative}")
+
+
+def render_prometheus(collected):
+    """Prometheus text exposition format of collected series."""
+    lines = [
+        "# HELP airport_requests_total Requests by view action and status.",
+        "# TYPE airport_requests_total counter",
+    ]
+    for action, series in sorted(collected.items()):
+        for status, count in sorted(series["requests"].items()):
+            lines.append(
+                f"airport_requests_total{{{_labels(action, status=status)}}} "
+                f"{count}"
+            )
+    lines += [
+        "# HELP airport_request_errors_total Requests answered with 5xx.",
+        "# TYPE airport_request_errors_total counter",
+    ]
+    for action, series in sorted(collected.items()):
+        lines.append(
+            f"airport_request_errors_total{{{_labels(action)}}} "
+            f"{series['errors']}"
+        )
+    lines += [
+        "# HELP airport_request_duration_seconds Request latency.",
+        "# TYPE airport_request_duration_seconds histogram",
+    ]
+    for action, series in sorted(collected.items()):
+        _histogram(
+            lines, "airport_request_duration_seconds", action,
+            DURATION_BUCKETS, series["duration_buckets"],
+            round(series["duration_sum"], 6),
+        )
+    lines += [
+        "# HELP airport_db_queries Database queries per request.",
+        "# TYPE airport_db_queries histogram",
+    ]
+    for action, series in sorted(collected.items()):
+        _histogram(
+            lines, "airport_db_queries", action, QUERY_BUCKETS,
+            series["queries_buckets"], series["queries_sum"],
+        )
+    return "\n".join(lines) + "\n"
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                directory = getattr(settings, "METRICS_DIR", None)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                _registry = MetricsRegistry(directory)
+    return _registry
+
+
+def get_action_name(request):
+    """``<basename>-<action>`` for viewsets, the URL name otherwise."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    view = match.func
+    actions = getattr(view, "actions", None)
+    basename = getattr(view, "initkwargs", {}).get("basename")
+    if actions and basename:
+        action = actions.get(request.method.lower(), request.method.lower())
+        return f"{basename}-{action.replace('_', '-')}"
+    return match.url_name or match.view_name or "unnamed"
+
+
+class QueryCounter:
+    __slots__ = ("queries",)
+
+    def __init__(self):
+        self.queries = 0
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _current_queries.get()
+    if counter is not None:
+        counter.queries += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """``connection_created`` receiver counting the queries of requests.
+
+    The wrapper sits on every connection instead of around the request,
+    so queries the async views run on pool threads count too: the
+    request's counter reaches them through the context.
+    """
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+class MetricsMiddleware:
+    """Count requests, 5xx errors, latency and queries per view action."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.registry = get_registry()
+        if asyncio.iscoroutinefunction(get_response):
+            # Under ASGI stay on the event loop, as Django's own
+            # middleware do, instead of taking a thread per request.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        counter = QueryCounter()
+        token = _current_queries.set(counter)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_queries.reset(token)
+        return self._observe(request, response, start, counter)
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        token = _current_queries.set(counter)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_queries.reset(token)
+        return self._observe(request, response, start, counter)
+
+    def _observe(self, request, response, start, counter):
+        self.registry.observe(
+            get_action_name(request),
+            response.status_code,
+            time.perf_counter() - start,
+            counter.queries,
+        )
+        return response
@@ -0,0 +1,94 @@
+# Generated by Django 4.0.4 on 2026-10-18 02:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_tickets_sold(apps, schema_editor):
+    Flight = apps.get_model("airport", "Flight")
+    Ticket = apps.get_model("airport", "Ticket")
+    sold = (
+        Ticket.objects.filter(flight=OuterRef("pk"))
+        .order_by()
+        .values("flight")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Flight.objects.update(tickets_sold=Coalesce(Subquery(sold), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("airport", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="flight",
+            name="tickets_sold",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_tickets_sold, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="airplane",
+            name="airline",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="airplanes",
+                to="airport.airline"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="airplane",
+            name="airplane_type",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="airplanes",
+                to="airport.airplanetype"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="flight",
+            name="airplane",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="flights",
+                to="airport.airplane"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="flight",
+            name="route",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="flights",
+                to="airport.route"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="orders",
+                to=settings.AUTH_USER_MODEL
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ticket",
+            name="ticket_class",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="tickets",
+                to="airport.ticketclass"
+            ),
+        ),
+    ]
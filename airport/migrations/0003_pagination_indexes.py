@@ -0,0 +1,27 @@
+# Generated by Django 4.0.4 on 2026-10-18 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0002_flight_tickets_sold"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(
+                fields=["-arrival_time", "id"],
+                name="flight_arrival_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "-created_at", "id"],
+                name="order_user_created_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.0.4 on 2026-10-18 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0003_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(
+                fields=["departure_time"],
+                name="flight_departure_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(
+                fields=["route", "departure_time"],
+                name="flight_route_departure_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(
+                fields=["airplane", "departure_time"],
+                name="flight_airplane_departure_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.0.4 on 2026-10-18 02:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0004_flight_departure_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FlightSchedule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("weekdays", models.PositiveSmallIntegerField(default=127)),
+                ("departure_time", models.TimeField()),
+                ("duration", models.DurationField()),
+                ("valid_from", models.DateField()),
+                ("valid_until", models.DateField(blank=True, null=True)),
+                (
+                    "airplane",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedules",
+                        to="airport.airplane",
+                    ),
+                ),
+                (
+                    "crew",
+                    models.ManyToManyField(
+                        blank=True,
+                        related_name="schedules",
+                        to="airport.crew",
+                    ),
+                ),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedules",
+                        to="airport.route",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="flight",
+            name="schedule",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="flights",
+                to="airport.flightschedule",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="flight",
+            constraint=models.UniqueConstraint(
+                fields=("schedule", "departure_time"),
+                name="flight_schedule_departure_unique"
+            ),
+        ),
+    ]
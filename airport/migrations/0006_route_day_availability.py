@@ -0,0 +1,77 @@
+# Generated by Django 4.0.4 on 2026-10-18 02:58
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def fill_route_day_availability(apps, schema_editor):
+    Flight = apps.get_model("airport", "Flight")
+    RouteDayAvailability = apps.get_model("airport", "RouteDayAvailability")
+    available = (
+        F("airplane__rows") * F("airplane__seats_in_row") - F("tickets_sold")
+    )
+    totals = (
+        Flight.objects.annotate(date=TruncDate("departure_time"))
+        .order_by()
+        .values("route_id", "date")
+        .annotate(
+            flights=Count("id"),
+            min_seats_available=Min(available),
+            max_seats_available=Max(available),
+        )
+    )
+    RouteDayAvailability.objects.bulk_create(
+        (RouteDayAvailability(**total) for total in totals.iterator()),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0005_flight_schedule"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RouteDayAvailability",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("flights", models.PositiveIntegerField(default=0)),
+                ("min_seats_available", models.IntegerField(default=0)),
+                ("max_seats_available", models.IntegerField(default=0)),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="availability",
+                        to="airport.route",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["route", "date"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="routedayavailability",
+            constraint=models.UniqueConstraint(
+                fields=("route", "date"),
+                name="route_day_availability_unique"
+            ),
+        ),
+        migrations.RunPython(
+            fill_route_day_availability, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.0.4 on 2026-10-18 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0006_route_day_availability"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticket",
+            name="price",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=10, null=True
+            ),
+        ),
+    ]
@@ -1,7 +1,9 @@
 import os
 import uuid
+from datetime import datetime, timedelta
 
-from django.db import models
+from django.core import exceptions
+from django.db import models, transaction
 from django.conf import settings
 from django.utils.text import slugify
 from rest_framework.exceptions import ValidationError
@@ -100,6 +102,98 @@ class Crew(models.Model):
         return f"{self.first_name} {self.last_name}"
 
 
+class FlightSchedule(models.Model):
+    """Recurring timetable entry, materialized into ``Flight`` rows.
+
+    ``weekdays`` is a bit mask with Monday as the lowest bit, and
+    ``departure_time`` is the wall-clock time in the project time zone.
+    """
+
+    MONDAY = 1
+    TUESDAY = 2
+    WEDNESDAY = 4
+    THURSDAY = 8
+    FRIDAY = 16
+    SATURDAY = 32
+    SUNDAY = 64
+    EVERY_DAY = 127
+
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.CASCADE,
+        related_name="schedules"
+    )
+    airplane = models.ForeignKey(
+        Airplane,
+        on_delete=models.CASCADE,
+        related_name="schedules"
+    )
+    weekdays = models.PositiveSmallIntegerField(default=EVERY_DAY)
+    departure_time = models.TimeField()
+    duration = models.DurationField()
+    valid_from = models.DateField()
+    valid_until = models.DateField(null=True, blank=True)
+    crew = models.ManyToManyField(
+        Crew,
+        related_name="schedules",
+        blank=True
+    )
+
+    def __str__(self):
+        return f"{self.route} at {self.departure_time:%H:%M}"
+
+    def clean(self):
+        # Django's exception, which full_clean in the admin turns into
+        # form errors. Fields full_clean found missing are None here.
+        errors = {}
+        if self.weekdays is not None and not (
+            0 < self.weekdays <= self.EVERY_DAY
+        ):
+            errors["weekdays"] = (
+                "Weekdays must select at least one day of the week."
+            )
+        if self.duration is not None and self.duration <= timedelta(0):
+            errors["duration"] = "Duration must be positive."
+        if (
+            self.valid_until is not None
+            and self.valid_from is not None
+            and self.valid_until < self.valid_from
+        ):
+            errors["valid_until"] = (
+                "Schedule must end on or after its first day."
+            )
+        if errors:
+            raise exceptions.ValidationError(errors)
+
+    def save(self, *args, **kwargs):
+        self.clean()
+        super().save(*args, **kwargs)
+
+    def runs_on(self, day):
+        return bool(self.weekdays & (1 << day.weekday()))
+
+    def departures(self, start, end):
+        """Departure datetimes on the days from ``start`` until ``end``."""
+        day = max(start, self.valid_from)
+        if self.valid_until:
+            end = min(end, self.valid_until + timedelta(days=1))
+        while day < end:
+            if self.runs_on(day):
+                yield datetime.combine(day, self.departure_time)
+            day += timedelta(days=1)
+
+
+class FlightQuerySet(models.QuerySet):
+    def with_tickets_available(self):
+        return self.annotate(
+            tickets_available=(
+                models.F("airplane__rows")
+                * models.F("airplane__seats_in_row")
+                - models.F("tickets_sold")
+            )
+        )
+
+
 class Flight(models.Model):
     route = models.ForeignKey(
         Route,
@@ -117,12 +211,46 @@ class Flight(models.Model):
         Crew,
         related_name="flights"
     )
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
+    schedule = models.ForeignKey(
+        FlightSchedule,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="flights"
+    )
+
+    objects = FlightQuerySet.as_manager()
 
     def __str__(self):
         return f"Flight on {self.route} at {self.departure_time}"
 
     class Meta:
         ordering = ["-arrival_time"]
+        indexes = [
+            models.Index(
+                fields=["-arrival_time", "id"],
+                name="flight_arrival_id_idx"
+            ),
+            models.Index(
+                fields=["departure_time"],
+                name="flight_departure_idx"
+            ),
+            models.Index(
+                fields=["route", "departure_time"],
+                name="flight_route_departure_idx"
+            ),
+            models.Index(
+                fields=["airplane", "departure_time"],
+                name="flight_airplane_departure_idx"
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["schedule", "departure_time"],
+                name="flight_schedule_departure_unique"
+            ),
+        ]
 
     @property
     def duration(self):
@@ -140,6 +268,36 @@ class Flight(models.Model):
         super().save(*args, **kwargs)
 
 
+class RouteDayAvailability(models.Model):
+    """Flights of a route departing on one day and their free seats.
+
+    A rollup of Flight kept up to date by ``airport.availability`` on
+    every flight and ticket write; ``manage.py rebuild_availability``
+    recomputes it from the flights.
+    """
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.CASCADE,
+        related_name="availability"
+    )
+    date = models.DateField()
+    flights = models.PositiveIntegerField(default=0)
+    min_seats_available = models.IntegerField(default=0)
+    max_seats_available = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.route_id} on {self.date}: {self.flights} flights"
+
+    class Meta:
+        ordering = ["route", "date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["route", "date"],
+                name="route_day_availability_unique"
+            ),
+        ]
+
+
 class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(
@@ -153,6 +311,12 @@ class Order(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "id"],
+                name="order_user_created_id_idx"
+            ),
+        ]
 
 
 class TicketClass(models.Model):
@@ -183,6 +347,17 @@ class TicketClass(models.Model):
         return self.name
 
 
+class TicketQuerySet(models.QuerySet):
+    def delete(self):
+        # Deleted one by one through signals, a cascade of tickets would
+        # update their flights once per ticket; here it is once per flight.
+        from airport.booking import count_tickets_per_flight, release_seats
+
+        with transaction.atomic():
+            release_seats(count_tickets_per_flight(self))
+            return super().delete()
+
+
 class Ticket(models.Model):
     row = models.IntegerField()
     seat = models.IntegerField()
@@ -203,6 +378,14 @@ class Ticket(models.Model):
         blank=True,
         related_name="tickets"
     )
+    price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True
+    )
+
+    objects = TicketQuerySet.as_manager()
 
     @staticmethod
     def validate_ticket(row, seat, airplane, error_to_raise):
@@ -241,6 +424,13 @@ class Ticket(models.Model):
             force_insert, force_update, using, update_fields
         )
 
+    def delete(self, *args, **kwargs):
+        from airport.booking import release_seats
+
+        with transaction.atomic():
+            release_seats({self.flight_id: 1})
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         return f"Ticket {self.row}-{self.seat} on {self.flight}"
 
@@ -0,0 +1,31 @@
+import codecs
+
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+
+from airport.flight_import import read_flight_rows
+
+
+class FlightRowsParser(BaseParser):
+    """Parse an uploaded flight schedule into a list of row dicts."""
+
+    import_format = None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        lines = codecs.iterdecode(stream or [], encoding)
+        return read_flight_rows(
+            (line for chunk in lines for line in chunk.splitlines(True)),
+            self.import_format,
+        )
+
+
+class FlightCSVParser(FlightRowsParser):
+    media_type = "text/csv"
+    import_format = "csv"
+
+
+class FlightNDJSONParser(FlightRowsParser):
+    media_type = "application/x-ndjson"
+    import_format = "ndjson"
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger("airport.profiling")
+
+_current_profile = ContextVar("airport_profile", default=None)
+
+
+class RequestProfile:
+    __slots__ = ("db_queries", "db_time", "serializer_time")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+
+
+def get_current_profile():
+    """Profile of the request being handled, or None when not profiling."""
+    return _current_profile.get()
+
+
+def _time_query(execute, sql, params, many, context):
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.db_queries += 1
+        profile.db_time += time.perf_counter() - start
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """``connection_created`` receiver timing the queries of requests.
+
+    Like the metrics' counter, the timer stays on the connection and
+    finds the profile through the context, which also reaches the pool
+    threads of the async views.
+    """
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def _install_serializer_timer():
+    """Time ``serializer.data``, where DRF renders the top-level object.
+
+    Nested serializers only call ``to_representation``, so each response
+    is counted once. Queries made lazily while serializing count towards
+    both the serializer and the database time.
+    """
+    data = BaseSerializer.data.fget
+    if getattr(data, "profiled", False):
+        return
+
+    def profiled_data(serializer):
+        profile = _current_profile.get()
+        if profile is None:
+            return data(serializer)
+        start = time.perf_counter()
+        try:
+            return data(serializer)
+        finally:
+            profile.serializer_time += time.perf_counter() - start
+
+    profiled_data.profiled = True
+    BaseSerializer.data = property(profiled_data)
+
+
+def server_timing(profile, total):
+    db_time = profile.db_time * 1000
+    queries = profile.db_queries
+    return ", ".join([
+        f'db;dur={db_time:.2f};desc="{queries} queries"',
+        f"serializer;dur={profile.serializer_time * 1000:.2f}",
+        f"view;dur={total * 1000:.2f}",
+    ])
+
+
+class ProfilingMiddleware:
+    """Report DB, serializer and view time of every request.
+
+    Timings go out in a ``Server-Timing`` header; requests slower than
+    ``PROFILING_SLOW_REQUEST_MS`` are logged for a
+    ``PROFILING_SAMPLE_RATE`` share of them. With ``PROFILING_ENABLED``
+    off the middleware removes itself when Django starts.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_request = (
+            getattr(settings, "PROFILING_SLOW_REQUEST_MS", 500) / 1000
+        )
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 1.0)
+        _install_serializer_timer()
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        return self._report(request, response, profile, start)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        return self._report(request, response, profile, start)
+
+    def _report(self, request, response, profile, start):
+        total = time.perf_counter() - start
+
+        response["Server-Timing"] = server_timing(profile, total)
+        if total >= self.slow_request and random.random() < self.sample_rate:
+            logger.warning(
+                "Slow request %s %s: %s in %.1f ms, %d queries in %.1f ms, "
+                "serializer %.1f ms",
+                request.method,
+                request.get_full_path(),
+                response.status_code,
+                total * 1000,
+                profile.db_queries,
+                profile.db_time * 1000,
+                profile.serializer_time * 1000,
+            )
+        return response
@@ -0,0 +1,134 @@
+import heapq
+import threading
+from array import array
+
+from airport.cache import get_table_version
+from airport.db_router import primary_reads
+from airport.models import Airport, Route
+
+
+class RouteGraph:
+    """Compact directed graph of airports connected by routes.
+
+    Airports are numbered by position in ``airport_ids``; routes are kept
+    in parallel arrays sorted by source airport, with ``offsets[i]`` to
+    ``offsets[i + 1]`` holding the routes departing airport ``i``
+    (``departing_routes`` side of ``Route``).
+    """
+
+    def __init__(self, airports, routes):
+        airports = sorted(airports)
+        self.airport_ids = array("q", (row[0] for row in airports))
+        self.airport_names = [row[1] for row in airports]
+        self.airport_cities = [row[2] for row in airports]
+        self.airport_index = {
+            airport_id: index
+            for index, airport_id in enumerate(self.airport_ids)
+        }
+
+        routes = sorted(
+            (self.airport_index[source_id], route_id,
+             self.airport_index[destination_id], distance)
+            for route_id, source_id, destination_id, distance in routes
+        )
+        self.sources = array("l", (row[0] for row in routes))
+        self.route_ids = array("q", (row[1] for row in routes))
+        self.destinations = array("l", (row[2] for row in routes))
+        self.distances = array("l", (row[3] for row in routes))
+
+        self.offsets = array("l", [0] * (len(self.airport_ids) + 1))
+        for source in self.sources:
+            self.offsets[source + 1] += 1
+        for index in range(len(self.airport_ids)):
+            self.offsets[index + 1] += self.offsets[index]
+
+    @classmethod
+    def load(cls):
+        return cls(
+            Airport.objects.values_list("id", "name", "closest_big_city"),
+            Route.objects.values_list(
+                "id", "source_id", "destination_id", "distance"
+            ),
+        )
+
+    def _airport_data(self, index):
+        return {
+            "id": self.airport_ids[index],
+            "name": self.airport_names[index],
+            "closest_big_city": self.airport_cities[index],
+        }
+
+    def routes_data(self):
+        """All routes ordered by id, shaped like ``RouteSerializer``."""
+        return [
+            {
+                "id": self.route_ids[position],
+                "source": self._airport_data(self.sources[position]),
+                "destination": self._airport_data(
+                    self.destinations[position]
+                ),
+                "distance": self.distances[position],
+            }
+            for position in sorted(
+                range(len(self.route_ids)), key=self.route_ids.__getitem__
+            )
+        ]
+
+    def shortest_paths(self, source_id, destination_id, max_legs, limit):
+        """Return up to ``limit`` simple paths ordered by total distance.
+
+        Each path is ``(distance, [route_id, ...])`` with at most
+        ``max_legs`` routes; airports are never visited twice.
+        """
+        source = self.airport_index.get(source_id)
+        destination = self.airport_index.get(destination_id)
+        if source is None or destination is None:
+            return []
+
+        paths = []
+        queue = [(0, (source,), ())]
+        while queue and len(paths) < limit:
+            distance, airports, positions = heapq.heappop(queue)
+            airport = airports[-1]
+            if airport == destination:
+                paths.append(
+                    (distance, [self.route_ids[i] for i in positions])
+                )
+                continue
+            if len(positions) == max_legs:
+                continue
+            for position in range(
+                self.offsets[airport], self.offsets[airport + 1]
+            ):
+                next_airport = self.destinations[position]
+                if next_airport in airports:
+                    continue
+                heapq.heappush(queue, (
+                    distance + self.distances[position],
+                    airports + (next_airport,),
+                    positions + (position,),
+                ))
+        return paths
+
+
+_graph = None
+_graph_version = None
+_graph_lock = threading.Lock()
+
+
+def get_route_graph():
+    """Return this worker's route graph, reloading it after any change.
+
+    The graph is loaded lazily and kept until the shared Route/Airport
+    table version moves, which the signals in ``airport.signals`` do on
+    every save or delete.
+    """
+    global _graph, _graph_version
+    version = get_table_version(Route, Airport)
+    if _graph_version != version:
+        with _graph_lock:
+            if _graph_version != version:
+                with primary_reads():
+                    _graph = RouteGraph.load()
+                _graph_version = version
+    return _graph
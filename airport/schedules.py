@@ -0,0 +1,108 @@
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from airport.availability import refresh_route_days, route_day
+from airport.models import Flight, FlightSchedule
+
+MATERIALIZE_BATCH_SIZE = 5000
+
+
+def _pending_flights(schedules, start, end, existing):
+    for schedule in schedules:
+        crew_ids = [crew.id for crew in schedule.crew.all()]
+        for departure_time in schedule.departures(start, end):
+            if (schedule.id, departure_time) in existing:
+                continue
+            yield Flight(
+                route_id=schedule.route_id,
+                airplane_id=schedule.airplane_id,
+                schedule=schedule,
+                departure_time=departure_time,
+                arrival_time=departure_time + schedule.duration,
+            ), crew_ids
+
+
+def _not_created_yet(pending):
+    existing = set(
+        Flight.objects.filter(
+            schedule__in={flight.schedule_id for flight, _ in pending},
+            departure_time__in={
+                flight.departure_time for flight, _ in pending
+            },
+        ).values_list("schedule_id", "departure_time")
+    )
+    return [
+        (flight, crew_ids)
+        for flight, crew_ids in pending
+        if (flight.schedule_id, flight.departure_time) not in existing
+    ]
+
+
+def _create_flights(pending):
+    """Create the batch and return how many flights were created.
+
+    A concurrent run may have created some of them since they were looked
+    up; those are dropped from the batch, which is then retried.
+    """
+    while pending:
+        try:
+            with transaction.atomic():
+                flights = Flight.objects.bulk_create(
+                    flight for flight, _ in pending
+                )
+                Flight.crew.through.objects.bulk_create(
+                    Flight.crew.through(flight_id=flight.id, crew_id=crew_id)
+                    for flight, (_, crew_ids) in zip(flights, pending)
+                    for crew_id in crew_ids
+                )
+            return len(flights)
+        except IntegrityError:
+            remaining = _not_created_yet(pending)
+            if len(remaining) == len(pending):
+                raise
+            pending = remaining
+    return 0
+
+
+def materialize_schedules(
+    start, end, schedules=None, batch_size=MATERIALIZE_BATCH_SIZE
+):
+    """Create the flights of every schedule departing from ``start`` until
+    ``end`` (dates, end excluded) and return how many were created.
+
+    Flights a schedule already generated are looked up once and skipped,
+    so running it again over an overlapping horizon is safe. New flights
+    get the schedule's crew and are written with ``bulk_create`` in
+    batches.
+    """
+    if schedules is None:
+        schedules = FlightSchedule.objects.all()
+    schedules = list(
+        schedules.filter(valid_from__lt=end)
+        .filter(Q(valid_until=None) | Q(valid_until__gte=start))
+        .prefetch_related("crew")
+        .order_by("id")
+    )
+    existing = set(
+        Flight.objects.filter(
+            schedule__in=schedules,
+            departure_time__gte=datetime.combine(start, datetime.min.time()),
+            departure_time__lt=datetime.combine(end, datetime.min.time()),
+        ).values_list("schedule_id", "departure_time")
+    )
+
+    created = 0
+    pending = []
+    route_days = set()
+    for flight in _pending_flights(schedules, start, end, existing):
+        pending.append(flight)
+        route_days.add(route_day(flight[0]))
+        if len(pending) == batch_size:
+            created += _create_flights(pending)
+            pending = []
+    if pending:
+        created += _create_flights(pending)
+    refresh_route_days(route_days)
+    return created
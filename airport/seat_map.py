@@ -0,0 +1,77 @@
+import base64
+
+from airport.models import Flight, Ticket
+
+SEAT_MAP_ENCODINGS = ("base64", "rle")
+
+
+def build_occupancy(rows, seats_in_row, taken_seats):
+    """Pack taken (row, seat) pairs into a row-major bitmap.
+
+    Bit ``(row - 1) * seats_in_row + (seat - 1)`` is set for every taken
+    seat, most significant bit first within each byte. Tickets left
+    outside the layout after the airplane was resized are skipped rather
+    than marking another seat or running past the bitmap.
+    """
+    bitmap = bytearray((rows * seats_in_row + 7) // 8)
+    for row, seat in taken_seats:
+        if not (1 <= row <= rows and 1 <= seat <= seats_in_row):
+            continue
+        index = (row - 1) * seats_in_row + (seat - 1)
+        bitmap[index >> 3] |= 0x80 >> (index & 7)
+    return bytes(bitmap)
+
+
+def encode_base64(bitmap, size):
+    return base64.b64encode(bitmap).decode("ascii")
+
+
+def encode_rle(bitmap, size):
+    """Return run lengths alternating free and taken seats, free first."""
+    runs = []
+    current, length = 0, 0
+    for index in range(size):
+        bit = (bitmap[index >> 3] >> (7 - (index & 7))) & 1
+        if bit == current:
+            length += 1
+        else:
+            runs.append(length)
+            current, length = bit, 1
+    runs.append(length)
+    return runs
+
+
+ENCODERS = {
+    "base64": encode_base64,
+    "rle": encode_rle,
+}
+
+
+def get_seat_map(flight_id, encoding="base64"):
+    """Return the occupancy of a flight without instantiating models.
+
+    Returns ``None`` when the flight does not exist.
+    """
+    airplane = (
+        Flight.objects.filter(pk=flight_id)
+        .values_list("airplane__rows", "airplane__seats_in_row")
+        .first()
+    )
+    if airplane is None:
+        return None
+    rows, seats_in_row = airplane
+    taken_seats = Ticket.objects.filter(
+        flight_id=flight_id
+    ).values_list("row", "seat").order_by()
+    bitmap = build_occupancy(rows, seats_in_row, taken_seats)
+    size = rows * seats_in_row
+    taken = sum(bin(byte).count("1") for byte in bitmap)
+    return {
+        "flight": int(flight_id),
+        "rows": rows,
+        "seats_in_row": seats_in_row,
+        "taken": taken,
+        "available": size - taken,
+        "encoding": encoding,
+        "occupancy": ENCODERS[encoding](bitmap, size),
+    }
@@ -1,7 +1,9 @@
-from django.db import transaction
+from django.db.models import Manager
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from airport.booking import create_order
+from airport.fares import attach_fares
 from airport.models import (
     Airport,
     Route,
@@ -12,7 +14,8 @@ from airport.models import (
     Ticket,
     Order,
     TicketClass,
-    Airline
+    Airline,
+    RouteDayAvailability,
 )
 
 
@@ -31,6 +34,20 @@ class RouteSerializer(serializers.ModelSerializer):
         fields = ["id", "source", "destination", "distance"]
 
 
+class RouteDayAvailabilitySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RouteDayAvailability
+        fields = [
+            "date", "flights", "min_seats_available", "max_seats_available"
+        ]
+
+
+class RouteCalendarSerializer(serializers.Serializer):
+    route = serializers.IntegerField()
+    month = serializers.CharField()
+    days = RouteDayAvailabilitySerializer(many=True)
+
+
 class AirplaneTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = AirplaneType
@@ -110,9 +127,39 @@ class FlightSerializer(serializers.ModelSerializer):
         ]
 
 
+class FaresField(serializers.DictField):
+    """Current fare of the flight per ticket class name."""
+
+    def __init__(self, **kwargs):
+        kwargs.update(
+            source="*",
+            read_only=True,
+            child=serializers.DecimalField(max_digits=10, decimal_places=2),
+        )
+        super().__init__(**kwargs)
+
+    def to_representation(self, flight):
+        # Lists price their flights up front; this covers single flights.
+        attach_fares([flight])
+        return flight.fares
+
+
+class FareListSerializer(serializers.ListSerializer):
+    """Price the flights of every item in one pass before serializing."""
+
+    def get_flights(self, instances):
+        return instances
+
+    def to_representation(self, data):
+        instances = list(data.all() if isinstance(data, Manager) else data)
+        attach_fares(self.get_flights(instances))
+        return super().to_representation(instances)
+
+
 class FlightListSerializer(FlightSerializer):
     crew = CrewSerializer(many=True)
     tickets_available = serializers.IntegerField(read_only=True)
+    fares = FaresField()
 
     class Meta:
         model = Flight
@@ -124,10 +171,32 @@ class FlightListSerializer(FlightSerializer):
             "arrival_time",
             "crew",
             "duration",
-            "tickets_available"
+            "tickets_available",
+            "fares",
+        ]
+        list_serializer_class = FareListSerializer
+
+
+class ItineraryListSerializer(FareListSerializer):
+    def get_flights(self, instances):
+        return [
+            flight
+            for itinerary in instances
+            for flight in itinerary["flights"]
         ]
 
 
+class ItinerarySerializer(serializers.Serializer):
+    stops = serializers.IntegerField()
+    distance = serializers.IntegerField()
+    departure_time = serializers.DateTimeField()
+    arrival_time = serializers.DateTimeField()
+    flights = FlightListSerializer(many=True)
+
+    class Meta:
+        list_serializer_class = ItineraryListSerializer
+
+
 class TicketClassSerializer(serializers.ModelSerializer):
     class Meta:
         model = TicketClass
@@ -152,13 +221,46 @@ class TicketSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Ticket
-        fields = ["id", "row", "seat", "flight", "ticket_class"]
+        fields = ["id", "row", "seat", "flight", "ticket_class", "price"]
+        read_only_fields = ["price"]
+
+
+class TicketClassNameField(serializers.ChoiceField):
+    """Ticket class by name, resolved in bulk when the order is created."""
+
+    def __init__(self, **kwargs):
+        super().__init__(choices=TicketClass.TICKET_CLASS_CHOICES, **kwargs)
+
+    def to_representation(self, value):
+        return value.name if value else None
+
+
+class TicketCreateSerializer(serializers.ModelSerializer):
+    flight = serializers.IntegerField(source="flight_id", min_value=1)
+    ticket_class = TicketClassNameField()
+
+    class Meta:
+        model = Ticket
+        fields = ["id", "row", "seat", "flight", "ticket_class", "price"]
+        read_only_fields = ["price"]
 
 
 class TicketListSerializer(TicketSerializer):
     flight = FlightListSerializer(many=False, read_only=True)
 
 
+class FlightHistorySerializer(serializers.ModelSerializer):
+    route = serializers.StringRelatedField()
+
+    class Meta:
+        model = Flight
+        fields = ("id", "route", "departure_time", "arrival_time")
+
+
+class TicketHistorySerializer(TicketSerializer):
+    flight = FlightHistorySerializer(many=False, read_only=True)
+
+
 class TicketSeatsSerializer(TicketSerializer):
     class Meta:
         model = Ticket
@@ -188,8 +290,40 @@ class FlightDetailSerializer(FlightSerializer):
         )
 
 
+class FlightDetailCompactSerializer(FlightDetailSerializer):
+    class Meta:
+        model = Flight
+        fields = (
+            "id",
+            "route",
+            "airplane",
+            "crew",
+            "departure_time",
+            "arrival_time",
+        )
+
+
+class SeatMapSerializer(serializers.Serializer):
+    flight = serializers.IntegerField()
+    rows = serializers.IntegerField()
+    seats_in_row = serializers.IntegerField()
+    taken = serializers.IntegerField()
+    available = serializers.IntegerField()
+    encoding = serializers.CharField()
+    occupancy = serializers.JSONField()
+
+
+class OrderFareListSerializer(FareListSerializer):
+    def get_flights(self, instances):
+        return [
+            ticket.flight
+            for order in instances
+            for ticket in order.tickets.all()
+        ]
+
+
 class OrderSerializer(serializers.ModelSerializer):
-    tickets = TicketListSerializer(
+    tickets = TicketCreateSerializer(
         many=True,
         read_only=False,
         allow_empty=False
@@ -207,13 +341,16 @@ class OrderSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        with transaction.atomic():
-            tickets_data = validated_data.pop("tickets")
-            order = Order.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(order=order, **ticket_data)
-            return order
+        tickets_data = validated_data.pop("tickets")
+        return create_order(tickets_data, **validated_data)
 
 
 class OrderListSerializer(OrderSerializer):
     tickets = TicketListSerializer(many=True, read_only=True)
+
+    class Meta(OrderSerializer.Meta):
+        list_serializer_class = OrderFareListSerializer
+
+
+class OrderHistorySerializer(OrderSerializer):
+    tickets = TicketHistorySerializer(many=True, read_only=True)
@@ -0,0 +1,113 @@
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from airport.availability import (
+    refresh_flight_route_days,
+    refresh_route_days,
+    route_day,
+)
+from airport.booking import (
+    change_tickets_sold,
+    count_tickets_per_flight,
+    release_seats,
+)
+from airport.cache import bump_table_version
+from airport.models import (
+    Airplane,
+    Airport,
+    AirplaneType,
+    Crew,
+    Flight,
+    Order,
+    Route,
+    Ticket,
+    TicketClass,
+)
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_ticket_flight(sender, instance, **kwargs):
+    instance._previous_flight_id = None
+    if instance.pk is not None:
+        instance._previous_flight_id = Ticket.objects.filter(
+            pk=instance.pk
+        ).values_list("flight_id", flat=True).first()
+
+
+@receiver(post_save, sender=Ticket)
+def count_saved_ticket(sender, instance, created, **kwargs):
+    if created:
+        change_tickets_sold({instance.flight_id: 1})
+        refresh_flight_route_days([instance.flight_id])
+        return
+    # A ticket moved to another flight frees its seat on the old one.
+    previous = getattr(instance, "_previous_flight_id", None)
+    if previous is not None and previous != instance.flight_id:
+        change_tickets_sold({previous: -1, instance.flight_id: 1})
+        refresh_flight_route_days([previous, instance.flight_id])
+
+
+# Tickets have no delete receivers, so cascades remove them with a single
+# query: ``Ticket.delete()`` and ticket querysets release their seats
+# themselves, deleted orders here. Tickets of deleted flights need nothing,
+# the flights' days are refreshed below.
+@receiver(pre_delete, sender=Order)
+def release_order_seats(sender, instance, **kwargs):
+    release_seats(count_tickets_per_flight(instance.tickets.all()))
+
+
+@receiver(pre_save, sender=Flight)
+def remember_flight_route_day(sender, instance, **kwargs):
+    instance._previous_route_day = None
+    if instance.pk is not None:
+        previous = Flight.objects.filter(pk=instance.pk).values_list(
+            "route_id", "departure_time"
+        ).first()
+        if previous is not None:
+            route_id, departure_time = previous
+            instance._previous_route_day = route_id, departure_time.date()
+
+
+@receiver(post_save, sender=Flight)
+def refresh_saved_flight_route_day(sender, instance, **kwargs):
+    pairs = {route_day(instance)}
+    previous = getattr(instance, "_previous_route_day", None)
+    if previous is not None:
+        pairs.add(previous)
+    refresh_route_days(pairs)
+
+
+@receiver(post_delete, sender=Flight)
+def refresh_deleted_flight_route_day(sender, instance, **kwargs):
+    refresh_route_days([route_day(instance)])
+
+
+@receiver(post_save, sender=Airplane)
+def refresh_airplane_route_days(sender, instance, created, **kwargs):
+    # The airplane's capacity may have changed.
+    if not created:
+        refresh_route_days(
+            (route_id, departure_time.date())
+            for route_id, departure_time in instance.flights.values_list(
+                "route_id", "departure_time"
+            )
+        )
+
+
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_save, sender=Airport)
+@receiver(post_delete, sender=Airport)
+@receiver(post_save, sender=AirplaneType)
+@receiver(post_delete, sender=AirplaneType)
+@receiver(post_save, sender=TicketClass)
+@receiver(post_delete, sender=TicketClass)
+@receiver(post_save, sender=Crew)
+@receiver(post_delete, sender=Crew)
+def invalidate_table_version(sender, **kwargs):
+    bump_table_version(sender)
@@ -0,0 +1,214 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+from airport.worker_files import (
+    clear_worker_files,
+    read_worker_files,
+    write_worker_file,
+)
+
+logger = logging.getLogger("airport.slow_queries")
+
+FILE_PREFIX = "slow-queries-"
+FLUSH_INTERVAL = 1.0
+
+_IN_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+_explaining = threading.local()
+
+
+def fingerprint(sql):
+    """SQL with literals replaced and IN lists collapsed, and its hash.
+
+    Queries differing only in parameter values or list lengths share a
+    fingerprint and are aggregated together.
+    """
+    normalized = _IN_LIST.sub("(...)", sql)
+    normalized = _STRING.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _SPACE.sub(" ", normalized).strip()
+    digest = hashlib.md5(normalized.encode()).hexdigest()[:16]
+    return digest, normalized
+
+
+def explain_sql(connection, sql):
+    """EXPLAIN statement for the backend, ANALYZE only for reads."""
+    if connection.vendor == "postgresql":
+        if sql.lstrip().upper().startswith("SELECT"):
+            return f"EXPLAIN (ANALYZE, BUFFERS) {sql}"
+        return f"EXPLAIN {sql}"
+    if connection.vendor == "sqlite":
+        return f"EXPLAIN QUERY PLAN {sql}"
+    return f"EXPLAIN {sql}"
+
+
+def explain(alias, sql, params):
+    """Plan of a query as text, run on this thread's connection."""
+    connection = connections[alias]
+    _explaining.active = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(explain_sql(connection, sql), params)
+            rows = cursor.fetchall()
+    finally:
+        _explaining.active = False
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def _merge(target, entries):
+    for key, entry in entries.items():
+        merged = target.get(key)
+        if merged is None:
+            target[key] = dict(entry)
+            continue
+        merged["count"] += entry["count"]
+        merged["total_ms"] += entry["total_ms"]
+        merged["max_ms"] = max(merged["max_ms"], entry["max_ms"])
+        merged["last_seen"] = max(merged["last_seen"], entry["last_seen"])
+        if entry["plan"] and not merged["plan"]:
+            merged["plan"] = entry["plan"]
+    return target
+
+
+class SlowQueryLog:
+    """Queries slower than ``threshold`` seconds, grouped by fingerprint.
+
+    The first time a fingerprint is seen its plan is captured on a
+    background thread, so the request that ran the slow query does not
+    wait for the EXPLAIN. With a ``directory`` each process keeps its
+    entries in its own file there, and ``top`` reads all of them.
+    """
+
+    def __init__(self, threshold, directory=None, capture_plans=True):
+        self.threshold = threshold
+        self.directory = directory
+        self.capture_plans = capture_plans
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.flushed_at = 0.0
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="explain"
+        )
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_explaining, "active", False):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= self.threshold:
+                self.record(
+                    context["connection"].alias, sql,
+                    None if many else params, duration,
+                )
+
+    def record(self, alias, sql, params, duration):
+        key, normalized = fingerprint(sql)
+        duration_ms = duration * 1000
+        with self.lock:
+            entry = self.entries.get(key)
+            new = entry is None
+            if new:
+                entry = self.entries[key] = {
+                    "fingerprint": key,
+                    "sql": normalized,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "last_seen": 0.0,
+                    "plan": None,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["last_seen"] = time.time()
+            self._maybe_flush()
+        if new:
+            logger.warning("Slow query (%.1f ms): %s", duration_ms, sql)
+            if self.capture_plans and params is not None:
+                self.executor.submit(
+                    self._capture_plan, key, alias, sql, params
+                )
+
+    def _capture_plan(self, key, alias, sql, params):
+        try:
+            plan = explain(alias, sql, params)
+        except Exception:
+            logger.exception("Could not explain slow query %s", key)
+            return
+        finally:
+            if not connections[alias].in_atomic_block:
+                connections[alias].close()
+        with self.lock:
+            self.entries[key]["plan"] = plan
+            self._maybe_flush(force=True)
+
+    def _maybe_flush(self, force=False):
+        if self.directory and (
+            force or time.monotonic() - self.flushed_at >= FLUSH_INTERVAL
+        ):
+            write_worker_file(self.directory, FILE_PREFIX, self.entries)
+            self.flushed_at = time.monotonic()
+
+    def collect(self):
+        with self.lock:
+            if not self.directory:
+                return _merge({}, self.entries)
+            self._maybe_flush(force=True)
+        collected = {}
+        for entries in read_worker_files(self.directory, FILE_PREFIX):
+            _merge(collected, entries)
+        return collected
+
+    def top(self, limit=20):
+        """Worst fingerprints first, by total time spent."""
+        return sorted(
+            self.collect().values(),
+            key=lambda entry: entry["total_ms"],
+            reverse=True,
+        )[:limit]
+
+    def reset(self):
+        with self.lock:
+            self.entries = {}
+            if self.directory:
+                clear_worker_files(self.directory, FILE_PREFIX)
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_slow_query_log():
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                if settings.SLOW_QUERY_DIR:
+                    os.makedirs(settings.SLOW_QUERY_DIR, exist_ok=True)
+                _log = SlowQueryLog(
+                    threshold=settings.SLOW_QUERY_THRESHOLD_MS / 1000,
+                    directory=settings.SLOW_QUERY_DIR,
+                    capture_plans=settings.SLOW_QUERY_EXPLAIN,
+                )
+    return _log
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    """``connection_created`` receiver wrapping every new connection."""
+    log = get_slow_query_log()
+    if log not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log)
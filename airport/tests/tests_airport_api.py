@@ -1,13 +1,20 @@
+import time
 import uuid
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 from rest_framework.reverse import reverse
 
+from airport.cache import TABLE_VERSION_KEY
 from airport.models import Airport
+from airport.serializers import AirportSerializer
 
 AIRPORT_URL = reverse("airport:airport-list")
+AIRPORT_VERSION_KEY = TABLE_VERSION_KEY.format("airport.airport")
 
 
 def sample_airport(**params):
@@ -40,6 +47,78 @@ class AuthenticatedAirportApiTests(TestCase):
         )
         self.client.force_authenticate(self.user)
 
+    def test_airport_list(self):
+        sample_airport()
+        sample_airport()
+
+        res = self.client.get(AIRPORT_URL)
+
+        serializer = AirportSerializer(Airport.objects.all(), many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), serializer.data)
+        self.assertIn("ETag", res)
+
+    def test_airport_list_cached(self):
+        sample_airport()
+        self.client.get(AIRPORT_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(AIRPORT_URL)
+
+        self.assertEqual(len(res.json()), 1)
+
+    def test_airport_list_not_modified(self):
+        sample_airport()
+        etag = self.client.get(AIRPORT_URL)["ETag"]
+
+        with self.assertNumQueries(0):
+            res = self.client.get(AIRPORT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def get_at(self, now, **headers):
+        clock = mock.Mock(time=mock.Mock(return_value=now))
+        with mock.patch("airport.views.time", clock):
+            return self.client.get(AIRPORT_URL, **headers)
+
+    def test_airport_list_not_modified_since(self):
+        last_modified = self.get_at(time.time() + 2)["Last-Modified"]
+
+        res = self.client.get(
+            AIRPORT_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_last_modified_waits_for_the_second_to_end(self):
+        cache.set(AIRPORT_VERSION_KEY, 1000.3, None)
+
+        self.assertNotIn("Last-Modified", self.get_at(1000.5))
+        self.assertEqual(
+            self.get_at(1001.2)["Last-Modified"],
+            "Thu, 01 Jan 1970 00:16:41 GMT",
+        )
+
+    def test_write_after_last_modified_is_modified(self):
+        cache.set(AIRPORT_VERSION_KEY, 1000.3, None)
+        last_modified = self.get_at(1001.2)["Last-Modified"]
+        cache.set(AIRPORT_VERSION_KEY, 1001.4, None)
+
+        res = self.get_at(1001.6, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_airport_list_invalidated_on_write(self):
+        etag = self.client.get(AIRPORT_URL)["ETag"]
+        sample_airport(name="New airport")
+
+        res = self.client.get(AIRPORT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertEqual(res.json()[0]["name"], "New airport")
+
     def test_create_airport_forbidden(self):
         payload = {
             "name": "new name",
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import re
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient,
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from airport.async_views import database_sync_to_async
+from airport.db_router import ReplicaRoutingMiddleware
+from airport.metrics import MetricsMiddleware, get_registry
+from airport.models import Order, Ticket
+from airport.profiling import ProfilingMiddleware
+
+from airport.tests.tests_flight_api import (
+    FLIGHT_URL,
+    get_detail_flight_url,
+    get_seat_map_url,
+    sample_flight,
+)
+
+ASYNC_FLIGHT_URL = reverse("airport:flight-list-async")
+# Async view: the sync action it serves the same way, whose query budget
+# it shares (see tests_query_budget).
+ASYNC_TWINS = {
+    "flight-list-async": "flight-list",
+    "flight-detail-async": "flight-retrieve",
+    "flight-seat-map-async": "flight-seat-map",
+}
+
+
+def queries_sum(action):
+    series = get_registry().collect().get(action)
+    return series["queries_sum"] if series else 0
+
+
+def get_async_detail_flight_url(flight_id):
+    return reverse("airport:flight-detail-async", args=[flight_id])
+
+
+def get_async_seat_map_url(flight_id):
+    return reverse("airport:flight-seat-map-async", args=[flight_id])
+
+
+# The async views query on pool threads with their own connections, so
+# the test data has to be committed.
+class AsyncFlightApiTests(TransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+        sample_flight()
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(order=order, flight=self.flight, row=1, seat=2)
+
+    def assert_same_response(self, async_url, sync_url, params=None):
+        async_response = self.client.get(async_url, params)
+        sync_response = self.client.get(sync_url, params)
+
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json.loads(async_response.content),
+            json.loads(sync_response.content),
+        )
+
+    def test_list_matches_sync(self):
+        self.assert_same_response(ASYNC_FLIGHT_URL, FLIGHT_URL)
+
+    def test_paginated_filtered_list_matches_sync(self):
+        self.assert_same_response(
+            ASYNC_FLIGHT_URL,
+            FLIGHT_URL,
+            {"pagination": "page", "route": self.flight.route_id},
+        )
+
+    def test_detail_matches_sync(self):
+        self.assert_same_response(
+            get_async_detail_flight_url(self.flight.id),
+            get_detail_flight_url(self.flight.id),
+        )
+
+    def test_seat_map_matches_sync(self):
+        self.assert_same_response(
+            get_async_seat_map_url(self.flight.id),
+            get_seat_map_url(self.flight.id),
+            {"encoding": "rle"},
+        )
+
+    def test_missing_flight(self):
+        response = self.client.get(get_async_detail_flight_url(0))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_parameter(self):
+        response = self.client.get(
+            get_async_seat_map_url(self.flight.id), {"encoding": "png"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_auth_required(self):
+        self.client.force_authenticate(None)
+
+        response = self.client.get(ASYNC_FLIGHT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_metrics_count_pool_thread_queries(self):
+        before = queries_sum("flight-list-async")
+        self.client.get(ASYNC_FLIGHT_URL)
+
+        self.assertGreaterEqual(queries_sum("flight-list-async") - before, 2)
+
+    def test_queries_match_sync_twin(self):
+        def count_queries(action, url):
+            # Cached fares and seat maps would spare the second request.
+            cache.clear()
+            before = queries_sum(action)
+            self.client.get(url)
+            return queries_sum(action) - before
+
+        urls = {
+            "flight-list": FLIGHT_URL,
+            "flight-retrieve": get_detail_flight_url(self.flight.id),
+            "flight-seat-map": get_seat_map_url(self.flight.id),
+            "flight-list-async": ASYNC_FLIGHT_URL,
+            "flight-detail-async": get_async_detail_flight_url(
+                self.flight.id
+            ),
+            "flight-seat-map-async": get_async_seat_map_url(self.flight.id),
+        }
+        for name, twin in ASYNC_TWINS.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    count_queries(name, urls[name]),
+                    count_queries(twin, urls[twin]),
+                )
+
+    @override_settings(PROFILING_ENABLED=True)
+    def test_server_timing_counts_pool_thread_queries(self):
+        response = self.client.get(ASYNC_FLIGHT_URL)
+
+        queries = re.search(r'"(\d+) queries"', response["Server-Timing"])
+        self.assertGreaterEqual(int(queries.group(1)), 2)
+
+    async def asgi_get(self, url):
+        token = await database_sync_to_async(RefreshToken.for_user)(self.user)
+        # Django 4.0's AsyncClient takes raw header names.
+        return await AsyncClient().get(
+            url, authorization=f"Bearer {token.access_token}"
+        )
+
+    async def test_served_through_asgi(self):
+        response = await self.asgi_get(
+            get_async_detail_flight_url(self.flight.id)
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)["id"], self.flight.id)
+
+    # The debug toolbar, added with DEBUG, is sync-only and would put the
+    # whole middleware chain on one thread.
+    @override_settings(MIDDLEWARE=[
+        middleware for middleware in settings.MIDDLEWARE
+        if not middleware.startswith("debug_toolbar.")
+    ])
+    async def test_slow_requests_overlap(self):
+        def slow_seat_map(flight_id, encoding):
+            time.sleep(0.5)
+            return {"flight": flight_id}
+
+        start = time.perf_counter()
+        with mock.patch("airport.async_views.get_seat_map", slow_seat_map):
+            responses = await asyncio.gather(
+                self.asgi_get(get_async_seat_map_url(self.flight.id)),
+                self.asgi_get(get_async_seat_map_url(self.flight.id)),
+            )
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_200_OK, status.HTTP_200_OK],
+        )
+        self.assertLess(elapsed, 0.9)
+
+    def test_read_only(self):
+        response = self.client.post(ASYNC_FLIGHT_URL, {})
+
+        self.assertEqual(
+            response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+
+
+class AsyncMiddlewareTests(SimpleTestCase):
+    @override_settings(
+        METRICS_ENABLED=True,
+        PROFILING_ENABLED=True,
+        DATABASE_REPLICAS=["replica"],
+    )
+    def test_middlewares_stay_on_the_event_loop(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        for middleware_class in (
+            MetricsMiddleware, ProfilingMiddleware, ReplicaRoutingMiddleware
+        ):
+            middleware = middleware_class(get_response)
+
+            self.assertTrue(asyncio.iscoroutinefunction(middleware))
+            response = async_to_sync(middleware)(RequestFactory().get("/"))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
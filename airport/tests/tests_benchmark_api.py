@@ -0,0 +1,180 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from airport.benchmarks.endpoints import (
+    Scenario,
+    percentile,
+    run_benchmark,
+    run_scenario,
+)
+from airport.benchmarks.serializers import (
+    CASES,
+    compare,
+    make_flights,
+    measure,
+)
+from airport.fares import attach_fares
+from airport.models import Flight, Order, Ticket
+
+
+class BenchmarkApiTests(TestCase):
+    def setUp(self):
+        call_command(
+            "seed_airport",
+            airports=4,
+            flights=10,
+            orders=20,
+            users=2,
+            crews=4,
+            stdout=StringIO(),
+        )
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_run_benchmark_reports_every_endpoint(self):
+        tickets_sold = sum(
+            Flight.objects.values_list("tickets_sold", flat=True)
+        )
+
+        names = (
+            "flight-list", "flight-detail", "flight-search", "order-list",
+            "order-create", "airport-list", "route-list",
+        )
+
+        # The async scenarios query from other connections, which do not
+        # see this test's uncommitted data.
+        report = run_benchmark(requests=3, warmup=1, endpoints=names)
+
+        for name in names:
+            result = report["endpoints"][name]
+            self.assertEqual(result["non_2xx"], 0, name)
+            self.assertEqual(result["requests"], 3)
+            self.assertLessEqual(
+                result["latency_ms"]["p50"], result["latency_ms"]["p99"]
+            )
+            self.assertGreaterEqual(result["queries"]["max"], 0)
+        self.assertEqual(Order.objects.count(), 20)
+        self.assertEqual(
+            sum(Flight.objects.values_list("tickets_sold", flat=True)),
+            tickets_sold,
+        )
+        self.assertEqual(Ticket.objects.count(), tickets_sold)
+
+    def test_benchmark_api_command_writes_report(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            call_command(
+                "benchmark_api",
+                requests=2,
+                warmup=0,
+                endpoints=["flight-list", "crew-list"],
+                output=output.name,
+                stdout=StringIO(),
+            )
+            report = json.load(output)
+
+        self.assertEqual(
+            set(report["endpoints"]), {"flight-list", "crew-list"}
+        )
+
+    def test_order_create_skipped_without_free_seats(self):
+        with self.assertLogs("airport.benchmarks", "WARNING") as logs:
+            report = run_benchmark(
+                requests=1000, warmup=0, endpoints=["order-create"]
+            )
+
+        self.assertEqual(report["endpoints"], {})
+        self.assertIn("order-create", report["skipped"])
+        self.assertIn("Skipping order-create", logs.output[0])
+
+    def test_non_2xx_responses_are_left_out_of_latencies(self):
+        class FlakyTransport:
+            def request(self, method, url, data=None):
+                self.calls = getattr(self, "calls", 0) + 1
+                return (429 if self.calls % 2 else 200), None
+
+        scenario = Scenario(
+            "flight-list", "GET", lambda number: "/", lambda number: None
+        )
+
+        with self.assertLogs("airport.benchmarks", "WARNING") as logs:
+            result = run_scenario(FlakyTransport(), scenario, 4, 1, 0)
+
+        self.assertEqual(result["non_2xx"], 2)
+        self.assertEqual(result["statuses"], {"200": 2, "429": 2})
+        self.assertIn("429: 2", logs.output[0])
+
+    def test_benchmark_api_requires_flights(self):
+        Flight.objects.all().delete()
+
+        with self.assertRaises(CommandError):
+            call_command("benchmark_api", stdout=StringIO())
+
+
+class SerializerBenchmarkTests(TestCase):
+    def test_alternatives_match_serializers(self):
+        for case in CASES.values():
+            results = compare(case, sizes=(1, 3), repeat=1)
+
+            self.assertEqual(
+                {result["implementation"] for result in results},
+                {"drf", *case.alternatives},
+            )
+            for result in results:
+                self.assertTrue(result["matches"], result)
+                self.assertGreater(result["per_object_us"], 0)
+
+    def test_every_run_prices_fresh_flights(self):
+        already_priced = []
+
+        def run(flights):
+            already_priced.append(
+                any(hasattr(flight, "fares") for flight in flights)
+            )
+            attach_fares(flights)
+
+        measure(run, make_flights, 2, repeat=3)
+
+        self.assertEqual(already_priced, [False] * 4)
+
+    def test_compare_detects_mismatching_alternative(self):
+        results = compare(
+            CASES["route"],
+            sizes=(2,),
+            repeat=1,
+            alternatives={"broken": lambda route: {"id": route.id}},
+        )
+
+        self.assertEqual(
+            [result["matches"] for result in results], [True, False]
+        )
+
+    def test_benchmark_serializers_command(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            call_command(
+                "benchmark_serializers",
+                serializers=["route"],
+                sizes=[2],
+                repeat=1,
+                alternatives=[
+                    "route:copy=airport.benchmarks.serializers.route_data"
+                ],
+                output=output.name,
+                stdout=StringIO(),
+            )
+            results = json.load(output)
+
+        self.assertEqual(
+            [result["implementation"] for result in results],
+            ["drf", "dict", "copy"],
+        )
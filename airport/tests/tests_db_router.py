@@ -0,0 +1,172 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.db_router import (
+    REPLICA_PIN_KEY,
+    ReplicaRouter,
+    ReplicaRoutingMiddleware,
+    get_client_key,
+)
+from airport.models import Flight, TicketClass
+
+from airport.tests.tests_flight_api import sample_flight, sample_route
+
+ORDER_URL = reverse("airport:order-list")
+FLIGHT_URL = reverse("airport:flight-list")
+CACHED_LIST_URLS = [
+    reverse("airport:route-list"),
+    reverse("airport:airport-list"),
+    reverse("airport:ticketclass-list"),
+]
+TOKEN = "Bearer token"
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def route(self, method, write=False, authorization=TOKEN):
+        databases = {}
+
+        def get_response(request):
+            databases["before"] = self.router.db_for_read(Flight)
+            if write:
+                self.router.db_for_write(Flight)
+            databases["after"] = self.router.db_for_read(Flight)
+            return HttpResponse()
+
+        request = getattr(self.factory, method)(
+            "/", HTTP_AUTHORIZATION=authorization
+        )
+        ReplicaRoutingMiddleware(get_response)(request)
+        return databases
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(
+            self.route("get"), {"before": "replica", "after": "replica"}
+        )
+
+    def test_unsafe_requests_use_primary(self):
+        self.assertEqual(
+            self.route("post"), {"before": "default", "after": "default"}
+        )
+
+    def test_reads_after_write_use_primary(self):
+        self.assertEqual(
+            self.route("get", write=True),
+            {"before": "replica", "after": "default"},
+        )
+
+    def test_writer_is_pinned_to_primary(self):
+        self.route("post", write=True)
+
+        self.assertEqual(self.route("get")["before"], "default")
+        self.assertEqual(
+            self.route("get", authorization="Bearer other")["before"],
+            "replica",
+        )
+
+    def test_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Flight), "default")
+        self.assertEqual(self.router.db_for_write(Flight), "default")
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate("default", "airport"))
+        self.assertFalse(self.router.allow_migrate("replica", "airport"))
+
+
+class ReplicaRoutingDisabledTests(TestCase):
+    def test_reads_use_primary_without_replicas(self):
+        self.assertEqual(router.db_for_read(Flight), "default")
+
+
+# The default database stands in for a replica, so the real stack runs.
+@override_settings(DATABASE_REPLICAS=["default"])
+class ReplicaPinningApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_order_create_pins_client(self):
+        flight = sample_flight()
+        TicketClass.objects.create(name="economy")
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "flight": flight.id,
+                 "ticket_class": "economy"},
+            ]
+        }
+
+        response = self.client.post(ORDER_URL, payload, format="json")
+        request = RequestFactory().post("/")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            cache.get(REPLICA_PIN_KEY.format(get_client_key(request)))
+        )
+
+    def test_reads_do_not_pin_client(self):
+        response = self.client.get(ORDER_URL)
+        request = RequestFactory().get("/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(
+            cache.get(REPLICA_PIN_KEY.format(get_client_key(request)))
+        )
+
+
+@override_settings(DATABASE_REPLICAS=["default"])
+class LaggingReplicaTests(TestCase):
+    """A lagging replica still returns the rows from before the write that
+    bumped a table version, so nothing cached under that version may be
+    read from it. Every pick of the replica is recorded here instead.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("test@test.com", "testpass")
+        )
+        sample_route()
+
+    def get(self, url):
+        with mock.patch(
+            "airport.db_router.random.choice", return_value="default"
+        ) as pick_replica:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return pick_replica.call_count
+
+    def test_cached_lists_are_built_from_primary(self):
+        for url in CACHED_LIST_URLS:
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url), 0)
+
+    def test_route_graph_is_loaded_from_primary(self):
+        self.get(CACHED_LIST_URLS[0])
+        # A write moves the version; the graph is reloaded, still from the
+        # primary.
+        sample_route()
+
+        self.assertEqual(self.get(CACHED_LIST_URLS[0]), 0)
+
+    def test_other_reads_use_replica(self):
+        sample_flight()
+
+        self.assertGreater(self.get(FLIGHT_URL), 0)
@@ -0,0 +1,158 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.fares import attach_fares, compute_fare, load_factor_multiplier
+from airport.models import Flight, Order, Ticket, TicketClass
+
+from airport.tests.tests_flight_api import sample_flight
+
+FLIGHT_URL = reverse("airport:flight-list")
+ORDER_URL = reverse("airport:order-list")
+
+
+def load_flight(flight_id):
+    return (
+        Flight.objects.select_related("route")
+        .with_tickets_available()
+        .get(pk=flight_id)
+    )
+
+
+class FareComputationTests(TestCase):
+    def test_load_factor_curve(self):
+        self.assertEqual(load_factor_multiplier(0, 60), 0.8)
+        self.assertEqual(load_factor_multiplier(30, 60), 1.0)
+        self.assertAlmostEqual(load_factor_multiplier(42, 60), 1.2)
+        self.assertEqual(load_factor_multiplier(60, 60), 1.8)
+
+    def test_load_factor_is_clamped(self):
+        self.assertEqual(load_factor_multiplier(70, 60), 1.8)
+        self.assertEqual(load_factor_multiplier(0, 0), 1.8)
+
+    def test_fare_uses_distance_class_and_load(self):
+        # (30.00 + 0.08 * 1000) * 2.5 * 1.0
+        self.assertEqual(compute_fare(1000, 2.5, 30, 60), Decimal("275.00"))
+        self.assertEqual(compute_fare(1000, 1.0, 0, 60), Decimal("88.00"))
+
+
+class FareCacheTests(TestCase):
+    def setUp(self):
+        TicketClass.objects.create(name="economy")
+        TicketClass.objects.create(name="business", price_multiplier=2.5)
+        self.flight = sample_flight()
+
+    def test_page_is_priced_in_one_query(self):
+        flights = [
+            load_flight(self.flight.id), load_flight(sample_flight().id)
+        ]
+
+        with self.assertNumQueries(1):
+            attach_fares(flights)
+
+        self.assertEqual(
+            flights[0].fares, {"economy": "88.00", "business": "220.00"}
+        )
+        self.assertEqual(flights[1].fares, flights[0].fares)
+
+    def test_cached_fares_need_no_queries(self):
+        attach_fares([load_flight(self.flight.id)])
+        flight = load_flight(self.flight.id)
+
+        with self.assertNumQueries(0):
+            attach_fares([flight])
+
+        self.assertEqual(flight.fares["economy"], "88.00")
+
+    def test_sale_changes_fare(self):
+        attach_fares([load_flight(self.flight.id)])
+        Flight.objects.filter(pk=self.flight.id).update(
+            tickets_sold=F("tickets_sold") + 30
+        )
+        flight = load_flight(self.flight.id)
+
+        attach_fares([flight])
+
+        self.assertEqual(flight.fares["economy"], "110.00")
+
+    def test_ticket_class_change_reprices(self):
+        attach_fares([load_flight(self.flight.id)])
+        TicketClass.objects.filter(name="business").update(
+            price_multiplier=3
+        )
+        # Queryset updates skip the signals, so save one to bump the version.
+        TicketClass.objects.get(name="business").save()
+        flight = load_flight(self.flight.id)
+
+        attach_fares([flight])
+
+        self.assertEqual(flight.fares["business"], "264.00")
+
+    def test_fare_settings_change_reprices(self):
+        attach_fares([load_flight(self.flight.id)])
+        flight = load_flight(self.flight.id)
+
+        with override_settings(FARE_BASE=Decimal("40.00")):
+            attach_fares([flight])
+
+        self.assertEqual(flight.fares["economy"], "96.00")
+
+
+class FareApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        TicketClass.objects.create(name="economy")
+        TicketClass.objects.create(name="business", price_multiplier=2.5)
+        self.flight = sample_flight()
+
+    def test_flight_list_shows_fares(self):
+        response = self.client.get(FLIGHT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data[0]["fares"],
+            {"economy": "88.00", "business": "220.00"},
+        )
+
+    def test_order_stores_fare_of_booking_time(self):
+        response = self.client.post(ORDER_URL, {"tickets": [
+            {"row": 1, "seat": 1, "flight": self.flight.id,
+             "ticket_class": "economy"},
+            {"row": 1, "seat": 2, "flight": self.flight.id,
+             "ticket_class": "business"},
+        ]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [ticket["price"] for ticket in response.data["tickets"]],
+            ["88.00", "220.00"],
+        )
+        self.assertEqual(
+            list(Ticket.objects.values_list("price", flat=True)),
+            [Decimal("88.00"), Decimal("220.00")],
+        )
+
+    def test_order_list_shows_prices_and_current_fares(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(
+            order=order, flight=self.flight, row=1, seat=1,
+            ticket_class=TicketClass.objects.get(name="economy"),
+            price=Decimal("75.50"),
+        )
+        Flight.objects.filter(pk=self.flight.id).update(tickets_sold=30)
+
+        response = self.client.get(ORDER_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ticket = response.data[0]["tickets"][0]
+        self.assertEqual(ticket["price"], "75.50")
+        self.assertEqual(ticket["flight"]["fares"]["economy"], "110.00")
@@ -1,18 +1,43 @@
+import base64
+import csv
+import json
+import tempfile
+from itertools import product
+from unittest import mock
+from collections import defaultdict
 from datetime import datetime, timedelta
+from io import StringIO
+
+from django.core.management import call_command
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
 from django.urls import reverse
-from rest_framework.test import APIClient
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
 
-from airport.models import Crew, Route, Flight
+from airport import itinerary
+from airport.itinerary import MAX_ITINERARIES, _itineraries
+from airport.models import (
+    Airplane,
+    Crew,
+    Route,
+    Flight,
+    Order,
+    Ticket,
+    TicketClass,
+)
 from airport.serializers import FlightListSerializer
+from airport.views import FlightViewSet
 
 from airport.tests.tests_airplane_api import sample_airplane
 from airport.tests.tests_airport_api import sample_airport
 
 CREW_URL = reverse("airport:crew-list")
 FLIGHT_URL = reverse("airport:flight-list")
+FLIGHT_EXPORT_URL = reverse("airport:flight-export")
+FLIGHT_IMPORT_URL = reverse("airport:flight-bulk-import")
 ROUTES_URL = reverse("airport:route-list")
 
 
@@ -20,6 +45,16 @@ def get_detail_flight_url(flight_id):
     return reverse("airport:flight-detail", args=[flight_id])
 
 
+def get_seat_map_url(flight_id):
+    return reverse("airport:flight-seat-map", args=[flight_id])
+
+
+def flight_list_queryset(params):
+    request = Request(APIRequestFactory().get(FLIGHT_URL, params))
+    view = FlightViewSet(request=request, action="list", format_kwarg=None)
+    return view.get_queryset()
+
+
 def sample_route(**params):
     source_airport = sample_airport()
     destination_airport = sample_airport()
@@ -95,7 +130,7 @@ class AuthenticatedFlightApiTests(TestCase):
         for flight in data:
             del flight["tickets_available"]
 
-        flights = Flight.objects.order_by("id")
+        flights = Flight.objects.all()
         serializer = FlightListSerializer(flights, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -115,6 +150,16 @@ class AuthenticatedFlightApiTests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_export_flights_forbidden(self):
+        response = self.client.get(FLIGHT_EXPORT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_flights_forbidden(self):
+        response = self.client.post(FLIGHT_IMPORT_URL, [], format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_filter_by_departure_date(self):
         date_str = self.flight1.departure_time.date().isoformat()
         response = self.client.get(FLIGHT_URL, {"departure_date": date_str})
@@ -168,6 +213,357 @@ class AuthenticatedFlightApiTests(TestCase):
             all(flight["route"] == self.route.id for flight in data)
         )
 
+    def test_list_flights_unpaginated_by_default(self):
+        response = self.client.get(FLIGHT_URL)
+
+        self.assertIsInstance(response.data, list)
+
+    def test_list_flights_page_pagination(self):
+        response = self.client.get(FLIGHT_URL, {"page": 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+
+    def test_list_flights_cursor_pagination(self):
+        for _ in range(4):
+            sample_flight()
+        expected = list(
+            Flight.objects.order_by("-arrival_time", "id")
+            .values_list("id", flat=True)
+        )
+
+        seen = []
+        response = self.client.get(
+            FLIGHT_URL, {"pagination": "cursor", "page_size": 2}
+        )
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            seen.extend(flight["id"] for flight in response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+
+        self.assertEqual(seen, expected)
+
+    def test_filter_by_departure_range(self):
+        day = self.flight1.departure_time.date()
+        later_flight = sample_flight()
+        Flight.objects.filter(pk=later_flight.pk).update(
+            departure_time=self.flight1.departure_time + timedelta(days=3),
+            arrival_time=self.flight1.arrival_time + timedelta(days=3),
+        )
+
+        response = self.client.get(FLIGHT_URL, {
+            "departure_from": day.isoformat(),
+            "departure_to": (day + timedelta(days=1)).isoformat(),
+        })
+
+        ids = [flight["id"] for flight in response.data]
+        self.assertIn(self.flight1.id, ids)
+        self.assertNotIn(later_flight.id, ids)
+
+        response = self.client.get(FLIGHT_URL, {
+            "departure_from": (day + timedelta(days=3)).isoformat(),
+        })
+
+        self.assertEqual(
+            [flight["id"] for flight in response.data], [later_flight.id]
+        )
+
+    def test_filter_by_invalid_departure_date(self):
+        response = self.client.get(FLIGHT_URL, {"departure_date": "01.09"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_flight_without_taken_places(self):
+        url = get_detail_flight_url(self.flight1.id)
+
+        response = self.client.get(url, {"taken_places": "false"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("taken_places", response.data)
+        self.assertIn("taken_places", self.client.get(url).data)
+
+
+class FlightIndexUsageTests(TestCase):
+    """The departure filters must be answered from an index."""
+
+    def setUp(self):
+        self.flight = sample_flight()
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assert_uses_index(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, msg=plan)
+
+    def test_departure_date_uses_departure_index(self):
+        queryset = flight_list_queryset(
+            {"departure_date": self.flight.departure_time.date()}
+        )
+
+        self.assert_uses_index(queryset, "flight_departure_idx")
+
+    def test_route_and_departure_use_composite_index(self):
+        queryset = flight_list_queryset({
+            "route": self.flight.route_id,
+            "departure_from": self.flight.departure_time.date(),
+        })
+
+        self.assert_uses_index(queryset, "flight_route_departure_idx")
+
+    def test_airplane_and_departure_use_composite_index(self):
+        queryset = flight_list_queryset({
+            "airplane": self.flight.airplane_id,
+            "departure_date": self.flight.departure_time.date(),
+        })
+
+        self.assert_uses_index(queryset, "flight_airplane_departure_idx")
+
+
+class FlightSearchApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.airplane = sample_airplane()
+        self.lviv, self.kyiv, self.odesa = (
+            sample_airport() for _ in range(3)
+        )
+        self.lviv_kyiv = sample_route(
+            source=self.lviv, destination=self.kyiv, distance=500
+        )
+        self.kyiv_odesa = sample_route(
+            source=self.kyiv, destination=self.odesa, distance=400
+        )
+        self.lviv_odesa = sample_route(
+            source=self.lviv, destination=self.odesa, distance=800
+        )
+        self.day = datetime(2030, 5, 1)
+
+    def add_flight(self, route, departure_hour, hours=2):
+        departure_time = self.day + timedelta(hours=departure_hour)
+        return Flight.objects.create(
+            route=route,
+            airplane=self.airplane,
+            departure_time=departure_time,
+            arrival_time=departure_time + timedelta(hours=hours),
+        )
+
+    def search(self, **params):
+        defaults = {
+            "from": self.lviv.id,
+            "to": self.odesa.id,
+            "date": self.day.date().isoformat(),
+        }
+        defaults.update(params)
+        return self.client.get(reverse("airport:flight-search"), defaults)
+
+    def test_search_direct_and_connecting_flights(self):
+        direct = self.add_flight(self.lviv_odesa, 9)
+        first_leg = self.add_flight(self.lviv_kyiv, 8)
+        second_leg = self.add_flight(self.kyiv_odesa, 11)
+        self.add_flight(self.kyiv_odesa, 10, hours=1)
+
+        response = self.search()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        itineraries = [
+            [flight["id"] for flight in itinerary["flights"]]
+            for itinerary in response.data
+        ]
+        self.assertEqual(
+            itineraries, [[direct.id], [first_leg.id, second_leg.id]]
+        )
+        self.assertEqual(response.data[1]["stops"], 1)
+        self.assertEqual(response.data[1]["distance"], 900)
+
+    def test_search_without_stops(self):
+        direct = self.add_flight(self.lviv_odesa, 9)
+        self.add_flight(self.lviv_kyiv, 8)
+        self.add_flight(self.kyiv_odesa, 11)
+
+        response = self.search(max_stops=0)
+
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["flights"][0]["id"], direct.id)
+
+    def test_search_skips_other_days_and_sold_out_flights(self):
+        self.add_flight(self.lviv_odesa, 30)
+        sold_out = self.add_flight(self.lviv_odesa, 9)
+        Flight.objects.filter(pk=sold_out.pk).update(
+            tickets_sold=self.airplane.total_seats
+        )
+
+        response = self.search()
+
+        self.assertEqual(response.data, [])
+
+    def test_search_query_count(self):
+        for hour in range(0, 20, 2):
+            self.add_flight(self.lviv_kyiv, hour)
+            self.add_flight(self.kyiv_odesa, hour + 1)
+            self.add_flight(self.lviv_odesa, hour)
+        self.search()
+
+        with self.assertNumQueries(2):
+            self.search()
+
+    def test_search_invalid_params(self):
+        self.assertEqual(
+            self.search(max_stops=5).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            self.search(date="").status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            self.search(to="x").status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_search_same_source_and_destination(self):
+        self.add_flight(self.lviv_odesa, 9)
+
+        response = self.search(to=self.lviv.id)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("to", response.data)
+
+    def test_empty_route_path_has_no_itineraries(self):
+        self.assertEqual(
+            _itineraries([(0, [])], self.day, defaultdict(list), {}, 20), []
+        )
+
+    def test_dense_hub_stops_after_enough_itineraries(self):
+        flights_by_route = defaultdict(list)
+        for route_id, first_hour in enumerate([0, 2, 4]):
+            for minutes in range(0, 40 * 30, 30):
+                departure_time = self.day + timedelta(
+                    hours=first_hour, minutes=minutes
+                )
+                flights_by_route[route_id].append(Flight(
+                    departure_time=departure_time,
+                    arrival_time=departure_time + timedelta(
+                        minutes=(minutes * 7) % 150 + 60
+                    ),
+                ))
+        departures_by_route = {
+            route_id: [flight.departure_time for flight in flights]
+            for route_id, flights in flights_by_route.items()
+        }
+        route_ids = list(flights_by_route)
+        combinations = [
+            legs for legs in product(*flights_by_route.values())
+            if all(
+                itinerary.MIN_CONNECTION_TIME
+                <= after.departure_time - before.arrival_time
+                <= itinerary.MAX_CONNECTION_TIME
+                for before, after in zip(legs, legs[1:])
+            )
+        ]
+        earliest = sorted(
+            legs[-1].arrival_time for legs in combinations
+        )[:MAX_ITINERARIES]
+
+        with mock.patch.object(
+            itinerary, "heappush", wraps=itinerary.heappush
+        ) as heappush:
+            found = _itineraries(
+                [(900, route_ids)],
+                self.day + timedelta(days=1),
+                flights_by_route,
+                departures_by_route,
+                MAX_ITINERARIES,
+            )
+
+        self.assertGreater(len(combinations), 5000)
+        self.assertEqual(
+            [itinerary["arrival_time"] for itinerary in found], earliest
+        )
+        self.assertLess(heappush.call_count, 10 * MAX_ITINERARIES)
+
+
+class SeatMapApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+        order = Order.objects.create(user=self.user)
+        for row, seat in [(1, 1), (1, 2), (2, 6)]:
+            Ticket.objects.create(
+                row=row, seat=seat, flight=self.flight, order=order
+            )
+
+    def test_seat_map_bitmap(self):
+        response = self.client.get(get_seat_map_url(self.flight.id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["rows"], 10)
+        self.assertEqual(response.data["seats_in_row"], 6)
+        self.assertEqual(response.data["taken"], 3)
+        self.assertEqual(response.data["available"], 57)
+        bitmap = base64.b64decode(response.data["occupancy"])
+        self.assertEqual(len(bitmap), 8)
+        self.assertEqual(bitmap[0], 0b11000000)
+        self.assertEqual(bitmap[1], 0b00010000)
+        self.assertFalse(any(bitmap[2:]))
+
+    def test_seat_map_run_length(self):
+        response = self.client.get(
+            get_seat_map_url(self.flight.id), {"encoding": "rle"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["occupancy"], [0, 2, 9, 1, 48])
+
+    def test_seat_map_skips_seats_outside_the_layout(self):
+        order = Order.objects.first()
+        Ticket.objects.create(
+            row=10, seat=6, flight=self.flight, order=order
+        )
+        Ticket.objects.create(
+            row=3, seat=6, flight=self.flight, order=order
+        )
+        Airplane.objects.filter(pk=self.flight.airplane_id).update(
+            rows=9, seats_in_row=5
+        )
+
+        response = self.client.get(
+            get_seat_map_url(self.flight.id), {"encoding": "rle"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["taken"], 2)
+        self.assertEqual(response.data["available"], 43)
+        self.assertEqual(response.data["occupancy"], [0, 2, 43])
+
+    def test_seat_map_query_count(self):
+        with self.assertNumQueries(2):
+            self.client.get(get_seat_map_url(self.flight.id))
+
+    def test_seat_map_unknown_encoding(self):
+        response = self.client.get(
+            get_seat_map_url(self.flight.id), {"encoding": "png"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_seat_map_flight_not_found(self):
+        response = self.client.get(get_seat_map_url(self.flight.id + 100))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
 
 class AdminFlightApiTests(TestCase):
     def setUp(self):
@@ -241,3 +637,169 @@ class AdminFlightApiTests(TestCase):
         response = self.client.post(CREW_URL, data)
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_export_flights_ndjson(self):
+        flights = [sample_flight() for _ in range(3)]
+        Ticket.objects.create(
+            row=1,
+            seat=1,
+            flight=flights[0],
+            order=Order.objects.create(user=self.user),
+            ticket_class=TicketClass.objects.create(name="economy"),
+        )
+
+        response = self.client.get(FLIGHT_EXPORT_URL)
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual([row["id"] for row in rows], [
+            flight.id for flight in flights
+        ])
+        self.assertEqual(rows[0]["tickets_sold"], 1)
+        self.assertEqual(
+            rows[0]["tickets_available"], flights[0].airplane.total_seats - 1
+        )
+        self.assertEqual(
+            rows[0]["source_id"], flights[0].route.source_id
+        )
+
+    def test_export_flights_csv_honors_filters(self):
+        flight = sample_flight()
+        sample_flight()
+
+        response = self.client.get(
+            FLIGHT_EXPORT_URL,
+            {"export_format": "csv", "route": flight.route_id},
+        )
+        rows = list(csv.DictReader(
+            b"".join(response.streaming_content).decode().splitlines()
+        ))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], str(flight.id))
+        self.assertEqual(
+            rows[0]["departure_time"], flight.departure_time.isoformat()
+        )
+
+    def test_export_flights_invalid_format(self):
+        response = self.client.get(
+            FLIGHT_EXPORT_URL, {"export_format": "xml"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def import_csv(self, rows):
+        content = "".join(
+            f"{row}\n"
+            for row in ["route,airplane,departure_time,arrival_time,crew"]
+            + rows
+        )
+        return self.client.post(
+            FLIGHT_IMPORT_URL, content, content_type="text/csv"
+        )
+
+    def test_import_flights_csv(self):
+        crew = f"{self.crew_member_1.id};{self.crew_member_2.id}"
+        response = self.import_csv([
+            f"{self.route.id},{self.airplane.id},"
+            f"2030-01-01T06:00:00,2030-01-01T08:00:00,{crew}",
+            f"{self.route.id},{self.airplane.id},"
+            f"2030-01-02T06:00:00,2030-01-02T08:30:00,",
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"created": 2})
+        first, second = Flight.objects.order_by("departure_time")
+        self.assertEqual(
+            set(first.crew.values_list("id", flat=True)),
+            {self.crew_member_1.id, self.crew_member_2.id},
+        )
+        self.assertEqual(second.crew.count(), 0)
+        self.assertEqual(second.arrival_time, datetime(2030, 1, 2, 8, 30))
+        self.assertEqual(first.tickets_sold, 0)
+
+    def test_import_flights_ndjson(self):
+        content = "\n".join(json.dumps({
+            "route": self.route.id,
+            "airplane": self.airplane.id,
+            "departure_time": f"2030-01-0{day}T06:00:00",
+            "arrival_time": f"2030-01-0{day}T07:00:00",
+            "crew": [self.crew_member_1.id, self.crew_member_1.id],
+        }) for day in range(1, 4))
+
+        response = self.client.post(
+            FLIGHT_IMPORT_URL, content, content_type="application/x-ndjson"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Flight.objects.count(), 3)
+        self.assertEqual(Flight.crew.through.objects.count(), 3)
+
+    def test_import_flights_rejects_invalid_rows(self):
+        response = self.import_csv([
+            f"{self.route.id},{self.airplane.id},"
+            f"2030-01-01T06:00:00,2030-01-01T08:00:00,",
+            f"{self.route.id},{self.airplane.id},"
+            f"2030-01-01T08:00:00,2030-01-01T06:00:00,",
+            f"{self.route.id},{self.airplane.id},tomorrow,2030-01-01,",
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data["rows"]), {"2", "3"})
+        self.assertFalse(Flight.objects.exists())
+
+    def test_import_flights_rejects_unknown_references(self):
+        response = self.client.post(FLIGHT_IMPORT_URL, [{
+            "route": self.route.id,
+            "airplane": self.airplane.id + 100,
+            "departure_time": "2030-01-01T06:00:00",
+            "arrival_time": "2030-01-01T08:00:00",
+            "crew": [self.crew_member_1.id, 999],
+        }], format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["rows"]["1"], [
+            f"Airplane {self.airplane.id + 100} does not exist.",
+            "Crew 999 does not exist.",
+        ])
+        self.assertFalse(Flight.objects.exists())
+
+    def test_import_flights_rejects_non_list_body(self):
+        row = {
+            "route": self.route.id,
+            "airplane": self.airplane.id,
+            "departure_time": "2030-01-01T06:00:00",
+            "arrival_time": "2030-01-01T08:00:00",
+        }
+        for body in (5, row):
+            response = self.client.post(
+                FLIGHT_IMPORT_URL, body, format="json"
+            )
+
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+            self.assertEqual(
+                response.data,
+                {"non_field_errors": ["Expected a list of flights."]},
+            )
+        self.assertFalse(Flight.objects.exists())
+
+    def test_import_flights_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as schedule:
+            schedule.write(
+                "route,airplane,departure_time,arrival_time,crew\n"
+                f"{self.route.id},{self.airplane.id},"
+                f"2030-01-01T06:00:00,2030-01-01T08:00:00,"
+                f"{self.crew_member_1.id}\n"
+            )
+            schedule.flush()
+            call_command("import_flights", schedule.name, stdout=StringIO())
+
+        self.assertEqual(Flight.objects.get().crew.get(), self.crew_member_1)
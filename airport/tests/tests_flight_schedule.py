@@ -0,0 +1,158 @@
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from airport import schedules
+from airport.models import Flight, FlightSchedule
+from airport.schedules import materialize_schedules
+from airport.tests.tests_airplane_api import sample_airplane
+from airport.tests.tests_flight_api import sample_crew, sample_route
+
+MONDAY = date(2030, 1, 7)
+
+
+def sample_schedule(**params):
+    defaults = {
+        "route": sample_route(),
+        "airplane": sample_airplane(),
+        "weekdays": FlightSchedule.EVERY_DAY & ~FlightSchedule.SUNDAY,
+        "departure_time": time(8, 15),
+        "duration": timedelta(hours=2, minutes=5),
+        "valid_from": MONDAY,
+    }
+    defaults.update(params)
+    return FlightSchedule.objects.create(**defaults)
+
+
+class FlightScheduleModelTests(TestCase):
+    def test_departures_follow_weekday_mask(self):
+        schedule = sample_schedule()
+
+        departures = list(
+            schedule.departures(MONDAY, MONDAY + timedelta(days=14))
+        )
+
+        self.assertEqual(len(departures), 12)
+        self.assertNotIn(6, {departure.weekday() for departure in departures})
+        self.assertEqual(departures[0], datetime(2030, 1, 7, 8, 15))
+
+    def test_departures_within_validity(self):
+        schedule = sample_schedule(
+            valid_from=MONDAY + timedelta(days=2),
+            valid_until=MONDAY + timedelta(days=3),
+        )
+
+        departures = list(
+            schedule.departures(MONDAY, MONDAY + timedelta(days=7))
+        )
+
+        self.assertEqual(
+            [departure.date() for departure in departures],
+            [MONDAY + timedelta(days=2), MONDAY + timedelta(days=3)],
+        )
+
+    def test_invalid_schedules(self):
+        for params in (
+            {"weekdays": 0},
+            {"weekdays": 128},
+            {"duration": timedelta(0)},
+            {"valid_until": MONDAY - timedelta(days=1)},
+        ):
+            with self.subTest(params), self.assertRaises(ValidationError):
+                sample_schedule(**params)
+
+    def test_full_clean_reports_missing_fields(self):
+        schedule = FlightSchedule(
+            route=sample_route(),
+            airplane=sample_airplane(),
+            departure_time=time(8, 15),
+            valid_until=MONDAY,
+        )
+
+        with self.assertRaises(ValidationError) as error:
+            schedule.full_clean()
+
+        self.assertIn("duration", error.exception.message_dict)
+        self.assertIn("valid_from", error.exception.message_dict)
+
+
+class MaterializeSchedulesTests(TestCase):
+    def setUp(self):
+        self.crew = [sample_crew(), sample_crew()]
+        self.schedule = sample_schedule()
+        self.schedule.crew.set(self.crew)
+
+    def test_materialize_creates_flights_with_crew(self):
+        created = materialize_schedules(MONDAY, MONDAY + timedelta(days=7))
+
+        self.assertEqual(created, 6)
+        flight = Flight.objects.order_by("departure_time").first()
+        self.assertEqual(flight.schedule, self.schedule)
+        self.assertEqual(flight.route, self.schedule.route)
+        self.assertEqual(flight.arrival_time, datetime(2030, 1, 7, 10, 20))
+        self.assertEqual(set(flight.crew.all()), set(self.crew))
+
+    def test_materialize_is_idempotent(self):
+        materialize_schedules(MONDAY, MONDAY + timedelta(days=7))
+
+        created = materialize_schedules(
+            MONDAY + timedelta(days=3), MONDAY + timedelta(days=10)
+        )
+
+        self.assertEqual(created, 3)
+        self.assertEqual(Flight.objects.count(), 9)
+
+    def test_flights_of_a_concurrent_run_are_skipped(self):
+        pending_flights = schedules._pending_flights
+
+        def racing_run(*args):
+            # Another run creates Tuesday's flight once this one has looked
+            # up the existing flights.
+            Flight.objects.create(
+                route=self.schedule.route,
+                airplane=self.schedule.airplane,
+                schedule=self.schedule,
+                departure_time=datetime(2030, 1, 8, 8, 15),
+                arrival_time=datetime(2030, 1, 8, 10, 20),
+            )
+            return pending_flights(*args)
+
+        with mock.patch.object(schedules, "_pending_flights", racing_run):
+            created = materialize_schedules(
+                MONDAY, MONDAY + timedelta(days=7)
+            )
+
+        self.assertEqual(created, 5)
+        self.assertEqual(Flight.objects.count(), 6)
+
+    def test_materialize_query_count_does_not_grow(self):
+        sample_schedule(route=self.schedule.route).crew.set(self.crew)
+
+        with CaptureQueriesContext(connection) as short:
+            materialize_schedules(MONDAY, MONDAY + timedelta(days=2))
+        with CaptureQueriesContext(connection) as long:
+            materialize_schedules(
+                MONDAY + timedelta(days=2), MONDAY + timedelta(days=60)
+            )
+
+        self.assertEqual(len(short), len(long))
+
+    def test_materialize_schedules_command(self):
+        other = sample_schedule()
+
+        call_command(
+            "materialize_schedules",
+            start=MONDAY,
+            days=7,
+            schedules=[other.id],
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(Flight.objects.filter(schedule=other).count(), 6)
+        self.assertFalse(Flight.objects.filter(schedule=self.schedule))
@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.metrics import MetricsRegistry, render_prometheus
+from airport.worker_files import remove_worker_files
+
+METRICS_URL = reverse("airport:metrics")
+FLIGHT_URL = reverse("airport:flight-list")
+
+
+class MetricsRegistryTests(TestCase):
+    def test_observe_fills_histograms(self):
+        registry = MetricsRegistry()
+
+        registry.observe("flight-list", 200, 0.02, 3)
+        registry.observe("flight-list", 503, 0.7, 120)
+        collected = registry.collect()["flight-list"]
+
+        self.assertEqual(collected["requests"], {"2xx": 1, "5xx": 1})
+        self.assertEqual(collected["errors"], 1)
+        self.assertEqual(sum(collected["duration_buckets"]), 2)
+        self.assertEqual(collected["queries_buckets"][-1], 1)
+        self.assertEqual(collected["queries_sum"], 123)
+
+    def test_collect_adds_up_worker_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = MetricsRegistry(directory)
+            registry.observe("order-create", 201, 0.1, 10)
+            other_worker = MetricsRegistry()
+            other_worker.observe("order-create", 201, 0.2, 10)
+            other_worker.observe("flight-list", 200, 0.01, 2)
+            with open(os.path.join(directory, "metrics-1.json"), "w") as f:
+                json.dump(other_worker.collect(), f)
+
+            collected = registry.collect()
+
+        self.assertEqual(collected["order-create"]["requests"], {"2xx": 2})
+        self.assertEqual(collected["order-create"]["queries_sum"], 20)
+        self.assertIn("flight-list", collected)
+
+    def test_exited_worker_files_are_removed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("metrics-12", "metrics-2", "slow-queries-12"):
+                with open(os.path.join(directory, f"{name}.json"), "w") as f:
+                    json.dump({}, f)
+
+            remove_worker_files(directory, 12)
+            left = sorted(os.listdir(directory))
+            remove_worker_files(directory)
+
+            self.assertEqual(os.listdir(directory), [])
+        self.assertEqual(left, ["metrics-2.json"])
+
+    def test_render_prometheus(self):
+        registry = MetricsRegistry()
+        registry.observe("flight-list", 200, 0.02, 3)
+
+        text = render_prometheus(registry.collect())
+
+        self.assertIn(
+            'airport_requests_total{action="flight-list",status="2xx"} 1',
+            text,
+        )
+        self.assertIn(
+            "airport_request_duration_seconds_bucket"
+            '{action="flight-list",le="0.025"} 1',
+            text,
+        )
+        self.assertIn(
+            "airport_request_duration_seconds_bucket"
+            '{action="flight-list",le="0.01"} 0',
+            text,
+        )
+        self.assertIn(
+            'airport_db_queries_count{action="flight-list"} 1', text
+        )
+
+
+class MetricsApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com", "testpass"
+        )
+        self.admin = get_user_model().objects.create_user(
+            "admin@test.com", "testpass", is_staff=True
+        )
+
+    def test_metrics_forbidden_for_users(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_record_view_actions(self):
+        self.client.force_authenticate(self.user)
+        self.client.get(FLIGHT_URL)
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            'airport_requests_total{action="flight-list",status="2xx"}',
+            response.content.decode(),
+        )
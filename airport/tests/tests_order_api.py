@@ -1,16 +1,23 @@
-from unittest import TestCase
+import io
+import json
 
 from rest_framework import status
 from rest_framework.test import APIClient
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Prefetch
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
-from airport.models import Order, Ticket, TicketClass
+from airport.models import Flight, Order, Ticket, TicketClass
 from airport.serializers import OrderListSerializer
 
-from airport.tests.tests_flight_api import sample_flight
+from airport.tests.tests_flight_api import sample_crew, sample_flight
 
 ORDER_URL = reverse("airport:order-list")
+ORDER_EXPORT_URL = reverse("airport:order-export")
 
 
 class UnauthenticatedOrderApiTests(TestCase):
@@ -63,8 +70,307 @@ class AuthenticatedOrderApiTests(TestCase):
 
         response = self.client.get(ORDER_URL)
 
-        orders = Order.objects.order_by("-created_at")
+        orders = Order.objects.order_by("-created_at").prefetch_related(
+            Prefetch(
+                "tickets__flight",
+                queryset=Flight.objects.with_tickets_available()
+            )
+        )
         serializer = OrderListSerializer(orders, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
+
+    def create_orders(self, count):
+        ticket_class = TicketClass.objects.get_or_create(name="economy")[0]
+        for _ in range(count):
+            flight = sample_flight()
+            flight.crew.add(sample_crew(), sample_crew())
+            order = Order.objects.create(user=self.user)
+            for seat in (1, 2):
+                Ticket.objects.create(
+                    row=1,
+                    seat=seat,
+                    flight=flight,
+                    order=order,
+                    ticket_class=ticket_class,
+                )
+
+    def test_order_list_query_count_is_constant(self):
+        self.create_orders(1)
+        with CaptureQueriesContext(connection) as few_orders:
+            self.client.get(ORDER_URL)
+
+        self.create_orders(5)
+        with CaptureQueriesContext(connection) as many_orders:
+            response = self.client.get(ORDER_URL)
+
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(
+            len(few_orders.captured_queries),
+            len(many_orders.captured_queries),
+        )
+        flight = response.data[0]["tickets"][0]["flight"]
+        self.assertEqual(len(flight["crew"]), 2)
+        self.assertEqual(flight["tickets_available"], 58)
+
+    def test_order_list_compact(self):
+        self.create_orders(2)
+
+        response = self.client.get(ORDER_URL, {"compact": "true"})
+
+        flight = response.data[0]["tickets"][0]["flight"]
+        self.assertEqual(
+            set(flight), {"id", "route", "departure_time", "arrival_time"}
+        )
+        self.assertIn(" to ", flight["route"])
+
+    def test_create_order(self):
+        flight = sample_flight()
+        TicketClass.objects.create(name="economy")
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "flight": flight.id,
+                 "ticket_class": "economy"},
+                {"row": 1, "seat": 2, "flight": flight.id,
+                 "ticket_class": "economy"},
+            ]
+        }
+
+        response = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["tickets"]), 2)
+        self.assertEqual(
+            Ticket.objects.filter(order__user=self.user).count(), 2
+        )
+
+    def test_create_order_query_count_does_not_depend_on_tickets(self):
+        flight = sample_flight()
+        TicketClass.objects.create(name="economy")
+
+        def create_order(seats):
+            payload = {
+                "tickets": [
+                    {"row": row, "seat": seat, "flight": flight.id,
+                     "ticket_class": "economy"}
+                    for row, seat in seats
+                ]
+            }
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(
+                    ORDER_URL, payload, format="json"
+                )
+            self.assertEqual(
+                response.status_code, status.HTTP_201_CREATED
+            )
+            return len(context.captured_queries)
+
+        small_order = create_order([(1, 1)])
+        big_order = create_order(
+            [(row, seat) for row in range(2, 10) for seat in range(1, 7)]
+        )
+
+        self.assertEqual(small_order, big_order)
+
+    def test_create_order_seat_out_of_range(self):
+        flight = sample_flight()
+        TicketClass.objects.create(name="economy")
+        payload = {
+            "tickets": [
+                {"row": 100, "seat": 1, "flight": flight.id,
+                 "ticket_class": "economy"},
+            ]
+        }
+
+        response = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.filter(user=self.user).exists())
+
+    def test_create_order_seat_already_taken(self):
+        flight = sample_flight()
+        ticket_class = TicketClass.objects.create(name="economy")
+        Ticket.objects.create(
+            row=1,
+            seat=1,
+            flight=flight,
+            order=Order.objects.create(user=self.user),
+            ticket_class=ticket_class,
+        )
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 2, "flight": flight.id,
+                 "ticket_class": "economy"},
+                {"row": 1, "seat": 1, "flight": flight.id,
+                 "ticket_class": "economy"},
+            ]
+        }
+
+        response = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Ticket.objects.filter(flight=flight).count(), 1)
+
+    def test_create_order_duplicate_seats(self):
+        flight = sample_flight()
+        TicketClass.objects.create(name="economy")
+        ticket = {"row": 1, "seat": 1, "flight": flight.id,
+                  "ticket_class": "economy"}
+
+        response = self.client.post(
+            ORDER_URL, {"tickets": [ticket, ticket]}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_orders_forbidden(self):
+        response = self.client.get(ORDER_EXPORT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class OrderExportApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            "admin@test.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+
+    def test_export_orders_streams_every_users_tickets(self):
+        flight = sample_flight()
+        ticket_class = TicketClass.objects.create(name="business")
+        users = [
+            get_user_model().objects.create_user(f"user{i}@test.com", "pass")
+            for i in range(2)
+        ]
+        for seat, user in enumerate(users, start=1):
+            Ticket.objects.create(
+                row=2,
+                seat=seat,
+                flight=flight,
+                order=Order.objects.create(user=user),
+                ticket_class=ticket_class,
+            )
+
+        response = self.client.get(ORDER_EXPORT_URL)
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row["user_id"], row["seat"]) for row in rows],
+            [(user.id, seat) for seat, user in enumerate(users, start=1)],
+        )
+        self.assertEqual(rows[0]["ticket_class_name"], "business")
+        self.assertEqual(rows[0]["flight_id"], flight.id)
+
+    def test_export_orders_csv_header(self):
+        response = self.client.get(
+            ORDER_EXPORT_URL, {"export_format": "csv"}
+        )
+        content = b"".join(response.streaming_content).decode()
+
+        self.assertEqual(
+            content.splitlines(),
+            ["order_id,order_created_at,user_id,ticket_id,flight_id,"
+             "row,seat,ticket_class_name"],
+        )
+        self.assertIn("orders.csv", response["Content-Disposition"])
+
+
+class TicketsSoldCounterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+        TicketClass.objects.create(name="economy")
+
+    def tickets_sold(self):
+        self.flight.refresh_from_db()
+        return self.flight.tickets_sold
+
+    def test_counter_follows_order_creation(self):
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": seat, "flight": self.flight.id,
+                 "ticket_class": "economy"}
+                for seat in range(1, 4)
+            ]
+        }
+
+        self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(self.tickets_sold(), 3)
+
+    def test_counter_follows_ticket_create_and_order_delete(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=self.flight, order=order)
+        Ticket.objects.create(row=1, seat=2, flight=self.flight, order=order)
+        self.assertEqual(self.tickets_sold(), 2)
+
+        order.delete()
+
+        self.assertEqual(self.tickets_sold(), 0)
+
+    def fill_order(self, seats):
+        order = Order.objects.create(user=self.user)
+        for seat in range(1, seats + 1):
+            Ticket.objects.create(
+                row=1, seat=seat, flight=self.flight, order=order
+            )
+        return order
+
+    def test_order_delete_queries_do_not_grow_with_tickets(self):
+        small, large = self.fill_order(1), self.fill_order(0)
+        for seat in range(2, 7):
+            Ticket.objects.create(
+                row=2, seat=seat, flight=self.flight, order=large
+            )
+
+        with CaptureQueriesContext(connection) as small_queries:
+            small.delete()
+        with CaptureQueriesContext(connection) as large_queries:
+            large.delete()
+
+        self.assertEqual(len(large_queries), len(small_queries))
+        self.assertEqual(self.tickets_sold(), 0)
+
+    def test_ticket_deletes_release_seats(self):
+        order = self.fill_order(4)
+
+        order.tickets.get(seat=1).delete()
+        self.assertEqual(self.tickets_sold(), 3)
+
+        order.tickets.filter(seat__gt=2).delete()
+        self.assertEqual(self.tickets_sold(), 1)
+
+    def test_flight_delete_removes_its_tickets(self):
+        self.fill_order(3)
+
+        self.flight.delete()
+
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_flight_list_reads_counter(self):
+        Flight.objects.filter(pk=self.flight.pk).update(tickets_sold=5)
+
+        response = self.client.get(reverse("airport:flight-list"))
+
+        self.assertEqual(response.data[0]["tickets_available"], 55)
+
+    def test_recount_tickets_sold_command(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=self.flight, order=order)
+        Flight.objects.filter(pk=self.flight.pk).update(tickets_sold=42)
+
+        call_command("recount_tickets_sold", stdout=io.StringIO())
+
+        self.assertEqual(self.tickets_sold(), 1)
@@ -0,0 +1,59 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from airport.tests.tests_flight_api import sample_flight
+
+FLIGHT_URL = reverse("airport:flight-list")
+SERVER_TIMING = re.compile(
+    r'db;dur=[\d.]+;desc="(\d+) queries", '
+    r"serializer;dur=([\d.]+), view;dur=([\d.]+)"
+)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        sample_flight()
+
+    def get_flights(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.get(FLIGHT_URL)
+
+    def test_disabled_by_default(self):
+        response = self.get_flights()
+
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(PROFILING_ENABLED=True)
+    def test_server_timing_header(self):
+        response = self.get_flights()
+        match = SERVER_TIMING.fullmatch(response["Server-Timing"])
+
+        self.assertIsNotNone(match, response["Server-Timing"])
+        queries, serializer, view = match.groups()
+        self.assertGreaterEqual(int(queries), 2)
+        self.assertGreater(float(serializer), 0)
+        self.assertGreaterEqual(float(view), float(serializer))
+
+    @override_settings(PROFILING_ENABLED=True, PROFILING_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged(self):
+        with self.assertLogs("airport.profiling", "WARNING") as logs:
+            self.get_flights()
+
+        self.assertIn(f"GET {FLIGHT_URL}: 200", logs.output[0])
+
+    @override_settings(
+        PROFILING_ENABLED=True,
+        PROFILING_SLOW_REQUEST_MS=0,
+        PROFILING_SAMPLE_RATE=0,
+    )
+    def test_slow_request_sampling(self):
+        with self.assertNoLogs("airport.profiling"):
+            self.get_flights()
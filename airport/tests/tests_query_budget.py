@@ -0,0 +1,606 @@
+import itertools
+import tempfile
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from airport.availability import rebuild_route_days
+from airport.booking import recount_tickets_sold
+from airport.models import (
+    Airline,
+    Airplane,
+    AirplaneType,
+    Airport,
+    Crew,
+    Flight,
+    Order,
+    Route,
+    Ticket,
+    TicketClass,
+)
+from airport.tests.tests_async_flight_api import ASYNC_TWINS
+from airport.urls import router, urlpatterns as airport_urlpatterns
+from user.urls import urlpatterns as user_urlpatterns
+
+FIRST_DEPARTURE = datetime(2030, 1, 1, 6)
+
+Endpoint = namedtuple(
+    "Endpoint",
+    ["name", "method", "url", "data", "budget", "client", "status"],
+)
+
+
+def endpoint(name, method, url, budget, data=None, client="user",
+             expected_status=status.HTTP_200_OK):
+    return Endpoint(
+        name, method, url, data, budget, client, expected_status
+    )
+
+
+def seed(user, scale):
+    """Add a realistic slice of data, ``scale`` times over."""
+    airplane_type = AirplaneType.objects.create(name=f"type {scale}")
+    airline = Airline.objects.create(name=f"airline {scale}")
+    airports = Airport.objects.bulk_create(
+        Airport(name=f"airport {scale}-{i}", closest_big_city=f"city {i}")
+        for i in range(4 * scale)
+    )
+    routes = Route.objects.bulk_create(
+        Route(source=source, destination=destination, distance=100 + i)
+        for i, (source, destination) in enumerate(
+            zip(airports, airports[1:] + airports[:1])
+        )
+    )
+    airplanes = Airplane.objects.bulk_create(
+        Airplane(
+            name=f"airplane {scale}-{i}",
+            rows=30,
+            seats_in_row=6,
+            airplane_type=airplane_type,
+            airline=airline,
+        )
+        for i in range(2 * scale)
+    )
+    crews = Crew.objects.bulk_create(
+        Crew(first_name=f"first {i}", last_name="last", position="pilot")
+        for i in range(5 * scale)
+    )
+    flights = Flight.objects.bulk_create(
+        Flight(
+            route=routes[i % len(routes)],
+            airplane=airplanes[i % len(airplanes)],
+            departure_time=FIRST_DEPARTURE + timedelta(hours=i),
+            arrival_time=FIRST_DEPARTURE + timedelta(hours=i + 2),
+        )
+        for i in range(10 * scale)
+    )
+    Flight.crew.through.objects.bulk_create(
+        Flight.crew.through(flight=flight, crew=crew)
+        for i, flight in enumerate(flights)
+        for crew in crews[i % len(crews):][:3]
+    )
+    ticket_class = TicketClass.objects.get_or_create(name="economy")[0]
+    orders = Order.objects.bulk_create(
+        Order(user=user) for _ in range(5 * scale)
+    )
+    Ticket.objects.bulk_create(
+        Ticket(
+            row=scale,
+            seat=seat,
+            flight=flights[(i + seat) % len(flights)],
+            order=order,
+            ticket_class=ticket_class,
+        )
+        for i, order in enumerate(orders)
+        for seat in range(1, 4)
+    )
+    recount_tickets_sold()
+    rebuild_route_days()
+
+
+class QueryBudgetTests(TestCase):
+    """Every API action must stay within a query budget that does not
+    grow with the amount of data in the database.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            "user@test.com", "testpass"
+        )
+        cls.admin = get_user_model().objects.create_user(
+            "admin@test.com", "testpass", is_staff=True
+        )
+        cls.unique = itertools.count()
+
+    def new_airline(self):
+        return Airline.objects.create(name=f"airline {next(self.unique)}")
+
+    def new_airplane_type(self):
+        return AirplaneType.objects.create(name=f"type {next(self.unique)}")
+
+    def new_airplane(self):
+        return Airplane.objects.create(
+            name=f"airplane {next(self.unique)}",
+            rows=30,
+            seats_in_row=6,
+            airplane_type=AirplaneType.objects.first(),
+        )
+
+    def new_flight(self):
+        return Flight.objects.create(
+            route=Route.objects.first(),
+            airplane=Airplane.objects.first(),
+            departure_time=FIRST_DEPARTURE,
+            arrival_time=FIRST_DEPARTURE + timedelta(hours=2),
+        )
+
+    def first_route(self):
+        return Route.objects.first()
+
+    def calendar_params(self):
+        return {"month": FIRST_DEPARTURE.strftime("%Y-%m")}
+
+    def busy_flight(self):
+        return Flight.objects.order_by("-tickets_sold").first()
+
+    def flight_payload(self):
+        return {
+            "route": Route.objects.first().id,
+            "airplane": Airplane.objects.first().id,
+            "departure_time": FIRST_DEPARTURE,
+            "arrival_time": FIRST_DEPARTURE + timedelta(hours=2),
+            "crew": list(Crew.objects.values_list("id", flat=True)[:2]),
+        }
+
+    def airplane_payload(self):
+        return {
+            "name": "airplane",
+            "rows": 20,
+            "seats_in_row": 4,
+            "airplane_type": AirplaneType.objects.first().id,
+        }
+
+    def order_payload(self):
+        flight = self.new_flight()
+        return {
+            "tickets": [
+                {"row": 1, "seat": seat, "flight": flight.id,
+                 "ticket_class": "economy"}
+                for seat in range(1, 4)
+            ]
+        }
+
+    def flight_import_payload(self):
+        crew_ids = list(Crew.objects.values_list("id", flat=True)[:3])
+        return [
+            {
+                "route": Route.objects.first().id,
+                "airplane": Airplane.objects.first().id,
+                "departure_time": (
+                    FIRST_DEPARTURE + timedelta(days=30, hours=hour)
+                ).isoformat(),
+                "arrival_time": (
+                    FIRST_DEPARTURE + timedelta(days=30, hours=hour + 2)
+                ).isoformat(),
+                "crew": crew_ids,
+            }
+            for hour in range(5)
+        ]
+
+    def ticket_class_payload(self):
+        TicketClass.objects.filter(name=TicketClass.BUSINESS).delete()
+        return {"name": TicketClass.BUSINESS, "cancellation_policy": "none"}
+
+    def image(self):
+        image_file = tempfile.NamedTemporaryFile(suffix=".jpg")
+        Image.new("RGB", (10, 10)).save(image_file, format="JPEG")
+        image_file.seek(0)
+        self.addCleanup(image_file.close)
+        return {"logo": image_file}
+
+    def search_params(self):
+        route = Route.objects.first()
+        return {
+            "from": route.source_id,
+            "to": Route.objects.filter(
+                source=route.destination_id
+            ).first().destination_id,
+            "date": FIRST_DEPARTURE.date().isoformat(),
+        }
+
+    def refresh_token(self):
+        return {"refresh": str(RefreshToken.for_user(self.user))}
+
+    def access_token(self):
+        return {"token": str(RefreshToken.for_user(self.user).access_token)}
+
+    def new_user(self):
+        return {
+            "email": f"user{next(self.unique)}@test.com",
+            "password": "testpass",
+        }
+
+    @staticmethod
+    def detail(name, factory):
+        return lambda test: reverse(name, args=[factory(test).id])
+
+    @property
+    def endpoints(self):
+        detail = self.detail
+        created = status.HTTP_201_CREATED
+        deleted = status.HTTP_204_NO_CONTENT
+        return [
+            endpoint(
+                "airport-list", "get",
+                lambda t: reverse("airport:airport-list"), budget=1,
+            ),
+            endpoint(
+                "airport-create", "post",
+                lambda t: reverse("airport:airport-list"), budget=1,
+                data=lambda t: {"name": "new", "closest_big_city": "city"},
+                client="admin", expected_status=created,
+            ),
+            endpoint(
+                "ticketclass-list", "get",
+                lambda t: reverse("airport:ticketclass-list"), budget=1,
+            ),
+            endpoint(
+                "ticketclass-create", "post",
+                lambda t: reverse("airport:ticketclass-list"), budget=2,
+                data=type(self).ticket_class_payload,
+                client="admin", expected_status=created,
+            ),
+            endpoint(
+                "route-list", "get",
+                lambda t: reverse("airport:route-list"), budget=2,
+            ),
+            # RouteSerializer nests airports and cannot create routes,
+            # so only the validation path of route-create is budgeted.
+            endpoint(
+                "route-create", "post",
+                lambda t: reverse("airport:route-list"), budget=0,
+                data=lambda t: {"distance": 100}, client="admin",
+                expected_status=status.HTTP_400_BAD_REQUEST,
+            ),
+            endpoint(
+                "route-calendar", "get",
+                detail("airport:route-calendar", type(self).first_route),
+                budget=1, data=type(self).calendar_params,
+            ),
+            endpoint(
+                "airline-list", "get",
+                lambda t: reverse("airport:airline-list"), budget=1,
+            ),
+            endpoint(
+                "airline-create", "post",
+                lambda t: reverse("airport:airline-list"), budget=1,
+                data=lambda t: {"name": "new"}, client="admin",
+                expected_status=created,
+            ),
+            endpoint(
+                "airline-retrieve", "get",
+                detail("airport:airline-detail", type(self).new_airline),
+                budget=1,
+            ),
+            endpoint(
+                "airline-update", "put",
+                detail("airport:airline-detail", type(self).new_airline),
+                budget=2, data=lambda t: {"name": "renamed"},
+                client="admin",
+            ),
+            endpoint(
+                "airline-partial-update", "patch",
+                detail("airport:airline-detail", type(self).new_airline),
+                budget=2, data=lambda t: {"name": "renamed"},
+                client="admin",
+            ),
+            endpoint(
+                "airline-destroy", "delete",
+                detail("airport:airline-detail", type(self).new_airline),
+                budget=3, client="admin", expected_status=deleted,
+            ),
+            endpoint(
+                "airline-upload-image", "post",
+                detail(
+                    "airport:airline-upload-image", type(self).new_airline
+                ),
+                budget=2, data=type(self).image, client="admin",
+            ),
+            endpoint(
+                "airplanetype-list", "get",
+                lambda t: reverse("airport:airplanetype-list"), budget=1,
+            ),
+            endpoint(
+                "airplanetype-create", "post",
+                lambda t: reverse("airport:airplanetype-list"), budget=1,
+                data=lambda t: {"name": "new"}, client="admin",
+                expected_status=created,
+            ),
+            endpoint(
+                "airplanetype-retrieve", "get",
+                detail(
+                    "airport:airplanetype-detail",
+                    type(self).new_airplane_type,
+                ),
+                budget=1,
+            ),
+            endpoint(
+                "airplanetype-update", "put",
+                detail(
+                    "airport:airplanetype-detail",
+                    type(self).new_airplane_type,
+                ),
+                budget=2, data=lambda t: {"name": "renamed"},
+                client="admin",
+            ),
+            endpoint(
+                "airplanetype-partial-update", "patch",
+                detail(
+                    "airport:airplanetype-detail",
+                    type(self).new_airplane_type,
+                ),
+                budget=2, data=lambda t: {"name": "renamed"},
+                client="admin",
+            ),
+            endpoint(
+                "airplanetype-destroy", "delete",
+                detail(
+                    "airport:airplanetype-detail",
+                    type(self).new_airplane_type,
+                ),
+                budget=3, client="admin", expected_status=deleted,
+            ),
+            endpoint(
+                "airplane-list", "get",
+                lambda t: reverse("airport:airplane-list"), budget=1,
+            ),
+            endpoint(
+                "airplane-create", "post",
+                lambda t: reverse("airport:airplane-list"), budget=2,
+                data=type(self).airplane_payload, client="admin",
+                expected_status=created,
+            ),
+            endpoint(
+                "airplane-retrieve", "get",
+                detail("airport:airplane-detail", type(self).new_airplane),
+                budget=1,
+            ),
+            endpoint(
+                "airplane-update", "put",
+                detail("airport:airplane-detail", type(self).new_airplane),
+                budget=4, data=type(self).airplane_payload, client="admin",
+            ),
+            endpoint(
+                "airplane-partial-update", "patch",
+                detail("airport:airplane-detail", type(self).new_airplane),
+                budget=3, data=lambda t: {"name": "renamed"},
+                client="admin",
+            ),
+            endpoint(
+                "airplane-destroy", "delete",
+                detail("airport:airplane-detail", type(self).new_airplane),
+                budget=4, client="admin", expected_status=deleted,
+            ),
+            endpoint(
+                "crew-list", "get",
+                lambda t: reverse("airport:crew-list"), budget=1,
+            ),
+            endpoint(
+                "crew-create", "post",
+                lambda t: reverse("airport:crew-list"), budget=1,
+                data=lambda t: {
+                    "first_name": "first",
+                    "last_name": "last",
+                    "position": "pilot",
+                },
+                client="admin", expected_status=created,
+            ),
+            endpoint(
+                "flight-list", "get",
+                lambda t: reverse("airport:flight-list"), budget=3,
+            ),
+            endpoint(
+                "flight-create", "post",
+                lambda t: reverse("airport:flight-list"), budget=13,
+                data=type(self).flight_payload, client="admin",
+                expected_status=created,
+            ),
+            endpoint(
+                "flight-search", "get",
+                lambda t: reverse("airport:flight-search"), budget=5,
+                data=type(self).search_params,
+            ),
+            endpoint(
+                "flight-retrieve", "get",
+                detail("airport:flight-detail", type(self).busy_flight),
+                budget=5,
+            ),
+            endpoint(
+                "flight-update", "put",
+                detail("airport:flight-detail", type(self).new_flight),
+                budget=13, data=type(self).flight_payload, client="admin",
+            ),
+            endpoint(
+                "flight-partial-update", "patch",
+                detail("airport:flight-detail", type(self).new_flight),
+                budget=7,
+                data=lambda t: {"departure_time": FIRST_DEPARTURE},
+                client="admin",
+            ),
+            endpoint(
+                "flight-destroy", "delete",
+                detail("airport:flight-detail", type(self).new_flight),
+                budget=10, client="admin", expected_status=deleted,
+            ),
+            endpoint(
+                "flight-seat-map", "get",
+                detail("airport:flight-seat-map", type(self).busy_flight),
+                budget=2,
+            ),
+            endpoint(
+                "flight-export", "get",
+                lambda t: reverse("airport:flight-export"), budget=1,
+                client="admin",
+            ),
+            endpoint(
+                "flight-bulk-import", "post",
+                lambda t: reverse("airport:flight-bulk-import"), budget=12,
+                data=type(self).flight_import_payload, client="admin",
+                expected_status=created,
+            ),
+            endpoint(
+                "order-list", "get",
+                lambda t: reverse("airport:order-list"), budget=5,
+            ),
+            endpoint(
+                "metrics", "get",
+                lambda t: reverse("airport:metrics"), budget=0,
+                client="admin",
+            ),
+            endpoint(
+                "slow-queries", "get",
+                lambda t: reverse("airport:slow-queries"), budget=0,
+                client="admin",
+            ),
+            endpoint(
+                "order-export", "get",
+                lambda t: reverse("airport:order-export"), budget=1,
+                client="admin",
+            ),
+            endpoint(
+                "order-create", "post",
+                lambda t: reverse("airport:order-list"), budget=12,
+                data=type(self).order_payload, expected_status=created,
+            ),
+            endpoint(
+                "user-create", "post",
+                lambda t: reverse("user:create"), budget=2,
+                data=type(self).new_user, client=None,
+                expected_status=created,
+            ),
+            endpoint(
+                "user-token-obtain-pair", "post",
+                lambda t: reverse("user:token_obtain_pair"), budget=1,
+                data=lambda t: {
+                    "email": "user@test.com", "password": "testpass"
+                },
+                client=None,
+            ),
+            endpoint(
+                "user-token-refresh", "post",
+                lambda t: reverse("user:token_refresh"), budget=0,
+                data=type(self).refresh_token, client=None,
+            ),
+            endpoint(
+                "user-token-verify", "post",
+                lambda t: reverse("user:token_verify"), budget=0,
+                data=type(self).access_token, client=None,
+            ),
+            endpoint(
+                "user-manage-retrieve", "get",
+                lambda t: reverse("user:manage"), budget=0,
+            ),
+            endpoint(
+                "user-manage-update", "put",
+                lambda t: reverse("user:manage"), budget=3,
+                data=lambda t: {
+                    "email": "user@test.com", "password": "testpass"
+                },
+            ),
+            endpoint(
+                "user-manage-partial-update", "patch",
+                lambda t: reverse("user:manage"), budget=2,
+                data=lambda t: {"email": "user@test.com"},
+            ),
+        ]
+
+    def measure(self, endpoint):
+        # Caches and throttle history are dropped so every endpoint is
+        # measured cold and the same way on each run.
+        cache.clear()
+        client = APIClient()
+        if endpoint.client:
+            client.force_authenticate(getattr(self, endpoint.client))
+        url = endpoint.url(self)
+        data = endpoint.data(self) if endpoint.data else None
+        send = getattr(client, endpoint.method)
+        options = {}
+        if endpoint.method != "get":
+            options["format"] = (
+                "multipart" if endpoint.name.endswith("upload-image")
+                else "json"
+            )
+
+        with CaptureQueriesContext(connection) as context:
+            response = send(url, data, **options)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertEqual(
+            response.status_code,
+            endpoint.status,
+            msg=f"{endpoint.name}: {getattr(response, 'data', '')}",
+        )
+        return context.captured_queries
+
+    def assert_query_budget(self, endpoint, small_queries, large_queries):
+        if (
+            len(large_queries) <= endpoint.budget
+            and len(small_queries) == len(large_queries)
+        ):
+            return
+        sql = "\n".join(
+            f"  {number}. {query['sql']}"
+            for number, query in enumerate(large_queries, start=1)
+        )
+        self.fail(
+            f"{endpoint.name} ran {len(small_queries)} queries on the small "
+            f"dataset and {len(large_queries)} on the large one "
+            f"(budget {endpoint.budget}):\n{sql}"
+        )
+
+    def test_every_action_has_a_budget(self):
+        names = {endpoint.name for endpoint in self.endpoints}
+        for prefix, viewset, basename in router.registry:
+            for route in router.get_routes(viewset):
+                for action in route.mapping.values():
+                    if hasattr(viewset, action):
+                        name = f"{basename}-{action.replace('_', '-')}"
+                        self.assertIn(name, names)
+        # Views outside the router; the async ones query on other
+        # connections and are held to their sync twin's count instead.
+        for pattern in airport_urlpatterns:
+            if isinstance(pattern, URLPattern):
+                self.assertIn(
+                    ASYNC_TWINS.get(pattern.name, pattern.name), names
+                )
+        for pattern in user_urlpatterns:
+            self.assertTrue(
+                any(name.startswith(f"user-{pattern.name.replace('_', '-')}")
+                    for name in names),
+                msg=pattern.name,
+            )
+
+    def test_query_budgets(self):
+        seed(self.user, scale=1)
+        small = {
+            endpoint.name: self.measure(endpoint)
+            for endpoint in self.endpoints
+        }
+
+        seed(self.user, scale=6)
+        for endpoint in self.endpoints:
+            with self.subTest(endpoint.name):
+                self.assert_query_budget(
+                    endpoint, small[endpoint.name], self.measure(endpoint)
+                )
@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.models import Route
+from airport.route_graph import get_route_graph
+from airport.serializers import RouteSerializer
+
+from airport.tests.tests_airport_api import sample_airport
+from airport.tests.tests_flight_api import sample_route
+
+ROUTES_URL = reverse("airport:route-list")
+
+
+class UnauthenticatedRouteApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        res = self.client.get(ROUTES_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AuthenticatedRouteApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.route = sample_route()
+
+    def test_route_list(self):
+        sample_route(distance=300)
+
+        res = self.client.get(ROUTES_URL)
+
+        routes = Route.objects.order_by("id")
+        serializer = RouteSerializer(routes, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), serializer.data)
+
+    def test_route_list_served_from_cached_graph(self):
+        self.client.get(ROUTES_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ROUTES_URL)
+
+        self.assertEqual(len(res.json()), 1)
+
+    def test_route_graph_reloaded_after_changes(self):
+        graph = get_route_graph()
+        self.assertIs(get_route_graph(), graph)
+
+        new_route = sample_route()
+        self.route.source.name = "Renamed"
+        self.route.source.save()
+
+        routes = {
+            route["id"]: route
+            for route in self.client.get(ROUTES_URL).json()
+        }
+        self.assertIsNot(get_route_graph(), graph)
+        self.assertIn(new_route.id, routes)
+        self.assertEqual(routes[self.route.id]["source"]["name"], "Renamed")
+
+    def test_route_graph_shortest_paths(self):
+        airports = [sample_airport() for _ in range(3)]
+        long_route = sample_route(
+            source=airports[0], destination=airports[2], distance=1000
+        )
+        first_leg = sample_route(
+            source=airports[0], destination=airports[1], distance=300
+        )
+        second_leg = sample_route(
+            source=airports[1], destination=airports[2], distance=400
+        )
+
+        paths = get_route_graph().shortest_paths(
+            airports[0].id, airports[2].id, max_legs=2, limit=5
+        )
+
+        self.assertEqual(
+            paths,
+            [(700, [first_leg.id, second_leg.id]), (1000, [long_route.id])],
+        )
@@ -0,0 +1,301 @@
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport import availability as rollup
+from airport.availability import rebuild_route_days, refresh_route_days
+from airport.models import (
+    Flight,
+    Order,
+    RouteDayAvailability,
+    Ticket,
+    TicketClass,
+)
+
+from airport.tests.tests_airplane_api import sample_airplane
+from airport.tests.tests_flight_api import sample_route
+
+ORDER_URL = reverse("airport:order-list")
+DAY = date(2030, 3, 14)
+
+
+def calendar_url(route_id):
+    return reverse("airport:route-calendar", args=[route_id])
+
+
+def create_flight(route, airplane, day=DAY, hour=10):
+    departure_time = datetime.combine(day, datetime.min.time()).replace(
+        hour=hour
+    )
+    return Flight.objects.create(
+        route=route,
+        airplane=airplane,
+        departure_time=departure_time,
+        arrival_time=departure_time + timedelta(hours=2),
+    )
+
+
+def availability(route, day=DAY):
+    return RouteDayAvailability.objects.filter(
+        route=route, date=day
+    ).values_list(
+        "flights", "min_seats_available", "max_seats_available"
+    ).first()
+
+
+class RouteDayAvailabilityTests(TestCase):
+    def setUp(self):
+        self.route = sample_route()
+        self.airplane = sample_airplane()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+
+    def test_flights_are_counted_per_day(self):
+        create_flight(self.route, self.airplane, hour=8)
+        create_flight(self.route, self.airplane, hour=20)
+        create_flight(self.route, self.airplane, day=DAY + timedelta(days=1))
+
+        self.assertEqual(availability(self.route), (2, 60, 60))
+        self.assertEqual(
+            availability(self.route, DAY + timedelta(days=1)), (1, 60, 60)
+        )
+
+    def test_booking_updates_free_seats(self):
+        flight = create_flight(self.route, self.airplane)
+        create_flight(self.route, self.airplane, hour=20)
+        TicketClass.objects.create(name="economy")
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post(ORDER_URL, {"tickets": [
+            {"row": 1, "seat": seat, "flight": flight.id,
+             "ticket_class": "economy"}
+            for seat in (1, 2)
+        ]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(availability(self.route), (2, 58, 60))
+
+    def test_ticket_delete_frees_seat(self):
+        flight = create_flight(self.route, self.airplane)
+        order = Order.objects.create(user=self.user)
+        ticket = Ticket.objects.create(
+            order=order, flight=flight, row=1, seat=1
+        )
+        self.assertEqual(availability(self.route), (1, 59, 59))
+
+        ticket.delete()
+
+        self.assertEqual(availability(self.route), (1, 60, 60))
+
+    def test_moved_ticket_updates_both_flights(self):
+        flight = create_flight(self.route, self.airplane)
+        other_day = DAY + timedelta(days=1)
+        other_flight = create_flight(self.route, self.airplane, day=other_day)
+        order = Order.objects.create(user=self.user)
+        ticket = Ticket.objects.create(
+            order=order, flight=flight, row=1, seat=1
+        )
+
+        ticket.flight = other_flight
+        ticket.save()
+
+        self.assertEqual(availability(self.route), (1, 60, 60))
+        self.assertEqual(availability(self.route, other_day), (1, 59, 59))
+        self.assertEqual(
+            list(Flight.objects.order_by("id").values_list(
+                "tickets_sold", flat=True
+            )),
+            [0, 1],
+        )
+
+    def test_moved_flight_leaves_its_old_day(self):
+        flight = create_flight(self.route, self.airplane)
+        other_route = sample_route()
+
+        flight.route = other_route
+        flight.departure_time += timedelta(days=1)
+        flight.arrival_time += timedelta(days=1)
+        flight.save()
+
+        self.assertIsNone(availability(self.route))
+        self.assertEqual(
+            availability(other_route, DAY + timedelta(days=1)), (1, 60, 60)
+        )
+
+    def test_deleted_flight_is_removed(self):
+        create_flight(self.route, self.airplane).delete()
+
+        self.assertIsNone(availability(self.route))
+
+    def test_airplane_capacity_change(self):
+        create_flight(self.route, self.airplane)
+
+        self.airplane.rows = 20
+        self.airplane.save()
+
+        self.assertEqual(availability(self.route), (1, 120, 120))
+
+    def test_unchanged_day_is_not_locked_or_written(self):
+        create_flight(self.route, self.airplane)
+
+        with CaptureQueriesContext(connection) as queries:
+            refresh_route_days([(self.route.id, DAY)])
+
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(
+            any("UPDATE" in query["sql"] for query in queries.captured_queries)
+        )
+
+    def test_row_inserted_concurrently_is_recomputed(self):
+        flight = create_flight(self.route, self.airplane)
+        RouteDayAvailability.objects.all().delete()
+        Flight.objects.filter(pk=flight.pk).update(tickets_sold=4)
+        totals = rollup._totals
+
+        def racing_totals(flights_filter):
+            result = totals(flights_filter)
+            if not RouteDayAvailability.objects.exists():
+                # A concurrent refresh inserts the day with older totals
+                # once this one found it missing.
+                RouteDayAvailability.objects.create(
+                    route=self.route, date=DAY, flights=1,
+                    min_seats_available=60, max_seats_available=60,
+                )
+            return result
+
+        with mock.patch.object(rollup, "_totals", racing_totals):
+            refresh_route_days([(self.route.id, DAY)])
+
+        self.assertEqual(availability(self.route), (1, 56, 56))
+
+    def test_rebuild_matches_incremental_rollup(self):
+        flight = create_flight(self.route, self.airplane)
+        create_flight(self.route, self.airplane, day=DAY + timedelta(days=3))
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(order=order, flight=flight, row=2, seat=2)
+        incremental = list(RouteDayAvailability.objects.values_list(
+            "route", "date", "flights",
+            "min_seats_available", "max_seats_available",
+        ))
+        RouteDayAvailability.objects.all().delete()
+
+        written = rebuild_route_days()
+
+        self.assertEqual(written, 2)
+        self.assertEqual(
+            list(RouteDayAvailability.objects.values_list(
+                "route", "date", "flights",
+                "min_seats_available", "max_seats_available",
+            )),
+            incremental,
+        )
+
+    def test_rebuild_availability_command(self):
+        create_flight(self.route, self.airplane)
+        create_flight(self.route, self.airplane, day=DAY + timedelta(days=1))
+        RouteDayAvailability.objects.all().delete()
+        out = StringIO()
+
+        call_command(
+            "rebuild_availability",
+            route=[self.route.id],
+            start=DAY,
+            end=DAY + timedelta(days=1),
+            stdout=out,
+        )
+
+        self.assertIn("Rebuilt availability of 1 route days", out.getvalue())
+        self.assertEqual(RouteDayAvailability.objects.count(), 1)
+
+
+class RouteCalendarApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.route = sample_route()
+        self.airplane = sample_airplane()
+
+    def test_calendar_lists_days_of_month(self):
+        create_flight(self.route, self.airplane)
+        create_flight(self.route, self.airplane, day=date(2030, 3, 31))
+        create_flight(self.route, self.airplane, day=date(2030, 4, 1))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                calendar_url(self.route.id), {"month": "2030-03"}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["route"], self.route.id)
+        self.assertEqual(response.data["month"], "2030-03")
+        self.assertEqual(
+            response.data["days"],
+            [
+                {"date": "2030-03-14", "flights": 1,
+                 "min_seats_available": 60, "max_seats_available": 60},
+                {"date": "2030-03-31", "flights": 1,
+                 "min_seats_available": 60, "max_seats_available": 60},
+            ],
+        )
+
+    def test_calendar_defaults_to_current_month(self):
+        response = self.client.get(calendar_url(self.route.id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["month"], date.today().strftime("%Y-%m")
+        )
+        self.assertEqual(response.data["days"], [])
+
+    def test_calendar_december_ends_with_the_year(self):
+        create_flight(self.route, self.airplane, day=date(2030, 12, 31))
+        create_flight(self.route, self.airplane, day=date(2031, 1, 1))
+
+        response = self.client.get(
+            calendar_url(self.route.id), {"month": "2030-12"}
+        )
+
+        self.assertEqual(
+            [day["date"] for day in response.data["days"]], ["2030-12-31"]
+        )
+
+    def test_calendar_last_representable_month(self):
+        response = self.client.get(
+            calendar_url(self.route.id), {"month": "9999-12"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["days"], [])
+
+    def test_calendar_invalid_month(self):
+        response = self.client.get(
+            calendar_url(self.route.id), {"month": "March"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_calendar_unknown_route(self):
+        response = self.client.get(calendar_url(0), {"month": "2030-03"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_calendar_auth_required(self):
+        self.client.force_authenticate(None)
+
+        response = self.client.get(calendar_url(self.route.id))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,85 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import Count, F, Q
+from django.test import TestCase
+
+from airport.models import Airport, Flight, Order, Route, Ticket
+
+
+class SeedAirportCommandTests(TestCase):
+    def seed(self, **options):
+        options = {
+            "airports": 6,
+            "flights": 20,
+            "orders": 300,
+            "users": 5,
+            "crews": 8,
+            "batch_size": 64,
+            **options,
+        }
+        call_command("seed_airport", stdout=StringIO(), **options)
+
+    def test_seed_airport_creates_dataset(self):
+        self.seed()
+
+        self.assertEqual(Airport.objects.count(), 6)
+        self.assertEqual(Route.objects.count(), 6 * 5)
+        self.assertEqual(Flight.objects.count(), 20)
+        self.assertEqual(Order.objects.count(), 300)
+        self.assertFalse(Order.objects.filter(tickets=None).exists())
+
+    def test_seed_airport_respects_airplane_seats(self):
+        self.seed(orders=5_000)
+
+        self.assertFalse(Ticket.objects.filter(
+            Q(row__lt=1)
+            | Q(seat__lt=1)
+            | Q(row__gt=F("flight__airplane__rows"))
+            | Q(seat__gt=F("flight__airplane__seats_in_row"))
+        ).exists())
+        self.assertFalse(
+            Ticket.objects.values("flight", "row", "seat")
+            .annotate(count=Count("id"))
+            .filter(count__gt=1)
+            .exists()
+        )
+
+    def test_seed_airport_counts_tickets_sold(self):
+        self.seed()
+
+        for flight in Flight.objects.annotate(sold=Count("tickets")):
+            self.assertEqual(flight.tickets_sold, flight.sold)
+
+    def test_seed_airport_is_deterministic(self):
+        self.seed(seed=7)
+        first = list(
+            Ticket.objects.order_by("id").values_list(
+                "row", "seat", "flight__departure_time", "order__user__email"
+            )
+        )
+        Order.objects.all().delete()
+        Flight.objects.all().delete()
+        Route.objects.all().delete()
+        Airport.objects.all().delete()
+
+        self.seed(seed=7)
+        second = list(
+            Ticket.objects.order_by("id").values_list(
+                "row", "seat", "flight__departure_time", "order__user__email"
+            )
+        )
+
+        self.assertEqual(first, second)
+
+    def test_seed_airport_needs_two_airports_for_flights(self):
+        with self.assertRaises(CommandError):
+            self.seed(airports=1)
+
+        self.assertFalse(Airport.objects.exists())
+
+    def test_seed_airport_needs_users_for_orders(self):
+        with self.assertRaises(CommandError):
+            self.seed(users=0)
+
+        self.assertFalse(Airport.objects.exists())
@@ -0,0 +1,150 @@
+import json
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.slow_queries import (
+    FILE_PREFIX,
+    SlowQueryLog,
+    explain,
+    fingerprint,
+)
+from airport.worker_files import worker_file_path
+
+SLOW_QUERIES_URL = reverse("airport:slow-queries")
+
+
+class FingerprintTests(TestCase):
+    def test_literals_and_in_lists_are_normalized(self):
+        first = fingerprint(
+            "SELECT * FROM airport_flight WHERE id IN (%s, %s) LIMIT 21"
+        )
+        second = fingerprint(
+            "SELECT * FROM  airport_flight WHERE id IN (%s, %s, %s) LIMIT 5"
+        )
+
+        self.assertEqual(first, second)
+        self.assertEqual(
+            first[1], "SELECT * FROM airport_flight WHERE id IN (...) LIMIT ?"
+        )
+
+    def test_different_queries_differ(self):
+        self.assertNotEqual(
+            fingerprint("SELECT * FROM airport_route")[0],
+            fingerprint("SELECT * FROM airport_airport")[0],
+        )
+
+
+class SlowQueryLogTests(TestCase):
+    def test_slow_queries_are_aggregated(self):
+        log = SlowQueryLog(threshold=0, capture_plans=False)
+
+        with self.assertLogs("airport.slow_queries") as logs:
+            with connection.execute_wrapper(log):
+                list(get_user_model().objects.filter(pk=1))
+                list(get_user_model().objects.filter(pk=2))
+        entries = log.top()
+
+        self.assertEqual(len(logs.records), 1)
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["count"], 2)
+        self.assertIsNone(entries[0]["plan"])
+
+    def test_fast_queries_are_ignored(self):
+        log = SlowQueryLog(threshold=60, capture_plans=False)
+
+        with connection.execute_wrapper(log):
+            list(get_user_model().objects.all())
+
+        self.assertEqual(log.top(), [])
+
+    def test_plan_is_captured(self):
+        log = SlowQueryLog(threshold=0)
+
+        with mock.patch.object(
+            log.executor, "submit", lambda function, *args: function(*args)
+        ), self.assertLogs("airport.slow_queries"):
+            with connection.execute_wrapper(log):
+                list(get_user_model().objects.filter(email="user@test.com"))
+
+        self.assertIn("user_user", log.top()[0]["plan"])
+
+    def test_explain(self):
+        plan = explain(
+            "default", "SELECT * FROM airport_flight WHERE id = %s", [1]
+        )
+
+        self.assertIn("airport_flight", plan)
+
+    def test_collect_reads_worker_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log = SlowQueryLog(0, directory, capture_plans=False)
+            other_worker = SlowQueryLog(0, capture_plans=False)
+            with self.assertLogs("airport.slow_queries"):
+                log.record("default", "SELECT 1", None, 0.2)
+                other_worker.record("default", "SELECT 2", None, 0.3)
+            path = worker_file_path(directory, FILE_PREFIX, pid=1)
+            with open(path, "w") as f:
+                json.dump(other_worker.entries, f)
+
+            entries = log.top()
+            log.reset()
+
+            self.assertEqual(len(log.top()), 0)
+        self.assertEqual(entries[0]["count"], 2)
+        self.assertAlmostEqual(entries[0]["total_ms"], 500)
+
+
+class SlowQueryApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_slow_queries_forbidden_for_users(self):
+        user = get_user_model().objects.create_user(
+            "user@test.com", "testpass"
+        )
+        self.client.force_authenticate(user)
+
+        response = self.client.get(SLOW_QUERIES_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_slow_queries_listed_for_admin(self):
+        admin = get_user_model().objects.create_user(
+            "admin@test.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(admin)
+        log = SlowQueryLog(threshold=0, capture_plans=False)
+        with self.assertLogs("airport.slow_queries"):
+            log.record("default", "SELECT * FROM airport_route", None, 0.25)
+
+        with mock.patch("airport.views.get_slow_query_log", return_value=log):
+            response = self.client.get(SLOW_QUERIES_URL, {"limit": 5})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data[0]["sql"], "SELECT * FROM airport_route"
+        )
+
+    def test_command_lists_slow_queries(self):
+        log = SlowQueryLog(threshold=0, capture_plans=False)
+        with self.assertLogs("airport.slow_queries"):
+            log.record("default", "SELECT * FROM airport_route", None, 0.25)
+        out = StringIO()
+
+        with mock.patch(
+            "airport.management.commands.slow_queries.get_slow_query_log",
+            return_value=log,
+        ):
+            call_command("slow_queries", stdout=out)
+
+        self.assertIn("SELECT * FROM airport_route", out.getvalue())
@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from airport.throttling import ActionRateThrottle, UserRateThrottle
+
+SEARCH_URL = reverse("airport:flight-search")
+
+
+class ThreePerMinuteThrottle(UserRateThrottle):
+    rate = "3/min"
+
+    def __init__(self, now):
+        super().__init__()
+        self.timer = lambda: now
+
+
+class FakeView:
+    def __init__(self, action):
+        self.action = action
+        self.throttle_scopes = {"search": "flight_search"}
+
+
+class SlidingWindowThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com", "testpass"
+        )
+        self.request = APIRequestFactory().get("/")
+        self.request.user = self.user
+
+    def allow(self, now, view=None):
+        throttle = ThreePerMinuteThrottle(now)
+        return throttle, throttle.allow_request(self.request, view)
+
+    def test_requests_over_rate_are_rejected(self):
+        results = [self.allow(60 + second)[1] for second in range(4)]
+
+        self.assertEqual(results, [True, True, True, False])
+
+    def test_rejected_requests_do_not_count(self):
+        for second in range(5):
+            self.allow(60 + second)
+
+        throttle, allowed = self.allow(125)
+
+        self.assertFalse(allowed)
+        self.assertEqual(throttle.previous, 3)
+
+    def test_previous_window_fades_out(self):
+        for second in range(3):
+            self.allow(60 + second)
+
+        throttle, allowed = self.allow(130)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 10)
+        self.assertTrue(self.allow(141)[1])
+
+    def test_counter_is_shared_between_instances(self):
+        self.allow(60)
+        throttle, _ = self.allow(61)
+
+        self.assertEqual(throttle.current, 2)
+
+
+class ActionRateThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_unscoped_actions_are_not_limited(self):
+        throttle = ActionRateThrottle()
+        request = APIRequestFactory().get("/")
+
+        self.assertTrue(throttle.allow_request(request, FakeView("list")))
+
+    def test_search_has_its_own_budget(self):
+        rate = ActionRateThrottle.THROTTLE_RATES["flight_search"]
+        limit = int(rate.split("/")[0])
+        params = {"from": 1, "to": 2, "date": "2026-01-01"}
+
+        for _ in range(limit):
+            response = self.client.get(SEARCH_URL, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(SEARCH_URL, params)
+
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertIn("Retry-After", response)
@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import throttling
+
+
+class SlidingWindowThrottleMixin:
+    """Sliding window request counter kept in a shared cache.
+
+    DRF's throttles store the timestamp of every request in a list that
+    each request reads, trims and writes back: O(limit) work and lost
+    updates when two workers race. Here a request is one atomic ``incr``
+    of the counter of the current fixed window; the previous window's
+    count is weighted by how much of it still overlaps the sliding
+    window. The cache is ``settings.THROTTLE_CACHE``, so every worker
+    sees the same counters when it points to a shared backend.
+    """
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "THROTTLE_CACHE", "default")]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window, elapsed = divmod(self.now, self.duration)
+        current_key = f"{self.key}:{int(window)}"
+        self.cache.add(current_key, 0, timeout=2 * self.duration)
+        try:
+            self.current = self.cache.incr(current_key)
+        except ValueError:
+            # Expired between add and incr.
+            self.cache.add(current_key, 1, timeout=2 * self.duration)
+            self.current = 1
+        self.previous = self.cache.get(f"{self.key}:{int(window) - 1}", 0)
+        self.overlap = 1 - elapsed / self.duration
+
+        if self.previous * self.overlap + self.current <= self.num_requests:
+            return True
+        # Rejected requests do not use up the budget.
+        self.current -= 1
+        try:
+            self.cache.decr(current_key)
+        except ValueError:
+            pass
+        return False
+
+    def wait(self):
+        remaining = self.duration * self.overlap
+        if self.current >= self.num_requests or not self.previous:
+            return remaining
+        # The previous window must fade until a request fits again.
+        allowed_overlap = (
+            self.num_requests - self.current - 1
+        ) / self.previous
+        return max(remaining - self.duration * allowed_overlap, 0)
+
+
+class AnonRateThrottle(
+    SlidingWindowThrottleMixin, throttling.AnonRateThrottle
+):
+    pass
+
+
+class UserRateThrottle(
+    SlidingWindowThrottleMixin, throttling.UserRateThrottle
+):
+    pass
+
+
+class ActionRateThrottle(
+    SlidingWindowThrottleMixin, throttling.ScopedRateThrottle
+):
+    """Separate budgets for individual viewset actions.
+
+    Views map actions to rate scopes with ``throttle_scopes``, e.g.
+    ``{"search": "flight_search"}``; other actions are not limited.
+    """
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, "throttle_scopes", {}).get(
+            getattr(view, "action", None)
+        )
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
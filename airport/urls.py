@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from airport import async_views
 from airport.views import (
     AirportViewSet,
     RouteViewSet,
@@ -11,6 +12,8 @@ from airport.views import (
     OrderViewSet,
     TicketClassViewSet,
     AirlineViewSet,
+    MetricsView,
+    SlowQueryView,
 )
 
 router = DefaultRouter()
@@ -27,6 +30,23 @@ router.register("orders", OrderViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    path("slow-queries/", SlowQueryView.as_view(), name="slow-queries"),
+    path(
+        "async/flights/",
+        async_views.flight_list,
+        name="flight-list-async",
+    ),
+    path(
+        "async/flights/<int:pk>/",
+        async_views.flight_detail,
+        name="flight-detail-async",
+    ),
+    path(
+        "async/flights/<int:pk>/seat-map/",
+        async_views.flight_seat_map,
+        name="flight-seat-map-async",
+    ),
 ]
 
 app_name = "airport"
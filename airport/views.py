@@ -1,11 +1,24 @@
-from datetime import datetime
-
-from django.db.models import F, Count
+import math
+import time
+from datetime import date, datetime, timedelta
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponse
+from django.utils.http import (
+    http_date,
+    parse_etags,
+    parse_http_date_safe,
+    quote_etag,
+)
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
 from drf_spectacular.types import OpenApiTypes
@@ -19,10 +32,30 @@ from airport.models import (
     Crew,
     Flight,
     Order,
+    Ticket,
     TicketClass,
     Airline,
+    RouteDayAvailability,
+)
+from airport.cache import format_table_version, get_table_versions
+from airport.db_router import primary_reads
+from airport.export import (
+    EXPORT_FORMATS,
+    FLIGHT_EXPORT_FIELDS,
+    TICKET_EXPORT_FIELDS,
+    flight_export_rows,
+    get_export_format,
+    stream_export,
+    ticket_export_rows,
 )
+from airport.flight_import import import_flights
+from airport.itinerary import MAX_STOPS, search_itineraries
+from airport.metrics import get_registry, render_prometheus
+from airport.parsers import FlightCSVParser, FlightNDJSONParser
 from airport.permissions import IsAdminOrIfAuthenticatedReadOnly
+from airport.route_graph import get_route_graph
+from airport.seat_map import SEAT_MAP_ENCODINGS, get_seat_map
+from airport.slow_queries import get_slow_query_log
 from airport.serializers import (
     AirportSerializer,
     RouteSerializer,
@@ -33,16 +66,131 @@ from airport.serializers import (
     OrderSerializer,
     FlightListSerializer,
     OrderListSerializer,
+    OrderHistorySerializer,
     AirplaneListSerializer,
     AirplaneRetrieveSerializer,
     FlightDetailSerializer,
+    FlightDetailCompactSerializer,
+    ItinerarySerializer,
+    SeatMapSerializer,
     TicketClassSerializer,
     AirlineImageSerializer,
     AirlineSerializer,
+    RouteCalendarSerializer,
 )
 
 
+EXPORT_FORMAT_PARAMETER = OpenApiParameter(
+    "export_format",
+    type=OpenApiTypes.STR,
+    enum=EXPORT_FORMATS,
+    description="Newline-delimited JSON (default) or CSV "
+                "(ex. ?export_format=csv)",
+)
+
+PAGINATION_PARAMETER = OpenApiParameter(
+    "pagination",
+    type=OpenApiTypes.STR,
+    enum=("page", "cursor"),
+    description="Paginate the list with page numbers (?page=) "
+                "or keyset cursors (?pagination=cursor), "
+                "the full list is returned by default",
+)
+
+
+class SelectablePaginationMixin:
+    """Paginate only when the client asks for it.
+
+    ``?pagination=cursor`` (or a ``cursor`` parameter) selects keyset
+    pagination, ``?pagination=page`` (or a ``page`` parameter) selects
+    page numbers; without either the full list is returned as before.
+    """
+    pagination_class = None
+    page_pagination_class = None
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            mode = params.get("pagination")
+            if mode == "cursor" or (mode is None and "cursor" in params):
+                self._paginator = self.cursor_pagination_class()
+            elif mode == "page" or (mode is None and "page" in params):
+                self._paginator = self.page_pagination_class()
+            else:
+                self._paginator = None
+        return self._paginator
+
+
+class CachedListMixin:
+    """Serve a reference list from cache with conditional GET support.
+
+    The rendered body is cached under the version of ``cache_tables``,
+    which the model signals bump on every write, so it never has to be
+    invalidated explicitly. Clients sending a matching ``If-None-Match``
+    (or a fresh ``If-Modified-Since``) get 304 without the tables being
+    queried. The body is built from the primary database, never from a
+    replica that may still lag behind the version it is cached under.
+    """
+    cache_tables = ()
+    cache_timeout = 60 * 60 * 24
+
+    def get_list_data(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.get_serializer(queryset, many=True).data
+
+    def build_list_data(self):
+        with primary_reads():
+            return self.get_list_data()
+
+    def _not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return "*" in etags or etag in etags or f"W/{etag}" in etags
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        return bool(if_modified_since) and last_modified <= if_modified_since
+
+    def list(self, request, *args, **kwargs):
+        versions = get_table_versions(*self.cache_tables)
+        version = format_table_version(versions)
+        etag = quote_etag(f"{self.basename}-{version}")
+        # HTTP dates have whole seconds: the time is rounded up and only
+        # sent once that second is over, so no later write can share it.
+        last_modified = math.ceil(max(versions))
+        headers = {"ETag": etag}
+        if last_modified <= time.time():
+            headers["Last-Modified"] = http_date(last_modified)
+
+        if self._not_modified(request, etag, last_modified):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+
+        renderer = request.accepted_renderer
+        if renderer.format != "json":
+            return Response(self.build_list_data(), headers=headers)
+
+        key = f"airport:list:{self.basename}:{version}"
+        body = cache.get(key)
+        if body is None:
+            body = renderer.render(
+                self.build_list_data(),
+                request.accepted_media_type,
+                self.get_renderer_context(),
+            )
+            cache.set(key, body, self.cache_timeout)
+        response = HttpResponse(body, content_type=renderer.media_type)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+
 class AirportViewSet(
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -50,9 +198,11 @@ class AirportViewSet(
     queryset = Airport.objects.all()
     serializer_class = AirportSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_tables = (Airport,)
 
 
 class TicketClassViewSet(
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -60,9 +210,11 @@ class TicketClassViewSet(
     queryset = TicketClass.objects.all()
     serializer_class = TicketClassSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_tables = (TicketClass,)
 
 
 class RouteViewSet(
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -70,12 +222,64 @@ class RouteViewSet(
     queryset = Route.objects.select_related("source", "destination").all()
     serializer_class = RouteSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_tables = (Route, Airport)
+
+    def get_list_data(self):
+        """Routes are served from the worker's cached route graph"""
+        return get_route_graph().routes_data()
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "month",
+                type=OpenApiTypes.STR,
+                description="Month to show, the current one by default "
+                            "(ex. ?month=2024-09)",
+            ),
+        ],
+        responses=RouteCalendarSerializer,
+    )
+    @action(methods=["GET"], detail=True, url_path="calendar")
+    def calendar(self, request, pk=None):
+        """Flights and free seats per day of a month"""
+        month = request.query_params.get("month")
+        try:
+            first_day = (
+                datetime.strptime(month, "%Y-%m").date() if month
+                else date.today().replace(day=1)
+            )
+        except ValueError:
+            raise ValidationError(
+                {"month": "Month has wrong format. Use YYYY-MM."}
+            )
+        if not pk.isdigit():
+            raise Http404
 
-class AirplaneTypeViewSet(viewsets.ModelViewSet):
+        days = RouteDayAvailability.objects.filter(
+            route_id=pk, date__gte=first_day
+        )
+        # December 9999 has no next month; its days are the last ones.
+        if first_day < date.max.replace(day=1):
+            years, month = divmod(first_day.month, 12)
+            days = days.filter(date__lt=first_day.replace(
+                year=first_day.year + years, month=month + 1
+            ))
+        days = list(days)
+        if not days and not Route.objects.filter(pk=pk).exists():
+            raise Http404
+        serializer = RouteCalendarSerializer({
+            "route": int(pk),
+            "month": first_day.strftime("%Y-%m"),
+            "days": days,
+        })
+        return Response(serializer.data)
+
+
+class AirplaneTypeViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = AirplaneType.objects.all()
     serializer_class = AirplaneTypeSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_tables = (AirplaneType,)
 
 
 class AirlineViewSet(viewsets.ModelViewSet):
@@ -128,7 +332,7 @@ class AirplaneViewSet(viewsets.ModelViewSet):
                 airplane_type__name__icontains=airplane_type
             )
         if self.action in ("list", "retrieve"):
-            return queryset.select_related("airplane_type")
+            return queryset.select_related("airplane_type", "airline")
         return queryset
 
     @extend_schema(
@@ -150,6 +354,7 @@ class AirplaneViewSet(viewsets.ModelViewSet):
 
 
 class CrewViewSet(
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -157,6 +362,7 @@ class CrewViewSet(
     queryset = Crew.objects.all()
     serializer_class = CrewSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_tables = (Crew,)
 
 
 class FlightPagination(PageNumberPagination):
@@ -164,40 +370,88 @@ class FlightPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class FlightViewSet(viewsets.ModelViewSet):
+class FlightCursorPagination(CursorPagination):
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-arrival_time", "id")
+
+
+class FlightViewSet(SelectablePaginationMixin, viewsets.ModelViewSet):
     queryset = (
         Flight.objects.all()
         .select_related("airplane", "route")
         .prefetch_related("crew")
-        .annotate(
-            tickets_available=(
-                F("airplane__rows") * F("airplane__seats_in_row")
-                - Count("tickets")
-            )
-        )
+        .with_tickets_available()
     )
     serializer_class = FlightListSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    page_pagination_class = FlightPagination
+    cursor_pagination_class = FlightCursorPagination
+    throttle_scopes = {"search": "flight_search"}
 
     def get_serializer_class(self):
         if self.action == "list":
             return FlightListSerializer
         if self.action == "retrieve":
+            taken_places = self.request.query_params.get("taken_places")
+            if taken_places in ("false", "0"):
+                return FlightDetailCompactSerializer
             return FlightDetailSerializer
+        if self.action == "seat_map":
+            return SeatMapSerializer
+        if self.action == "search":
+            return ItinerarySerializer
         return FlightSerializer
 
+    def _get_int_param(self, name, default=None):
+        value = self.request.query_params.get(name)
+        if value is None:
+            if default is None:
+                raise ValidationError({name: "This parameter is required."})
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({name: "A valid integer is required."})
+
+    def _get_date_param(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            raise ValidationError(
+                {name: "Date has wrong format. Use YYYY-MM-DD."}
+            )
+
     def get_queryset(self):
-        departure_date = self.request.query_params.get("departure_date")
+        departure_date = self._get_date_param("departure_date")
+        departure_from = self._get_date_param("departure_from")
+        departure_to = self._get_date_param("departure_to")
         airplane_id_str = self.request.query_params.get("airplane")
         route_id_str = self.request.query_params.get("route")
 
         queryset = super().get_queryset()
 
+        # Dates are compared as half-open datetime ranges on the raw
+        # column, so the departure_time indexes can be used.
         if departure_date:
-            departure_date = datetime.strptime(
-                departure_date, "%Y-%m-%d"
-            ).date()
-            queryset = queryset.filter(departure_time__date=departure_date)
+            departure_from = max(
+                departure_from or departure_date, departure_date
+            )
+            departure_to = min(
+                departure_to or departure_date, departure_date
+            )
+
+        if departure_from:
+            queryset = queryset.filter(departure_time__gte=departure_from)
+
+        if departure_to:
+            queryset = queryset.filter(
+                departure_time__lt=departure_to + timedelta(days=1)
+            )
 
         if airplane_id_str:
             queryset = queryset.filter(airplane_id=int(airplane_id_str))
@@ -215,6 +469,18 @@ class FlightViewSet(viewsets.ModelViewSet):
                 description="Filter by departure date "
                             "(ex. ?departure_date=2024-09-01)",
             ),
+            OpenApiParameter(
+                "departure_from",
+                type=OpenApiTypes.DATE,
+                description="Flights departing on or after the date "
+                            "(ex. ?departure_from=2024-09-01)",
+            ),
+            OpenApiParameter(
+                "departure_to",
+                type=OpenApiTypes.DATE,
+                description="Flights departing on or before the date "
+                            "(ex. ?departure_to=2024-09-07)",
+            ),
             OpenApiParameter(
                 "airplane",
                 type=OpenApiTypes.INT,
@@ -225,37 +491,275 @@ class FlightViewSet(viewsets.ModelViewSet):
                 type=OpenApiTypes.INT,
                 description="Filter by route id (ex. ?route=3)",
             ),
+            PAGINATION_PARAMETER,
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "taken_places",
+                type=OpenApiTypes.BOOL,
+                description="Set to false to omit taken places, "
+                            "use seat-map instead (ex. ?taken_places=false)",
+            ),
+        ]
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "from",
+                type=OpenApiTypes.INT,
+                required=True,
+                description="Departure airport id (ex. ?from=1)",
+            ),
+            OpenApiParameter(
+                "to",
+                type=OpenApiTypes.INT,
+                required=True,
+                description="Arrival airport id (ex. ?to=5)",
+            ),
+            OpenApiParameter(
+                "date",
+                type=OpenApiTypes.DATE,
+                required=True,
+                description="Departure date of the first flight "
+                            "(ex. ?date=2024-09-01)",
+            ),
+            OpenApiParameter(
+                "max_stops",
+                type=OpenApiTypes.INT,
+                description=f"Maximum number of connections, "
+                            f"0 to {MAX_STOPS} (ex. ?max_stops=1)",
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=False, url_path="search")
+    def search(self, request):
+        """Direct and connecting flights between two airports"""
+        source_id = self._get_int_param("from")
+        destination_id = self._get_int_param("to")
+        max_stops = self._get_int_param("max_stops", default=1)
+        date = self._get_date_param("date")
+        if date is None:
+            raise ValidationError({"date": "This parameter is required."})
+        if not 0 <= max_stops <= MAX_STOPS:
+            raise ValidationError(
+                {"max_stops": f"Must be between 0 and {MAX_STOPS}."}
+            )
+        if source_id == destination_id:
+            raise ValidationError(
+                {"to": "Must differ from the departure airport."}
+            )
+
+        itineraries = search_itineraries(
+            source_id, destination_id, date, max_stops
+        )
+        serializer = ItinerarySerializer(itineraries, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "encoding",
+                type=OpenApiTypes.STR,
+                enum=SEAT_MAP_ENCODINGS,
+                description="Occupancy encoding: base64 bitmap (default) "
+                            "or run lengths of free/taken seats "
+                            "(ex. ?encoding=rle)",
+            ),
+        ],
+        responses=SeatMapSerializer,
+    )
+    @action(methods=["GET"], detail=True, url_path="seat-map")
+    def seat_map(self, request, pk=None):
+        """Seat occupancy as a packed row-major bitmap"""
+        encoding = request.query_params.get("encoding", "base64")
+        if encoding not in SEAT_MAP_ENCODINGS:
+            raise ValidationError(
+                {"encoding": f"Must be one of: {SEAT_MAP_ENCODINGS}"}
+            )
+        if not pk.isdigit():
+            raise Http404
+        seat_map = get_seat_map(int(pk), encoding)
+        if seat_map is None:
+            raise Http404
+        return Response(seat_map)
+
+    @extend_schema(
+        parameters=[EXPORT_FORMAT_PARAMETER],
+        responses={200: OpenApiTypes.BINARY},
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="export",
+        permission_classes=[IsAdminUser],
+    )
+    def export(self, request):
+        """Stream all flights with availability, honoring list filters"""
+        export_format = get_export_format(request)
+        return stream_export(
+            flight_export_rows(self.get_queryset()),
+            FLIGHT_EXPORT_FIELDS,
+            export_format,
+            "flights",
+        )
+
+    @extend_schema(
+        request={
+            "text/csv": OpenApiTypes.STR,
+            "application/x-ndjson": OpenApiTypes.STR,
+            "application/json": OpenApiTypes.OBJECT,
+        },
+        responses={201: OpenApiTypes.OBJECT},
+    )
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="import",
+        permission_classes=[IsAdminUser],
+        parser_classes=[FlightCSVParser, FlightNDJSONParser, JSONParser],
+    )
+    def bulk_import(self, request):
+        """Create flights with their crew from CSV, NDJSON or a JSON list"""
+        created = import_flights(request.data)
+        return Response({"created": created}, status=status.HTTP_201_CREATED)
+
 
 class OrderPagination(PageNumberPagination):
     page_size = 10
     max_page_size = 100
 
 
+class OrderCursorPagination(CursorPagination):
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created_at", "id")
+
+
 class OrderViewSet(
+    SelectablePaginationMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     viewsets.GenericViewSet,
 ):
     permission_classes = (IsAuthenticated,)
+    throttle_scopes = {"create": "order_create"}
     queryset = Order.objects.none()
+    page_pagination_class = OrderPagination
+    cursor_pagination_class = OrderCursorPagination
+
+    def _is_compact(self):
+        return self.request.query_params.get("compact") in ("true", "1")
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).select_related(
-            "user"
-        ).prefetch_related(
-            "tickets__flight__airplane",
-            "tickets__flight__route"
+        queryset = Order.objects.filter(user=self.request.user)
+        if self.action != "list":
+            return queryset
+
+        if self._is_compact():
+            flights = Flight.objects.select_related(
+                "route__source", "route__destination"
+            )
+        else:
+            flights = (
+                Flight.objects.select_related("route")
+                .prefetch_related("crew")
+                .with_tickets_available()
+            )
+        return queryset.prefetch_related(
+            Prefetch(
+                "tickets",
+                queryset=Ticket.objects.select_related("ticket_class")
+            ),
+            Prefetch("tickets__flight", queryset=flights),
         )
 
     def get_serializer_class(self):
         if self.action == "list":
+            if self._is_compact():
+                return OrderHistorySerializer
             return OrderListSerializer
         return OrderSerializer
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "compact",
+                type=OpenApiTypes.BOOL,
+                description="Lighter flight representation for order "
+                            "history (ex. ?compact=true)",
+            ),
+            PAGINATION_PARAMETER,
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=[EXPORT_FORMAT_PARAMETER],
+        responses={200: OpenApiTypes.BINARY},
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="export",
+        permission_classes=[IsAdminUser],
+    )
+    def export(self, request):
+        """Stream the tickets of every user's orders, one row per ticket"""
+        export_format = get_export_format(request)
+        return stream_export(
+            ticket_export_rows(),
+            TICKET_EXPORT_FIELDS,
+            export_format,
+            "orders",
+        )
+
+
+class MetricsView(APIView):
+    """Request metrics of all workers in Prometheus text format"""
+
+    permission_classes = (IsAdminUser,)
+    throttle_classes = ()
+
+    @extend_schema(responses={200: OpenApiTypes.STR})
+    def get(self, request):
+        return HttpResponse(
+            render_prometheus(get_registry().collect()),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+
+class SlowQueryView(APIView):
+    """Slowest query fingerprints by total time, with their plans"""
+
+    permission_classes = (IsAdminUser,)
+    throttle_classes = ()
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "limit",
+                type=OpenApiTypes.INT,
+                description="Number of fingerprints (ex. ?limit=20)",
+            ),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", 20))
+        except ValueError:
+            raise ValidationError({"limit": "A valid integer is required."})
+        return Response(get_slow_query_log().top(limit))
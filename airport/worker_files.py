@@ -0,0 +1,56 @@
+import json
+import os
+
+# Per-process JSON files shared by all workers of a deployment, used to add
+# up in-process statistics without an external service.
+
+
+def worker_file_path(directory, prefix, pid=None):
+    return os.path.join(directory, f"{prefix}{pid or os.getpid()}.json")
+
+
+def write_worker_file(directory, prefix, data):
+    """Atomically replace this process's file with ``data``."""
+    path = worker_file_path(directory, prefix)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as output:
+        json.dump(data, output)
+    os.replace(temporary, path)
+
+
+def read_worker_files(directory, prefix):
+    """Data of every worker's file; unreadable files are skipped."""
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith(prefix) and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as source:
+                yield json.load(source)
+        except (OSError, ValueError):
+            continue
+
+
+def clear_worker_files(directory, prefix):
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(".json"):
+            os.remove(os.path.join(directory, name))
+
+
+def remove_worker_files(directory, pid=None):
+    """Remove the files of the process ``pid``, or of every process.
+
+    Recycled workers leave a file behind under their pid; the server
+    removes it when the worker exits (see ``gunicorn.conf.py``).
+    """
+    if not os.path.isdir(directory):
+        return
+    suffix = f"{pid}.json" if pid else ".json"
+    for name in os.listdir(directory):
+        if not name.endswith(suffix):
+            continue
+        if pid and not name[:-len(suffix)].endswith("-"):
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            continue
@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 import os
 from datetime import timedelta
+from decimal import Decimal
 from pathlib import Path
+
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -32,7 +34,7 @@ INTERNAL_IPS = [
     "127.0.0.1",
 ]
 
-ALLOWED_HOSTS = ["127.0.0.1"]
+ALLOWED_HOSTS = os.environ.get("DJANGO_ALLOWED_HOSTS", "127.0.0.1").split(",")
 
 
 # Application definition
@@ -44,7 +46,6 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "debug_toolbar",
     "rest_framework",
     "drf_spectacular",
     "airport",
@@ -53,8 +54,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "airport.metrics.MetricsMiddleware",
+    "airport.profiling.ProfilingMiddleware",
+    "airport.db_router.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -63,6 +66,20 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("django.middleware.security.SecurityMiddleware") + 1,
+        "debug_toolbar.middleware.DebugToolbarMiddleware",
+    )
+else:
+    # Without DEBUG Django no longer serves static files (admin, API
+    # docs); WhiteNoise serves those gathered by collectstatic.
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("django.middleware.security.SecurityMiddleware") + 1,
+        "whitenoise.middleware.WhiteNoiseMiddleware",
+    )
+
 ROOT_URLCONF = "airport_api_service.urls"
 
 TEMPLATES = [
@@ -94,6 +111,9 @@ WSGI_APPLICATION = "airport_api_service.wsgi.application"
 #     }
 # }
 
+# Set by airport_api_service/asgi.py
+ASGI = os.environ.get("DJANGO_ASGI", "") == "True"
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -102,9 +122,37 @@ DATABASES = {
         "PASSWORD": os.environ["POSTGRES_PASSWORD"],
         "HOST": os.environ["POSTGRES_HOST"],
         "PORT": os.environ["POSTGRES_PORT"],
+        # Keep connections open between requests; 0 closes them after
+        # each request. Connections that errored are closed at the end of
+        # their request and reopened by the next one. Not under ASGI: the
+        # async views query on pool threads, each of which would keep a
+        # connection of its own open.
+        "CONN_MAX_AGE": 0 if ASGI else int(
+            os.environ.get("DB_CONN_MAX_AGE", "60")
+        ),
+        "OPTIONS": {
+            "connect_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT", "5")),
+        },
     }
 }
 
+# Optional read replica for the reads of GET requests, see
+# airport/db_router.py. Tests use it as a mirror of the default database.
+if os.environ.get("POSTGRES_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["POSTGRES_REPLICA_HOST"],
+        "PORT": os.environ.get(
+            "POSTGRES_REPLICA_PORT", DATABASES["default"]["PORT"]
+        ),
+        "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["airport.db_router.ReplicaRouter"]
+# Seconds a client reads from the primary after writing
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "5"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -144,6 +192,8 @@ USE_TZ = False
 
 STATIC_URL = "static/"
 
+STATIC_ROOT = "/vol/web/static"
+
 # MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_ROOT = "/vol/web/media"
 
@@ -154,13 +204,40 @@ MEDIA_URL = "/media/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Throttle counters and table versions must be shared by all workers:
+# set REDIS_URL in production. The local memory cache is a per-process
+# stand-in for development and tests.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+THROTTLE_CACHE = "default"
+# Off only for load tests of a running server (benchmark_api --base-url),
+# which would otherwise mostly measure 429 responses
+THROTTLING_ENABLED = os.environ.get("THROTTLING_ENABLED", "") != "False"
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
-    ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "25/day", "user": "50/day"},
+        "airport.throttling.AnonRateThrottle",
+        "airport.throttling.UserRateThrottle",
+        "airport.throttling.ActionRateThrottle",
+    ] if THROTTLING_ENABLED else [],
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "25/day",
+        "user": "50/day",
+        "flight_search": "20/hour",
+        "order_create": "10/hour",
+    },
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
@@ -179,6 +256,40 @@ SPECTACULAR_SETTINGS = {
     },
 }
 
+# Per-request Server-Timing headers and sampled slow request logging
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "") == "True"
+PROFILING_SLOW_REQUEST_MS = int(
+    os.environ.get("PROFILING_SLOW_REQUEST_MS", "500")
+)
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "1.0"))
+
+# Request metrics served at /api/airport/metrics/; with several worker
+# processes point METRICS_DIR at a directory they all can write to
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "") != "False"
+METRICS_DIR = os.environ.get("METRICS_DIR") or None
+
+# Queries over the threshold are grouped by fingerprint with their plan,
+# see /api/airport/slow-queries/ and the slow_queries command
+SLOW_QUERY_ENABLED = os.environ.get("SLOW_QUERY_ENABLED", "") == "True"
+SLOW_QUERY_THRESHOLD_MS = int(
+    os.environ.get("SLOW_QUERY_THRESHOLD_MS", "100")
+)
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "") != "False"
+SLOW_QUERY_DIR = os.environ.get("SLOW_QUERY_DIR") or None
+
+# Fares: (FARE_BASE + FARE_PER_KM * distance) * class price_multiplier
+# * load factor multiplier, interpolated between (seats sold share,
+# multiplier) points of FARE_LOAD_CURVE
+FARE_BASE = Decimal(os.environ.get("FARE_BASE", "30.00"))
+FARE_PER_KM = Decimal(os.environ.get("FARE_PER_KM", "0.08"))
+FARE_LOAD_CURVE = [
+    (0.0, 0.8),
+    (0.5, 1.0),
+    (0.8, 1.3),
+    (1.0, 1.8),
+]
+FARE_CACHE_TIMEOUT = int(os.environ.get("FARE_CACHE_TIMEOUT", "3600"))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=300),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
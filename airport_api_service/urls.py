@@ -35,5 +35,7 @@ urlpatterns = [
          SpectacularRedocView.as_view(url_name="schema"),
          name="redoc",
     ),
-    path("__debug__/", include("debug_toolbar.urls")),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    urlpatterns.append(path("__debug__/", include("debug_toolbar.urls")))
@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+
+# Production server: gunicorn -c gunicorn.conf.py
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+if os.environ.get("GUNICORN_ASGI", "") == "True":
+    # One event loop per worker; the /async/ flight views run their
+    # queries on its thread pool, sync views on a single thread.
+    wsgi_app = "airport_api_service.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    # Threaded workers keep their database connections (CONN_MAX_AGE)
+    # across requests, one per thread.
+    wsgi_app = "airport_api_service.wsgi:application"
+    worker_class = "gthread"
+workers = int(
+    os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1)
+)
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def _worker_file_directories():
+    os.environ.setdefault(
+        "DJANGO_SETTINGS_MODULE", "airport_api_service.settings"
+    )
+    from django.conf import settings
+
+    return [
+        directory
+        for directory in (settings.METRICS_DIR, settings.SLOW_QUERY_DIR)
+        if directory
+    ]
+
+
+def on_starting(server):
+    # Files of a previous run's workers would be added up with ours.
+    from airport.worker_files import remove_worker_files
+
+    for directory in _worker_file_directories():
+        remove_worker_files(directory)
+
+
+def child_exit(server, worker):
+    # Recycled workers (max_requests) would otherwise pile up files.
+    from airport.worker_files import remove_worker_files
+
+    for directory in _worker_file_directories():
+        remove_worker_files(directory, worker.pid)